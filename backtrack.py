@@ -0,0 +1,148 @@
+""" Solving standard and hyper sudoku puzzles by backtracking, without the SAT solver.
+
+The numbers used in each row, column and block are kept as bitmasks, so the candidates for a cell are found with a few
+bitwise operations. The search always fills in the empty cell with the fewest candidates first.
+
+Functions:
+    solve_backtrack: Solves a standard or hyper sudoku puzzle by backtracking.
+    cell_units: Lists the rows, columns and blocks that each cell belongs to.
+    search: Fills in the empty cells, backtracking when a cell has no candidates left.
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from clause_creation import HYPER_BLOCKS, HYPER_GRID_DIM, block_cells, block_dims
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+BACKTRACK_TYPES = ["sudoku", "hyper_sudoku"]  # Types of puzzle that can be solved by backtracking
+CHECK_INTERVAL = 1000  # Cells filled in by the search between calls to its check function
+
+
+def solve_backtrack(puzzle: list[list[int | str]], sudoku_type: str = "sudoku",
+                    check: Callable[[], None] | None = None) -> list[int] | None:
+    """ Solves a standard or hyper sudoku puzzle by backtracking.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku".
+        check (Callable[[], None] | None): Called every CHECK_INTERVAL cells filled in, so that the search can be
+            stopped by raising an exception from it, e.g. when the solve is cancelled or out of time.
+
+    Returns: The value of each cell, from left to right, up to down, or None if there is no solution.
+    """
+
+    grid_dim = len(puzzle)
+    units = cell_units(grid_dim, sudoku_type)
+    values = [int(value) for row in puzzle for value in row]
+    unit_masks = [0] * (max(max(cell) for cell in units) + 1)  # Numbers used in each unit, bit n - 1 for number n
+
+    for i in range(grid_dim ** 2):
+        if values[i] != 0:
+            bit = 1 << (values[i] - 1)
+            for unit in units[i]:
+                if unit_masks[unit] & bit:  # The number is already in this row, column or block
+                    return None
+                unit_masks[unit] |= bit
+
+    empty_cells = [i for i in range(grid_dim ** 2) if values[i] == 0]
+    if search(values, empty_cells, unit_masks, units, (1 << grid_dim) - 1, check):
+        return values
+    return None
+
+
+@lru_cache(maxsize=None)
+def cell_units(grid_dim: int, sudoku_type: str = "sudoku") -> tuple[tuple[int, ...], ...]:
+    """ Lists the rows, columns and blocks that each cell belongs to.
+
+    Args:
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku". Hyper sudoku has four extra blocks.
+
+    Returns: For each cell, the indices of its units. Rows come first, then columns, blocks and extra blocks. Raises
+        ValueError for a hyper sudoku grid that isn't 9 x 9, as the extra blocks are only defined for that size.
+    """
+
+    if sudoku_type == "hyper_sudoku" and grid_dim != HYPER_GRID_DIM:
+        raise ValueError("Hyper sudoku puzzles must be " + str(HYPER_GRID_DIM) + " x " + str(HYPER_GRID_DIM) + ".")
+    units = [[r, grid_dim + c] for r in range(grid_dim) for c in range(grid_dim)]
+    block_rows, block_cols = block_dims(grid_dim)
+    for r in range(grid_dim):
+        for c in range(grid_dim):
+            block = ((r // block_rows) * (grid_dim // block_cols)) + (c // block_cols)
+            units[(r * grid_dim) + c].append((2 * grid_dim) + block)
+    if sudoku_type == "hyper_sudoku":
+        for i, (start_col, start_row) in enumerate(HYPER_BLOCKS):
+            for c, r in block_cells(start_col, start_row, grid_dim):
+                units[(r * grid_dim) + c].append((3 * grid_dim) + i)  # After the grid_dim blocks
+    return tuple(tuple(cell) for cell in units)
+
+
+def search(values: list[int], empty_cells: list[int], unit_masks: list[int], units: tuple[tuple[int, ...], ...],
+           all_numbers: int, check: Callable[[], None] | None = None) -> bool:
+    """ Fills in the empty cells, backtracking when a cell has no candidates left.
+
+    Args:
+        values (list[int]): The value of each cell, 0 if it is empty. Filled in as the search goes.
+        empty_cells (list[int]): The cells that are still empty.
+        unit_masks (list[int]): The numbers used in each unit, as bitmasks.
+        units (tuple[tuple[int, ...], ...]): The units of each cell, from cell_units.
+        all_numbers (int): The bitmask with a bit for every number.
+        check (Callable[[], None] | None): Called every CHECK_INTERVAL cells filled in, to stop the search by raising.
+
+    Returns: True if every cell has been filled in, False if there is no solution.
+    """
+
+    # The cells filled in so far, with where each was in empty_cells and the candidates not tried yet. A list rather
+    # than recursion, as a large grid can have thousands of empty cells
+    stack = []
+    until_check = CHECK_INTERVAL
+    while empty_cells:
+        if check is not None:
+            until_check -= 1
+            if until_check == 0:
+                check()
+                until_check = CHECK_INTERVAL
+
+        # Choose the empty cell with the fewest candidates
+        best_index = 0
+        best_candidates = 0
+        best_count = all_numbers.bit_count() + 1
+        for index, cell in enumerate(empty_cells):
+            used = 0
+            for unit in units[cell]:
+                used |= unit_masks[unit]
+            candidates = all_numbers & ~used
+            count = candidates.bit_count()
+            if count < best_count:
+                best_index, best_candidates, best_count = index, candidates, count
+                if count <= 1:
+                    break
+
+        if best_count > 0:
+            cell = empty_cells[best_index]
+            empty_cells[best_index] = empty_cells[-1]
+            empty_cells.pop()
+        else:
+            # Go back to the last cell with a candidate left to try, emptying the cells on the way
+            while True:
+                if not stack:
+                    return False
+                cell, best_index, best_candidates = stack.pop()
+                bit = 1 << (values[cell] - 1)
+                for unit in units[cell]:
+                    unit_masks[unit] ^= bit
+                if best_candidates:
+                    break
+                values[cell] = 0
+                empty_cells.append(cell)
+                empty_cells[best_index], empty_cells[-1] = empty_cells[-1], empty_cells[best_index]
+
+        bit = best_candidates & - best_candidates  # Lowest candidate
+        for unit in units[cell]:
+            unit_masks[unit] |= bit
+        values[cell] = bit.bit_length()
+        stack.append((cell, best_index, best_candidates ^ bit))
+    return True
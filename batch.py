@@ -0,0 +1,279 @@
+""" Solving collections of puzzles from the command line, without the GUI.
+
+Puzzles are read one per line from a file or stdin, in the usual one line format: the cells from left to right, up to
+down, with "." or "0" for an empty cell. Numbers 1 to 9 are written as digits and larger numbers as letters, so a
+16 x 16 puzzle uses 1-9 and A-G, and a 25 x 25 puzzle uses 1-9 and A-P. The size of the grid comes from the length of
+the line, e.g. 81 characters for 9 x 9. There are only enough letters for grids up to 35 x 35, so a line can also be
+written as numbers separated by spaces or commas, which works for every size up to 64 x 64. Solutions to grids bigger
+than 35 x 35 are written that way, separated by spaces. Blank lines and lines starting with "#" are skipped.
+
+Each solution is written to stdout on its own line, in the same format, as soon as it is ready. A puzzle with no
+solution gives "unsolvable" and a line that isn't a valid puzzle gives "invalid" (with the reason on stderr), as does a
+line that fails in any other way, so one bad line can't end the run. Hyper sudoku lines must be 81 characters. With
+--time-limit or --conflict-limit, a puzzle that isn't solved within the limit gives "timeout", so one pathological
+puzzle can't hold a worker indefinitely. A summary of how many puzzles were solved and how quickly is written to stderr
+at the end. With --rate, each solution is followed by a tab, the difficulty label and the score from rating.py. With
+--symmetry-cache, a puzzle that is a relabelling, reordering or transposition of one the worker has already solved is
+answered from a cache (see canonical.py). With --store, solutions are kept in an SQLite file shared by the workers
+and by later runs, so a puzzle seen before is answered without being solved (see solution_store.py).
+
+Usage: python main.py [file] [--type TYPE] [--workers N] [--unordered] ...
+
+Functions:
+    main: Runs the command line tool.
+    parse_args: Reads the command line arguments.
+    read_puzzles: Reads the puzzle lines from a file, skipping blank lines and comments.
+    solve_line: Solves the puzzle on one line. Run in the worker processes.
+    parse_line: Converts a line to a puzzle.
+    parse_numbers: Converts a line written as numbers separated by spaces or commas to a puzzle.
+    format_grid: Converts a puzzle or solution to a line.
+"""
+
+from __future__ import annotations
+import argparse
+from functools import partial
+from math import isqrt
+import multiprocessing
+import os
+import sys
+from time import perf_counter
+from typing import TYPE_CHECKING
+from clause_creation import GRID_DIMS
+from engine import BACKENDS, SAT_SOLVERS, UNINTERRUPTIBLE_SOLVERS, VARIANT_GRID_DIM, SolveTimeout, solve
+from rating import rate
+from solve_stats import SolveStats
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import TextIO
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"  # The symbol for each number, starting from 1
+EMPTY_SYMBOLS = ".0"
+SEPARATORS = " ,\t"  # Between the numbers of a line written as numbers rather than symbols
+BATCH_TYPES = ["sudoku", "hyper_sudoku"]  # The types of puzzle that can be written on one line
+
+
+def main(argv: list[str] | None = None) -> int:
+    """ Runs the command line tool.
+
+    Args:
+        argv (list[str] | None): The command line arguments, not including the program name. Defaults to sys.argv.
+
+    Returns: The exit status, 0 if every line was a valid puzzle, otherwise 1.
+    """
+
+    args = parse_args(argv)
+    in_file = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    worker = partial(solve_line, sudoku_type=args.type, backend=args.backend, solver_name=args.solver,
+                     presolve=not args.no_presolve, rate_puzzle=args.rate, time_limit=args.time_limit,
+                     conflict_limit=args.conflict_limit, symmetry_cache=args.symmetry_cache,
+                     solution_store=args.store)
+    counts = {"solved": 0, "unsolvable": 0, "timeout": 0, "invalid": 0}
+
+    start = perf_counter()
+    try:
+        if args.workers == 1:
+            results = map(worker, read_puzzles(in_file))
+            pool = None
+        else:
+            pool = multiprocessing.Pool(args.workers)
+            if args.unordered:
+                results = pool.imap_unordered(worker, read_puzzles(in_file), args.chunksize)
+            else:
+                results = pool.imap(worker, read_puzzles(in_file), args.chunksize)
+        for line_number, status, output in results:
+            counts[status] = counts[status] + 1
+            if status == "invalid":
+                print("line " + str(line_number) + ": " + output, file=sys.stderr)
+                output = "invalid"
+            if args.unordered:  # Say which puzzle this is, as the solutions aren't in the same order as the input
+                output = str(line_number) + "\t" + output
+            sys.stdout.write(output + "\n")
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if in_file is not sys.stdin:
+            in_file.close()
+    elapsed = perf_counter() - start
+
+    total = sum(counts.values())
+    throughput = total / elapsed if elapsed > 0 else 0
+    print("{} puzzles in {:.2f} s ({:.1f} per second): {} solved, {} unsolvable, {} timed out, {} invalid".format(
+        total, elapsed, throughput, counts["solved"], counts["unsolvable"], counts["timeout"], counts["invalid"]),
+        file=sys.stderr)
+    return 1 if counts["invalid"] else 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """ Reads the command line arguments.
+
+    Args:
+        argv (list[str] | None): The command line arguments, not including the program name. Defaults to sys.argv.
+
+    Returns: The arguments.
+    """
+
+    parser = argparse.ArgumentParser(prog="main.py", description="Solve puzzles written one per line, without the GUI. "
+                                                                 "Run with no arguments to open the GUI instead.")
+    parser.add_argument("file", nargs="?", default="-", help="file of puzzles, or - for stdin (the default)")
+    parser.add_argument("--type", choices=BATCH_TYPES, default="sudoku", help="type of puzzle (default: sudoku)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write solutions as soon as they are ready, each after its line number and a tab")
+    parser.add_argument("--chunksize", type=int, default=64, help="puzzles sent to a worker at a time (default: 64)")
+    parser.add_argument("--backend", choices=["auto"] + BACKENDS, default="auto", help="solving backend")
+    parser.add_argument("--solver", choices=SAT_SOLVERS, default="glucose3", help="SAT solver to use")
+    parser.add_argument("--no-presolve", action="store_true",
+                        help="skip propagation before the SAT solver, which is faster for collections of easy puzzles")
+    parser.add_argument("--rate", action="store_true", help="write the difficulty label and score after each solution")
+    parser.add_argument("--time-limit", type=float, help="seconds to spend on each puzzle before giving up")
+    parser.add_argument("--conflict-limit", type=int, help="SAT solver conflicts for each puzzle before giving up")
+    parser.add_argument("--symmetry-cache", action="store_true",
+                        help="answer puzzles that are symmetries of ones already solved from a cache (standard sudoku)")
+    parser.add_argument("--store", metavar="PATH",
+                        help="SQLite file of solutions, so puzzles solved before (in any run) aren't solved again")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+    if (args.time_limit is not None and args.time_limit <= 0) or \
+            (args.conflict_limit is not None and args.conflict_limit <= 0):
+        parser.error("limits must be positive")
+    if (args.time_limit is not None or args.conflict_limit is not None) and args.solver in UNINTERRUPTIBLE_SOLVERS:
+        parser.error(args.solver + " can't be given limits")
+    return args
+
+
+def read_puzzles(in_file: TextIO) -> Iterator[tuple[int, str]]:
+    """ Reads the puzzle lines from a file, skipping blank lines and comments.
+
+    The file is read lazily, so collections too big to fit in memory can be solved.
+
+    Args:
+        in_file (TextIO): The file.
+
+    Yields: The line number (starting from 1) and the line, without surrounding whitespace.
+    """
+
+    for line_number, line in enumerate(in_file, 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line_number, line
+
+
+def solve_line(numbered_line: tuple[int, str], sudoku_type: str = "sudoku", backend: str = "auto",
+               solver_name: str = "glucose3", presolve: bool = True, rate_puzzle: bool = False,
+               time_limit: float | None = None, conflict_limit: int | None = None,
+               symmetry_cache: bool = False, solution_store: str | None = None) -> tuple[int, str, str]:
+    """ Solves the puzzle on one line. Run in the worker processes.
+
+    Args:
+        numbered_line (tuple[int, str]): The line number and the line.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku". Hyper sudoku lines must be 9 x 9.
+        backend (str): One of BACKENDS, or "auto".
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+        presolve (bool): Whether to use propagation before the SAT solver.
+        rate_puzzle (bool): Whether to add the difficulty label and score after the solution.
+        time_limit (float | None): The most seconds to spend on the puzzle, or None for no limit.
+        conflict_limit (int | None): The most conflicts the SAT solver may have, or None for no limit.
+        symmetry_cache (bool): Whether to answer puzzles that are symmetries of ones this worker has already solved
+            from its cache (see canonical.py).
+        solution_store (str | None): An SQLite file of solutions shared by the workers (see solution_store.py), or
+            None to solve every puzzle.
+
+    Returns: The line number, the status ("solved", "unsolvable", "timeout" or "invalid") and the output, which is the
+        solution as a line if the puzzle was solved and the reason if the line was invalid.
+    """
+
+    line_number, line = numbered_line
+    try:
+        puzzle = parse_line(line)
+        if sudoku_type != "sudoku" and len(puzzle) != VARIANT_GRID_DIM:
+            raise ValueError(sudoku_type + " puzzles must be " + str(VARIANT_GRID_DIM ** 2) + " characters long.")
+        stats = SolveStats() if rate_puzzle else None  # The rating uses the SAT solver's work from this solve
+        solution = solve(puzzle, sudoku_type, backend=backend, presolve=presolve, solver_name=solver_name, stats=stats,
+                         time_limit=time_limit, conflict_limit=conflict_limit, symmetry_cache=symmetry_cache,
+                         solution_store=solution_store)
+        if solution is None:
+            return line_number, "unsolvable", "unsolvable"
+        output = format_grid(solution)
+        if rate_puzzle:
+            rating = rate(puzzle, sudoku_type, stats=stats)
+            output = output + "\t" + rating["label"] + "\t" + "{:.2f}".format(rating["score"])
+    except ValueError as error:
+        return line_number, "invalid", str(error)
+    except SolveTimeout:
+        return line_number, "timeout", "timeout"
+    except Exception as error:  # A bug shouldn't end the whole run, so the line is reported like any other bad line
+        return line_number, "invalid", repr(error)
+    return line_number, "solved", output
+
+
+def parse_line(line: str) -> list[list[int]]:
+    """ Converts a line to a puzzle.
+
+    Args:
+        line (str): The cells from left to right, up to down, with "." or "0" for an empty cell. Either one symbol per
+            cell, or numbers separated by spaces or commas.
+
+    Returns: The puzzle as a 2D array, with 0 where a cell is empty.
+    """
+
+    if any(separator in line for separator in SEPARATORS):
+        return parse_numbers(line)
+    grid_dim = isqrt(len(line))
+    if grid_dim ** 2 != len(line) or grid_dim not in GRID_DIMS or grid_dim > len(SYMBOLS):
+        raise ValueError("A line of " + str(len(line)) + " characters isn't a puzzle of any supported size.")
+    values = []
+    for symbol in line.upper():
+        if symbol in EMPTY_SYMBOLS:
+            values.append(0)
+        elif symbol in SYMBOLS[:grid_dim]:
+            values.append(SYMBOLS.index(symbol) + 1)
+        else:
+            raise ValueError("'" + symbol + "' isn't a number in a " + str(grid_dim) + " x " + str(grid_dim)
+                             + " puzzle.")
+    return [values[r * grid_dim:(r + 1) * grid_dim] for r in range(grid_dim)]
+
+
+def parse_numbers(line: str) -> list[list[int]]:
+    """ Converts a line written as numbers separated by spaces or commas to a puzzle.
+
+    Args:
+        line (str): The numbers of the cells from left to right, up to down, with "." or "0" for an empty cell.
+
+    Returns: The puzzle as a 2D array, with 0 where a cell is empty.
+    """
+
+    tokens = line.replace(",", " ").split()
+    grid_dim = isqrt(len(tokens))
+    if grid_dim ** 2 != len(tokens) or grid_dim not in GRID_DIMS:
+        raise ValueError("A line of " + str(len(tokens)) + " numbers isn't a puzzle of any supported size.")
+    values = []
+    for token in tokens:
+        if token == ".":
+            values.append(0)
+        elif token.isdigit() and int(token) <= grid_dim:
+            values.append(int(token))
+        else:
+            raise ValueError("'" + token + "' isn't a number in a " + str(grid_dim) + " x " + str(grid_dim)
+                             + " puzzle.")
+    return [values[r * grid_dim:(r + 1) * grid_dim] for r in range(grid_dim)]
+
+
+def format_grid(grid: list[list[int]]) -> str:
+    """ Converts a puzzle or solution to a line.
+
+    Args:
+        grid (list[list[int]]): The grid as a 2D array, with 0 where a cell is empty.
+
+    Returns: The line, with "." for an empty cell. Grids too big for one symbol per number are written as numbers
+        separated by spaces.
+    """
+
+    if len(grid) > len(SYMBOLS):
+        return " ".join(str(value) if value else "." for row in grid for value in row)
+    return "".join(SYMBOLS[value - 1] if value else "." for row in grid for value in row)
@@ -0,0 +1,622 @@
+""" Benchmarks for the clause creation and the solver. Run this file to print the reports.
+
+Functions:
+    encoding_report: Counts the clauses and variables of the sudoku rules for each at-most-one encoding.
+    print_encoding_report: Prints the encoding report as a table.
+    example_layouts: Creates a layout for each type of puzzle, to benchmark with.
+    pattern_solution: Creates a valid solved grid.
+    load_report: Times loading the clauses into the SAT solver one at a time and all at once, for each type of puzzle.
+    print_load_report: Prints the load report as a table.
+    row_cages: Splits each row of pattern_solution(9) into killer sudoku cages.
+    cage_report: Counts the clauses and times the solve of killer sudoku puzzles for each cage encoding.
+    print_cage_report: Prints the cage report as a table.
+    gt_report: Counts the clauses and times the solves of a corpus of greater than sudoku puzzles for each
+        encoding.
+    print_gt_report: Prints the greater than report as a table.
+    build_corpus: Generates the benchmark corpus and saves it as a JSON file.
+    load_corpus: Loads the benchmark corpus from a JSON file.
+    suite_report: Solves every puzzle in the corpus and measures each one.
+    measure_puzzle: Solves one puzzle from the corpus several times and measures the fastest solve.
+    compare_report: Compares the results of the suite with a baseline from an earlier run.
+    print_suite_report: Prints the suite results as a table.
+    print_comparison: Prints the comparison with the baseline as a table.
+    scaling_report: Measures how the encoding and solving times grow with the size of the grid.
+    print_scaling_report: Prints the scaling report as a table.
+    main: Runs the reports, or the suite with the options from the command line.
+
+The suite solves a fixed corpus (benchmark_corpus.json) of every type and size of puzzle, including well known hard
+9 x 9 puzzles, and writes the results as JSON so that they can be compared with a later run:
+
+    python benchmark.py --suite --output before.json
+    python benchmark.py --suite --output after.json --baseline before.json
+
+python benchmark.py --scaling shows how the encoding and solving times grow with the grid size, up to 64 x 64.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+from time import perf_counter
+import tracemalloc
+import pysat
+from pysat.solvers import Glucose3
+from batch import format_grid, parse_line
+from clause_creation import AMO_ENCODINGS, CAGE_ENCODINGS, GRID_DIMS as SUDOKU_GRID_DIMS, GT_ENCODINGS, MAX_GRID_DIM, \
+    block_dims, clear_rule_templates, define_clauses, hyper_rule_clauses, rule_template, standard_rule_clauses
+from engine import SatSolver, clear_layout_solvers, get_layout_solver, solve
+from generator import generate, greater_than_constraints, shuffled_solution
+from propagation import propagate
+from solve_stats import SolveStats
+
+GRID_DIMS = [4, 6, 9, 16, 25]
+SCALING_DIMS = [4, 6, 8, 9, 12, 16, 25, 36, 49, 64]  # Grid sizes for the scaling report, with square and oblong blocks
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_corpus.json")
+# The generated puzzles in the corpus: the type of puzzle, the grid size and how many (with seeds 0, 1, 2, ...)
+CORPUS_LAYOUTS = [("sudoku", 4, 3), ("sudoku", 6, 3), ("sudoku", 9, 5), ("sudoku", 16, 2), ("sudoku", 25, 1),
+                  ("killer_sudoku", 9, 3), ("hyper_sudoku", 9, 3), ("greater_than_sudoku", 9, 3)]
+# Well known 9 x 9 puzzles that are hard for people and for solvers
+HARD_PUZZLES = {"ai_escargot": "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+                "easter_monster": "1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1",
+                "inkala_2012": "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+                "norvig_hard1": "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+                "norvig_hardest": "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97.."}
+ENCODE_PHASES = ["encode", "load"]  # The phases counted as encoding, the top level phases left are counted as solving
+MIN_REGRESSION_TIME = 0.001  # A slower time only counts as a regression if it is at least this much slower (seconds)
+
+
+def encoding_report(grid_dims: list[int] | None = None) -> list[dict]:
+    """ Counts the clauses and variables of the sudoku rules for each at-most-one encoding.
+
+    Args:
+        grid_dims (list[int] | None): The grid sizes to report on. Defaults to GRID_DIMS.
+
+    Returns: One dictionary per grid size and encoding, with the number of clauses, the number of variables, the number
+        of literals and the time taken to create the clauses (in seconds).
+    """
+
+    if grid_dims is None:
+        grid_dims = GRID_DIMS
+    rows = []
+    for grid_dim in grid_dims:
+        for encoding in AMO_ENCODINGS:
+            start = perf_counter()
+            clauses, top_var = standard_rule_clauses(grid_dim, encoding)
+            if grid_dim == 9:
+                hyper_clauses, _ = hyper_rule_clauses(encoding, top_var)
+            else:
+                hyper_clauses = []
+            encode_time = perf_counter() - start
+            rows.append({"grid_dim": grid_dim, "encoding": encoding, "clauses": len(clauses),
+                         "variables": top_var, "literals": sum(len(clause) for clause in clauses),
+                         "hyper_clauses": len(hyper_clauses), "encode_time": encode_time})
+    return rows
+
+
+def print_encoding_report(rows: list[dict]) -> None:
+    """ Prints the encoding report as a table.
+
+    Args:
+        rows (list[dict]): The rows from encoding_report.
+    """
+
+    print("grid  encoding      clauses  variables   literals  encode (s)")
+    for row in rows:
+        print(str(row["grid_dim"]).rjust(4) + "  " + row["encoding"].ljust(10) + str(row["clauses"]).rjust(10)
+              + str(row["variables"]).rjust(11) + str(row["literals"]).rjust(11)
+              + format(row["encode_time"], ".3f").rjust(12))
+
+
+def example_layouts() -> list[tuple[str, int, dict]]:
+    """ Creates a layout for each type of puzzle, to benchmark with.
+
+    The killer sudoku cages and greater than sudoku inequalities are taken from pattern_solution(9), so the layouts
+    always have a solution.
+
+    Returns: The type of puzzle, the grid size and the constraints of each layout.
+    """
+
+    solution = pattern_solution(9)
+    values = [value for row in solution for value in row]
+
+    cages = []
+    for r in range(9):  # Cages of three cells along each row
+        for c in range(0, 9, 3):
+            cages.append([(r * 9) + c, (r * 9) + c + 1, (r * 9) + c + 2])
+    totals = [sum(values[cell] for cell in cage) for cage in cages]
+
+    layouts = []
+    for grid_dim in GRID_DIMS:
+        layouts.append(("sudoku", grid_dim, {}))
+    layouts.append(("killer_sudoku", 9, {"ks_cages": cages, "ks_totals": totals}))
+    layouts.append(("hyper_sudoku", 9, {}))
+    layouts.append(("greater_than_sudoku", 9, greater_than_constraints(solution)))
+    return layouts
+
+
+def pattern_solution(grid_dim: int) -> list[list[int]]:
+    """ Creates a valid solved grid.
+
+    Args:
+        grid_dim (int): The side length of the grid.
+
+    Returns: The grid as a 2D array of integers.
+    """
+
+    block_rows, block_cols = block_dims(grid_dim)
+    return [[((block_cols * (r % block_rows)) + (r // block_rows) + c) % grid_dim + 1 for c in range(grid_dim)]
+            for r in range(grid_dim)]
+
+
+def load_report() -> list[dict]:
+    """ Times loading the clauses into the SAT solver one at a time and all at once, for each type of puzzle.
+
+    Returns: One dictionary per layout, with the number of clauses, the time taken to create them, and the time taken
+        to load them with add_clause and with append_formula (in seconds).
+    """
+
+    rows = []
+    for sudoku_type, grid_dim, constraints in example_layouts():
+        rule_template(grid_dim, "hyper_sudoku" if sudoku_type == "hyper_sudoku" else "sudoku")  # Cached beforehand
+        empty_puzzle = [[0] * grid_dim for _ in range(grid_dim)]
+
+        start = perf_counter()
+        formula = define_clauses(empty_puzzle, sudoku_type, grid_dim, constraints)
+        encode_time = perf_counter() - start
+
+        sat_solver = Glucose3()
+        start = perf_counter()
+        for clause in formula:
+            sat_solver.add_clause(clause)
+        add_clause_time = perf_counter() - start
+        sat_solver.delete()
+
+        sat_solver = SatSolver()
+        start = perf_counter()
+        sat_solver.append_formula(formula)
+        append_formula_time = perf_counter() - start
+        sat_solver.delete()
+
+        rows.append({"sudoku_type": sudoku_type, "grid_dim": grid_dim, "clauses": len(formula),
+                     "encode_time": encode_time, "add_clause_time": add_clause_time,
+                     "append_formula_time": append_formula_time})
+    return rows
+
+
+def print_load_report(rows: list[dict]) -> None:
+    """ Prints the load report as a table.
+
+    Args:
+        rows (list[dict]): The rows from load_report.
+    """
+
+    print("type                 grid    clauses  encode (s)  add_clause (s)  append_formula (s)  speedup")
+    for row in rows:
+        print(row["sudoku_type"].ljust(20) + str(row["grid_dim"]).rjust(5) + str(row["clauses"]).rjust(11)
+              + format(row["encode_time"], ".4f").rjust(12) + format(row["add_clause_time"], ".4f").rjust(16)
+              + format(row["append_formula_time"], ".4f").rjust(20)
+              + format(row["add_clause_time"] / row["append_formula_time"], ".1f").rjust(8) + "x")
+
+
+def row_cages(sizes: list[int]) -> dict:
+    """ Splits each row of pattern_solution(9) into killer sudoku cages.
+
+    Args:
+        sizes (list[int]): The sizes of the cages along a row, adding up to 9.
+
+    Returns: The constraints of the killer sudoku layout, i.e. ks_cages and ks_totals.
+    """
+
+    values = [value for row in pattern_solution(9) for value in row]
+    cages = []
+    for r in range(9):
+        c = 0
+        for size in sizes:
+            cages.append([(r * 9) + c + j for j in range(size)])
+            c = c + size
+    return {"ks_cages": cages, "ks_totals": [sum(values[cell] for cell in cage) for cage in cages]}
+
+
+def cage_report(max_permutation_size: int = 6) -> list[dict]:
+    """ Counts the clauses and times the solve of killer sudoku puzzles for each cage encoding.
+
+    Args:
+        max_permutation_size (int): The largest cage to try the permutation encoding on, as larger cages take too long.
+
+    Returns: One dictionary per layout and cage encoding, with the number of clauses and variables (including the
+        sudoku rules), the time taken to create the clauses and the time taken to solve the empty puzzle (in seconds).
+    """
+
+    rows = []
+    empty_puzzle = [[0] * 9 for _ in range(9)]
+    for sizes in [[3, 3, 3], [2, 3, 4], [4, 5], [2, 7], [9]]:
+        for cage_encoding in CAGE_ENCODINGS:
+            if cage_encoding == "permutation" and max(sizes) > max_permutation_size:
+                continue
+            constraints = row_cages(sizes) | {"ks_encoding": cage_encoding}
+            rule_template(9)  # Cached beforehand
+            start = perf_counter()
+            formula = define_clauses(empty_puzzle, "killer_sudoku", 9, constraints)
+            encode_time = perf_counter() - start
+
+            sat_solver = SatSolver()
+            sat_solver.append_formula(formula)
+            start = perf_counter()
+            sat_solver.solve()
+            solve_time = perf_counter() - start
+            variables = sat_solver.nof_vars()
+            sat_solver.delete()
+
+            rows.append({"cages": "+".join(str(size) for size in sizes), "cage_encoding": cage_encoding,
+                         "clauses": len(formula), "variables": variables, "encode_time": encode_time,
+                         "solve_time": solve_time})
+    return rows
+
+
+def print_cage_report(rows: list[dict]) -> None:
+    """ Prints the cage report as a table.
+
+    Args:
+        rows (list[dict]): The rows from cage_report.
+    """
+
+    print("cages    encoding        clauses  variables  encode (s)  solve (s)")
+    for row in rows:
+        print(row["cages"].ljust(7) + "  " + row["cage_encoding"].ljust(12) + str(row["clauses"]).rjust(10)
+              + str(row["variables"]).rjust(11) + format(row["encode_time"], ".4f").rjust(12)
+              + format(row["solve_time"], ".4f").rjust(11))
+
+
+def gt_report(corpus_size: int = 50) -> list[dict]:
+    """ Counts the clauses and times the solves of a corpus of greater than sudoku puzzles for each encoding.
+
+    The corpus is made of empty puzzles with the inequalities from a shuffled solved grid for each seed up to
+    corpus_size. Each puzzle is solved with a new SAT solver, so the time includes loading the clauses.
+
+    Args:
+        corpus_size (int): The number of puzzles in the corpus.
+
+    Returns: One dictionary per encoding, with the mean number of clauses and variables and the total time taken to
+        create the clauses and to solve (in seconds).
+    """
+
+    layouts = [greater_than_constraints(shuffled_solution(9, random.Random(seed))) for seed in range(corpus_size)]
+    empty_puzzle = [[0] * 9 for _ in range(9)]
+    rule_template(9)  # Cached beforehand
+    rows = []
+    for gt_encoding in GT_ENCODINGS:
+        clauses = 0
+        variables = 0
+        encode_time = 0
+        solve_time = 0
+        for layout in layouts:
+            start = perf_counter()
+            formula = define_clauses(empty_puzzle, "greater_than_sudoku", 9, layout | {"gt_encoding": gt_encoding})
+            encode_time = encode_time + perf_counter() - start
+
+            sat_solver = SatSolver()
+            start = perf_counter()
+            sat_solver.append_formula(formula)
+            sat_solver.solve()
+            solve_time = solve_time + perf_counter() - start
+            clauses = clauses + len(formula)
+            variables = variables + sat_solver.nof_vars()
+            sat_solver.delete()
+
+        rows.append({"gt_encoding": gt_encoding, "puzzles": corpus_size, "clauses": clauses / corpus_size,
+                     "variables": variables / corpus_size, "encode_time": encode_time, "solve_time": solve_time})
+    return rows
+
+
+def print_gt_report(rows: list[dict]) -> None:
+    """ Prints the greater than report as a table.
+
+    Args:
+        rows (list[dict]): The rows from gt_report.
+    """
+
+    print("encoding  puzzles  clauses/puzzle  variables/puzzle  encode (s)  solve (s)")
+    for row in rows:
+        print(row["gt_encoding"].ljust(8) + str(row["puzzles"]).rjust(9) + format(row["clauses"], ".0f").rjust(16)
+              + format(row["variables"], ".0f").rjust(18) + format(row["encode_time"], ".3f").rjust(12)
+              + format(row["solve_time"], ".3f").rjust(11))
+
+
+def build_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    """ Generates the benchmark corpus and saves it as a JSON file.
+
+    Only needed if CORPUS_LAYOUTS or HARD_PUZZLES change. The corpus is saved rather than generated on every run, so
+    that changes to generator.py don't change the puzzles results are compared on.
+
+    Args:
+        path (str): Where to save the corpus.
+
+    Returns: The corpus, one dictionary per puzzle with its name, type, grid size, puzzle (as a line, see batch.py)
+        and constraints.
+    """
+
+    corpus = []
+    for sudoku_type, grid_dim, count in CORPUS_LAYOUTS:
+        for seed in range(count):
+            puzzle, constraints, _ = generate(grid_dim, sudoku_type, seed)
+            corpus.append({"name": sudoku_type + "_" + str(grid_dim) + "_" + str(seed), "sudoku_type": sudoku_type,
+                           "grid_dim": grid_dim, "puzzle": format_grid(puzzle), "constraints": constraints})
+    for name, line in HARD_PUZZLES.items():
+        corpus.append({"name": name, "sudoku_type": "sudoku", "grid_dim": 9, "puzzle": line, "constraints": {}})
+    with open(path, "w", encoding="utf-8") as file:  # One puzzle per line, so that changes are easy to review
+        file.write("[\n" + ",\n".join(json.dumps(entry) for entry in corpus) + "\n]\n")
+    return corpus
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    """ Loads the benchmark corpus from a JSON file.
+
+    Args:
+        path (str): Where the corpus was saved by build_corpus.
+
+    Returns: The corpus, one dictionary per puzzle.
+    """
+
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def suite_report(corpus: list[dict] | None = None, repeat: int = 3, presolve: bool = True) -> dict:
+    """ Solves every puzzle in the corpus and measures each one.
+
+    Args:
+        corpus (list[dict] | None): The puzzles, as from load_corpus. Defaults to the saved corpus.
+        repeat (int): How many times to solve each puzzle. The fastest solve is kept.
+        presolve (bool): Whether to use propagation before the SAT solver, as in engine.solve.
+
+    Returns: The metadata of the run (versions, platform and options) and the results, one dictionary per puzzle.
+    """
+
+    if corpus is None:
+        corpus = load_corpus()
+    metadata = {"python": platform.python_version(), "pysat": pysat.__version__, "platform": platform.platform(),
+                "processor": platform.processor(), "repeat": repeat, "presolve": presolve}
+    return {"metadata": metadata, "results": [measure_puzzle(entry, repeat, presolve) for entry in corpus]}
+
+
+def measure_puzzle(entry: dict, repeat: int = 3, presolve: bool = True) -> dict:
+    """ Solves one puzzle from the corpus several times and measures the fastest solve.
+
+    Every solve starts without a layout solver or rule templates, so the whole encoding, including the rules, is
+    measured each time. The peak memory is measured by a separate solve, as tracemalloc slows everything down. It only
+    includes memory allocated by Python, so the clauses held by the SAT solver itself aren't counted.
+
+    Args:
+        entry (dict): The puzzle, as from load_corpus.
+        repeat (int): How many times to solve the puzzle.
+        presolve (bool): Whether to use propagation before the SAT solver.
+
+    Returns: The name, type and grid size of the puzzle, whether it was solved, the backend, the encode, solve and
+        total times (in seconds), the clause, variable, conflict, decision and propagation counts, the peak memory (in
+        bytes) and the time spent in every phase.
+    """
+
+    puzzle = parse_line(entry["puzzle"])
+    sudoku_type = entry["sudoku_type"]
+    constraints = entry["constraints"]
+
+    clear_layout_solvers()
+    solved = solve(puzzle, sudoku_type, constraints, presolve=presolve) is not None
+    fastest = None
+    for _ in range(repeat):
+        clear_layout_solvers()
+        clear_rule_templates()
+        stats = SolveStats()
+        solve(puzzle, sudoku_type, constraints, presolve=presolve, stats=stats)
+        if fastest is None or stats.total_time() < fastest.total_time():
+            fastest = stats
+
+    clear_layout_solvers()
+    clear_rule_templates()
+    tracemalloc.start()
+    solve(puzzle, sudoku_type, constraints, presolve=presolve)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    clear_layout_solvers()
+
+    encode_time = sum(fastest.times.get(phase, 0.0) for phase in ENCODE_PHASES)
+    return {"name": entry["name"], "sudoku_type": sudoku_type, "grid_dim": entry["grid_dim"], "solved": solved,
+            "backend": fastest.backend, "encode_time": encode_time, "solve_time": fastest.total_time() - encode_time,
+            "total_time": fastest.total_time(), "clauses": fastest.counts.get("clauses", 0),
+            "variables": fastest.counts.get("variables", 0), "conflicts": fastest.counts.get("conflicts", 0),
+            "decisions": fastest.counts.get("decisions", 0), "propagations": fastest.counts.get("propagations", 0),
+            "peak_memory": peak_memory, "phases": fastest.times}
+
+
+def compare_report(results: dict, baseline: dict, threshold: float = 1.2) -> list[dict]:
+    """ Compares the results of the suite with a baseline from an earlier run.
+
+    Puzzles are matched by name, and puzzles that are only in one of the two are left out.
+
+    Args:
+        results (dict): The results of this run, from suite_report.
+        baseline (dict): The results of the earlier run, from suite_report (or the JSON file it was saved to).
+        threshold (float): How many times slower (or larger) a puzzle has to be to count as a regression.
+
+    Returns: One dictionary per puzzle, with the ratio of this run to the baseline for each time, count and the peak
+        memory (None if the baseline was 0), and whether the puzzle regressed. A puzzle regresses if its total time
+        is more than threshold times and MIN_REGRESSION_TIME slower, if it has more clauses or variables, or if it was
+        solved in the baseline but not now.
+    """
+
+    baseline_rows = {row["name"]: row for row in baseline["results"]}
+    rows = []
+    for row in results["results"]:
+        if row["name"] not in baseline_rows:
+            continue
+        old_row = baseline_rows[row["name"]]
+        comparison = {"name": row["name"]}
+        for field in ["encode_time", "solve_time", "total_time", "clauses", "variables", "peak_memory"]:
+            comparison[field] = row[field] / old_row[field] if old_row[field] else None
+        slower = row["total_time"] > max(old_row["total_time"] * threshold,
+                                         old_row["total_time"] + MIN_REGRESSION_TIME)
+        larger = row["clauses"] > old_row["clauses"] or row["variables"] > old_row["variables"]
+        comparison["regression"] = slower or larger or (old_row["solved"] and not row["solved"])
+        rows.append(comparison)
+    return rows
+
+
+def print_suite_report(results: dict) -> None:
+    """ Prints the suite results as a table.
+
+    Args:
+        results (dict): The results from suite_report.
+    """
+
+    print("puzzle                   backend     encode (ms)  solve (ms)  clauses  variables  conflicts  peak (KiB)")
+    for row in results["results"]:
+        print(row["name"].ljust(24) + " " + (row["backend"] if row["solved"] else "unsolved").ljust(11)
+              + format(row["encode_time"] * 1000, ".2f").rjust(12) + format(row["solve_time"] * 1000, ".2f").rjust(12)
+              + str(row["clauses"]).rjust(9) + str(row["variables"]).rjust(11) + str(row["conflicts"]).rjust(11)
+              + format(row["peak_memory"] / 1024, ".0f").rjust(12))
+    print("total".ljust(36) + format(sum(row["encode_time"] for row in results["results"]) * 1000, ".2f").rjust(12)
+          + format(sum(row["solve_time"] for row in results["results"]) * 1000, ".2f").rjust(12))
+
+
+def print_comparison(rows: list[dict]) -> None:
+    """ Prints the comparison with the baseline as a table.
+
+    Args:
+        rows (list[dict]): The rows from compare_report.
+    """
+
+    print("puzzle                   encode   solve   total  clauses  variables  peak memory")
+    for row in rows:
+        line = row["name"].ljust(24)
+        for field, width in [("encode_time", 7), ("solve_time", 8), ("total_time", 8), ("clauses", 9),
+                             ("variables", 11), ("peak_memory", 13)]:
+            line = line + ("-" if row[field] is None else format(row[field], ".2f") + "x").rjust(width)
+        print(line + ("  REGRESSION" if row["regression"] else ""))
+    print(str(sum(row["regression"] for row in rows)) + " of " + str(len(rows)) + " puzzles regressed")
+
+
+def scaling_report(grid_dims: list[int] | None = None, seed: int = 0) -> list[dict]:
+    """ Measures how the encoding and solving times grow with the size of the grid.
+
+    A puzzle is generated for each size. The layout solver is built from scratch (encoding the rules and loading them
+    into the SAT solver), then the SAT solver is called twice with the candidates left by propagation as assumptions,
+    the second time with what it learnt from the first. Last, the puzzle is solved as solve does by default. The
+    generated puzzles are solved by propagation, so this shows the cost of the size of the formula rather than of
+    search, which the suite measures.
+
+    Args:
+        grid_dims (list[int] | None): The grid sizes. Defaults to SCALING_DIMS.
+        seed (int): The seed for generating the puzzles.
+
+    Returns: One dictionary per grid size, with the block size, the number of clues, clauses and variables, and the
+        encode, load, SAT (first and second call) and default solve times (in seconds).
+    """
+
+    if grid_dims is None:
+        grid_dims = SCALING_DIMS
+    rows = []
+    for grid_dim in grid_dims:
+        puzzle = generate(grid_dim, "sudoku", seed)[0]
+        masks = propagate(puzzle, "sudoku")
+        clear_layout_solvers()
+        clear_rule_templates()
+        build = SolveStats()
+        layout_solver = get_layout_solver("sudoku", grid_dim, {}, stats=build)
+        first = SolveStats()
+        layout_solver.solve(puzzle, masks, first)
+        second = SolveStats()
+        layout_solver.solve(puzzle, masks, second)
+        default = SolveStats()
+        solve(puzzle, "sudoku", stats=default)
+        clear_layout_solvers()
+
+        block_rows, block_cols = block_dims(grid_dim)
+        rows.append({"grid_dim": grid_dim, "block": str(block_rows) + " x " + str(block_cols),
+                     "clues": sum(1 for row in puzzle for value in row if value),
+                     "clauses": layout_solver.nof_clauses, "variables": layout_solver.top_var,
+                     "encode_time": build.times["encode"], "load_time": build.times["load"],
+                     "sat_time": first.total_time(), "warm_sat_time": second.total_time(),
+                     "solve_time": default.total_time()})
+    return rows
+
+
+def print_scaling_report(rows: list[dict]) -> None:
+    """ Prints the scaling report as a table.
+
+    Args:
+        rows (list[dict]): The rows from scaling_report.
+    """
+
+    print("grid  block   clues    clauses  variables  encode (s)  load (s)  sat (s)  warm sat (s)  solve (s)")
+    for row in rows:
+        print(str(row["grid_dim"]).rjust(4) + "  " + row["block"].ljust(6) + str(row["clues"]).rjust(6)
+              + str(row["clauses"]).rjust(11) + str(row["variables"]).rjust(11)
+              + format(row["encode_time"], ".3f").rjust(12) + format(row["load_time"], ".3f").rjust(10)
+              + format(row["sat_time"], ".3f").rjust(9) + format(row["warm_sat_time"], ".3f").rjust(14)
+              + format(row["solve_time"], ".3f").rjust(11))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """ Runs the reports, or the suite with the options from the command line.
+
+    Args:
+        argv (list[str] | None): The command line arguments, not including the program name. Defaults to sys.argv.
+
+    Returns: The exit status, 1 if any puzzle regressed compared with the baseline, otherwise 0.
+    """
+
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Benchmark the clause creation and the solver. "
+                                                                      "With no options, print the encoding reports.")
+    parser.add_argument("--suite", action="store_true", help="solve and measure every puzzle in the corpus")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="corpus file (default: benchmark_corpus.json)")
+    parser.add_argument("--output", help="file to write the suite results to, as JSON")
+    parser.add_argument("--baseline", help="suite results from an earlier run to compare with")
+    parser.add_argument("--repeat", type=int, default=3, help="solves per puzzle, the fastest is kept (default: 3)")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="how many times slower a puzzle has to be to count as a regression (default: 1.2)")
+    parser.add_argument("--no-presolve", action="store_true", help="skip propagation before the SAT solver")
+    parser.add_argument("--build-corpus", action="store_true", help="generate the corpus file again and exit")
+    parser.add_argument("--scaling", action="store_true", help="measure how the times grow with the grid size")
+    parser.add_argument("--sizes", type=int, nargs="+", help="grid sizes for --scaling (default: 4 to 64)")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.sizes is not None and any(grid_dim not in SUDOKU_GRID_DIMS for grid_dim in args.sizes):
+        parser.error("--sizes must be grid sizes that can be split into blocks, from 4 to " + str(MAX_GRID_DIM))
+
+    if args.build_corpus:
+        print(str(len(build_corpus(args.corpus))) + " puzzles written to " + args.corpus)
+        return 0
+    if args.scaling:
+        print_scaling_report(scaling_report(args.sizes))
+        return 0
+    if not args.suite:
+        print_encoding_report(encoding_report())
+        print()
+        print_load_report(load_report())
+        print()
+        print_cage_report(cage_report())
+        print()
+        print_gt_report(gt_report())
+        return 0
+
+    results = suite_report(load_corpus(args.corpus), args.repeat, not args.no_presolve)
+    print_suite_report(results)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as file:
+            rows = compare_report(results, json.load(file), args.threshold)
+        print()
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
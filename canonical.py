@@ -0,0 +1,295 @@
+""" Recognising standard sudoku puzzles that are symmetries of ones already solved, and answering them from a cache.
+
+A puzzle can be changed without changing how it is solved: the numbers can be relabelled, the bands (rows of blocks)
+and the rows within a band can be reordered, as can the stacks (columns of blocks) and the columns within a stack, and
+a grid with square blocks can be transposed. Every puzzle related in these ways has the same canonical form, the
+smallest grid (with the numbers relabelled in the order they first appear) reachable by them.
+
+Trying every symmetry is far too slow (there are over 3 million orderings of the rows and columns of a 9 x 9 grid), so
+the rows and columns are first sorted by signatures that none of the symmetries change: which cells are filled, how
+often each number occurs, and the same for the columns (or rows) they meet, refined twice. Only orderings that keep
+the signatures sorted are tried, which is usually a handful. A puzzle that would need more than MAX_TRANSFORMS, e.g.
+an almost empty grid, isn't cached.
+
+The solutions are kept in canonical form, and a puzzle with the same canonical form is answered by transforming the
+cached solution back, without encoding or solving anything.
+
+Classes:
+    Transform: The symmetry that takes a puzzle to its canonical form.
+
+Functions:
+    canonical_form: Finds the canonical form of a standard sudoku puzzle and the symmetry that takes it there.
+    lookup_solution: Looks for the solution of a puzzle with the same canonical form.
+    store_solution: Caches the solution of a puzzle in canonical form.
+    clear_canonical_cache: Forgets every cached solution.
+    line_orders: Finds the orderings of the rows (or columns) that keep their signatures sorted.
+    tied_orders: Finds the orderings of some items that keep their signatures sorted.
+    line_signatures: Gives each row and column a signature that the symmetries of the grid don't change.
+"""
+
+from __future__ import annotations
+from itertools import permutations, product
+from math import factorial, prod
+from clause_creation import block_dims
+
+MAX_TRANSFORMS = 2000  # The most orderings tried for one puzzle before giving up on caching it
+MAX_CANONICAL_SOLUTIONS = 100000  # Number of solutions kept in the cache
+REFINEMENTS = 2  # Rounds of refining the row signatures by the column signatures, and the other way round
+_solutions = {}  # Canonical puzzles to their canonical solutions (None if unsolvable), oldest first
+
+
+class Transform:
+    """ The symmetry that takes a puzzle to its canonical form.
+
+    Attributes:
+        grid_dim (int): The side length of the grid.
+        positions (list[int]): The index in the original puzzle of each cell of the canonical grid.
+        labels (list[int]): The canonical label of each number, indexed by the number (labels[0] is 0 for empty cells).
+        numbers (list[int]): The original number of each canonical label, the inverse of labels.
+
+    Methods:
+        to_canonical: Moves and relabels a grid from the original puzzle's layout to the canonical one.
+        from_canonical: Moves and relabels a grid from the canonical layout back to the original puzzle's.
+    """
+
+    def __init__(self, grid_dim: int, row_order: list[int], col_order: list[int], transposed: bool,
+                 labels: list[int]) -> None:
+        """ Initiates Transform.
+
+        Args:
+            grid_dim (int): The side length of the grid.
+            row_order (list[int]): The row (of the grid, after any transposing) that goes in each canonical row.
+            col_order (list[int]): The column that goes in each canonical column.
+            transposed (bool): Whether the grid is transposed first.
+            labels (list[int]): The canonical label of each number that appears in the puzzle, and 0 for the rest.
+        """
+
+        self.grid_dim = grid_dim
+        if transposed:
+            self.positions = [row_order[i] + (col_order[j] * grid_dim) for i in range(grid_dim)
+                              for j in range(grid_dim)]
+        else:
+            self.positions = [(row_order[i] * grid_dim) + col_order[j] for i in range(grid_dim)
+                              for j in range(grid_dim)]
+        # Numbers that aren't in the puzzle take the labels that are left over, in order, as nothing tells them apart
+        self.labels = list(labels)
+        unused_labels = iter(range(max(labels) + 1, grid_dim + 1))
+        for number in range(1, grid_dim + 1):
+            if not self.labels[number]:
+                self.labels[number] = next(unused_labels)
+        self.numbers = [0] * (grid_dim + 1)
+        for number, label in enumerate(self.labels):
+            self.numbers[label] = number
+
+    def to_canonical(self, grid: list[int]) -> tuple[int, ...]:
+        """ Moves and relabels a grid from the original puzzle's layout to the canonical one.
+
+        Args:
+            grid (list[int]): The values of the cells, from left to right, up to down.
+
+        Returns: The values of the cells of the canonical grid.
+        """
+
+        labels = self.labels
+        return tuple(labels[grid[position]] for position in self.positions)
+
+    def from_canonical(self, grid: tuple[int, ...]) -> list[list[int]]:
+        """ Moves and relabels a grid from the canonical layout back to the original puzzle's.
+
+        Args:
+            grid (tuple[int, ...]): The values of the cells of the canonical grid.
+
+        Returns: The grid as a 2D array, in the original puzzle's layout.
+        """
+
+        values = [0] * (self.grid_dim ** 2)
+        for position, label in zip(self.positions, grid):
+            values[position] = self.numbers[label]
+        return [values[r * self.grid_dim:(r + 1) * self.grid_dim] for r in range(self.grid_dim)]
+
+
+def canonical_form(puzzle: list[list[int | str]]) -> tuple[tuple[int, ...], Transform] | None:
+    """ Finds the canonical form of a standard sudoku puzzle and the symmetry that takes it there.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 (or "0") where a cell is empty.
+
+    Returns: The canonical grid, as the values of the cells from left to right, up to down, and the transform. None if
+        finding it would mean trying more than MAX_TRANSFORMS orderings.
+    """
+
+    grid_dim = len(puzzle)
+    block_rows, block_cols = block_dims(grid_dim)
+    values = [int(value) for row in puzzle for value in row]
+    counts = [0] * (grid_dim + 1)
+    for value in values:
+        counts[value] = counts[value] + 1
+    colours = [counts[value] if value else 0 for value in values]  # The same whichever way the numbers are labelled
+
+    orientations = [False, True] if block_rows == block_cols else [False]  # Transposing swaps the shape of the blocks
+    candidates = []
+    for transposed in orientations:
+        if transposed:
+            grid = [values[(c * grid_dim) + r] for r in range(grid_dim) for c in range(grid_dim)]
+            grid_colours = [colours[(c * grid_dim) + r] for r in range(grid_dim) for c in range(grid_dim)]
+        else:
+            grid, grid_colours = values, colours
+        row_signatures, col_signatures = line_signatures(grid_colours, grid_dim, block_rows, block_cols)
+        row_orders = line_orders(row_signatures, block_rows, MAX_TRANSFORMS)
+        col_orders = line_orders(col_signatures, block_cols, MAX_TRANSFORMS)
+        if row_orders is None or col_orders is None:
+            return None
+        candidates.append((transposed, grid, row_orders, col_orders))
+    if sum(len(row_orders) * len(col_orders) for _, _, row_orders, col_orders in candidates) > MAX_TRANSFORMS:
+        return None
+
+    best = None
+    for transposed, grid, row_orders, col_orders in candidates:
+        for row_order in row_orders:
+            rows = [grid[r * grid_dim:(r + 1) * grid_dim] for r in row_order]
+            for col_order in col_orders:
+                labels = [0] * (grid_dim + 1)
+                next_label = 1
+                key = []
+                for row in rows:
+                    for c in col_order:
+                        value = row[c]
+                        if value and not labels[value]:  # Numbers are labelled in the order they first appear
+                            labels[value] = next_label
+                            next_label = next_label + 1
+                        key.append(labels[value])
+                key = tuple(key)
+                if best is None or key < best[0]:
+                    best = (key, row_order, col_order, transposed, labels)
+    key, row_order, col_order, transposed, labels = best
+    return key, Transform(grid_dim, row_order, col_order, transposed, labels)
+
+
+def lookup_solution(form: tuple[tuple[int, ...], Transform]) -> tuple[bool, list[list[int]] | None]:
+    """ Looks for the solution of a puzzle with the same canonical form.
+
+    Args:
+        form (tuple[tuple[int, ...], Transform]): The canonical form of the puzzle, from canonical_form.
+
+    Returns: Whether a puzzle with the same canonical form has been solved, and if so its solution transformed back to
+        this puzzle's layout, or None if it has no solution.
+    """
+
+    key, transform = form
+    if key not in _solutions:
+        return False, None
+    solution = _solutions.pop(key)
+    _solutions[key] = solution  # Most recently used goes last
+    if solution is None:
+        return True, None
+    return True, transform.from_canonical(solution)
+
+
+def store_solution(form: tuple[tuple[int, ...], Transform], solution: list[list[int]] | None) -> None:
+    """ Caches the solution of a puzzle in canonical form.
+
+    Args:
+        form (tuple[tuple[int, ...], Transform]): The canonical form of the puzzle, from canonical_form.
+        solution (list[list[int]] | None): The solution as a 2D array, or None if the puzzle has no solution.
+    """
+
+    key, transform = form
+    if solution is not None:
+        solution = transform.to_canonical([value for row in solution for value in row])
+    if len(_solutions) >= MAX_CANONICAL_SOLUTIONS and key not in _solutions:  # Forget the least recently used
+        _solutions.pop(next(iter(_solutions)))
+    _solutions.pop(key, None)
+    _solutions[key] = solution
+
+
+def clear_canonical_cache() -> None:
+    """ Forgets every cached solution. """
+
+    _solutions.clear()
+
+
+def line_orders(signatures: list[int], group_size: int, cap: int) -> list[list[int]] | None:
+    """ Finds the orderings of the rows (or columns) that keep their signatures sorted.
+
+    The groups (bands or stacks) are sorted by the signatures of their lines, then the lines within each group by
+    their own signatures. Groups or lines with the same signature could go in either order, so every order of them is
+    included.
+
+    Args:
+        signatures (list[int]): The signature of each line.
+        group_size (int): The number of lines in a band or stack.
+        cap (int): The most orderings to return.
+
+    Returns: The orderings, each a list of line indices. None if there would be more than cap.
+    """
+
+    groups = [list(range(start, start + group_size)) for start in range(0, len(signatures), group_size)]
+    group_signatures = [tuple(sorted(signatures[line] for line in group)) for group in groups]
+    group_orders = tied_orders(list(range(len(groups))), group_signatures, cap)
+    line_orders_in_groups = [tied_orders(group, signatures, cap) for group in groups]
+    if group_orders is None or None in line_orders_in_groups:
+        return None
+    if len(group_orders) * prod(len(orders) for orders in line_orders_in_groups) > cap:
+        return None
+    return [[line for part in parts for line in part] for group_order in group_orders
+            for parts in product(*(line_orders_in_groups[group] for group in group_order))]
+
+
+def tied_orders(items: list[int], signatures: list, cap: int) -> list[list[int]] | None:
+    """ Finds the orderings of some items that keep their signatures sorted.
+
+    Args:
+        items (list[int]): The items, indices into signatures.
+        signatures (list): The signature of every item.
+        cap (int): The most orderings to return.
+
+    Returns: Every ordering of the items in which the signatures are sorted, so items with the same signature are in
+        every order. None if there would be more than cap.
+    """
+
+    ordered = sorted(items, key=lambda item: signatures[item])
+    runs = []
+    for item in ordered:
+        if runs and signatures[runs[-1][0]] == signatures[item]:
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+    if prod(factorial(len(run)) for run in runs) > cap:
+        return None
+    return [[item for run in run_orders for item in run] for run_orders in product(*(permutations(run)
+                                                                                        for run in runs))]
+
+
+def line_signatures(colours: list[int], grid_dim: int, block_rows: int, block_cols: int) -> tuple[list[int], list[int]]:
+    """ Gives each row and column a signature that the symmetries of the grid don't change.
+
+    A row's signature is made from the colours of its cells (how often the number in the cell occurs in the puzzle, or
+    0 if it is empty) paired with the signatures of their columns, grouped by stack and sorted, so it doesn't depend on
+    the order of the columns or how the numbers are labelled. The columns are done the same way with the rows. Each
+    round replaces the signatures with their rank, so they stay small.
+
+    Args:
+        colours (list[int]): The colour of each cell.
+        grid_dim (int): The side length of the grid.
+        block_rows (int): The number of rows in a block, and so in a band.
+        block_cols (int): The number of columns in a block, and so in a stack.
+
+    Returns: The signatures of the rows and of the columns.
+    """
+
+    row_signatures = [0] * grid_dim
+    col_signatures = [0] * grid_dim
+    for _ in range(REFINEMENTS):
+        rows = [tuple(sorted(tuple(sorted((colours[(r * grid_dim) + c], col_signatures[c])
+                                          for c in range(stack, stack + block_cols)))
+                             for stack in range(0, grid_dim, block_cols)))
+                for r in range(grid_dim)]
+        cols = [tuple(sorted(tuple(sorted((colours[(r * grid_dim) + c], row_signatures[r])
+                                          for r in range(band, band + block_rows)))
+                             for band in range(0, grid_dim, block_rows)))
+                for c in range(grid_dim)]
+        row_ranks = {signature: rank for rank, signature in enumerate(sorted(set(rows)))}
+        col_ranks = {signature: rank for rank, signature in enumerate(sorted(set(cols)))}
+        row_signatures = [row_ranks[signature] for signature in rows]
+        col_signatures = [col_ranks[signature] for signature in cols]
+    return row_signatures, col_signatures
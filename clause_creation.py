@@ -1,143 +1,455 @@
 """ Creating the clauses for use with the SAT solver.
 
+Classes:
+    ClauseTemplate: The clauses for the rules of a type of puzzle, which are the same whatever numbers are in the
+        puzzle.
+    VarMap: The variables for the numbers in the cells of a grid, with lookups both ways and decoding of models.
+
 Functions:
     define_clauses: Defines the clauses for different sorts of sudoku puzzle.
+    stream_clauses: Generates the clauses for a puzzle one at a time, without collecting them into a formula.
     define_standard_clauses: Creates clauses for standard sudoku rules.
-    blocks_rule: Creates clauses to check that every number occurs at most once per block, for a specific block.
-    two_neg_clauses: Creates two negated variables as a CNF clause.
+    given_clauses: Creates clauses for the known values in the puzzle.
+    rule_template: Gets the rule clauses for a grid size and type of puzzle, building them only the first time they
+        are needed.
+    build_rule_template: Builds the rule clauses for a grid size and type of puzzle.
+    clear_rule_templates: Drops all the kept rule templates, so the next template for every grid size is built from
+        scratch.
+    choose_encoding: Works out which at-most-one encoding to use.
+    standard_rule_clauses: Creates the clauses for the standard sudoku rules, without any of the known values.
+    rule_clause_groups: Generates the clauses for the standard sudoku rules a row of cells or a unit at a time, so that
+        they can be used without all being kept in memory.
+    hyper_rule_clauses: Creates the clauses for the four extra blocks of a hyper sudoku puzzle.
+    block_cells: Lists the cells in a block.
+    unit_rule: Creates clauses to check that every number occurs at most once in a row, column or block.
+    at_most_one: Creates clauses so that at most one of the variables is true.
+    product_at_most_one: Creates the product encoding of at-most-one.
     ncr_to_var: Converts a combination of a number, a column and a row to a unique identifier.
-    col_row_mod: Numbers a cell from 0 to (grid_dim - 1) within a block, from left to right, up to down.
+    get_var_map: Gets the variable map for a grid size, creating it the first time it is needed.
+    block_dims: Works out the size of a block.
     define_killer_sudoku_clauses: Creates clauses for a killer sudoku puzzle.
+    cage_combination_clauses: Creates clauses for the total of a killer sudoku cage from the sets of numbers that can
+        fill it.
+    combination_table: Lists the sets of different numbers from 1 to 9 with each size and total.
+    cage_combinations: Gets the sets of different numbers that can fill a killer sudoku cage.
+    cage_permutations: Generates the orders the numbers in a killer sudoku cage can be in.
     define_hyper_sudoku_clauses: Creates clauses for a hyper sudoku puzzle.
     define_gt_sudoku_clauses: Creates clauses for a greater than sudoku puzzle.
+    inequality_clauses: Creates clauses so that one cell is greater than another, without auxiliary variables.
     dnf_to_cnf: Converts a DNF clause to CNF.
 """
 
 from __future__ import annotations
-from math import sqrt
+from functools import lru_cache
+from itertools import combinations, permutations
+from math import ceil, isqrt, sqrt
+import numpy as np
+from pysat.card import CardEnc, EncType
 from typing import TYPE_CHECKING
 from misc_funcs import i_to_rc
+from solve_stats import timed
+
 if TYPE_CHECKING:
-    from initial_setup import App
-    from solve import SatSolver
+    from collections.abc import Iterator, Sequence
+    from solve_stats import SolveStats
+
+MAX_GRID_DIM = 64  # The largest grid, which has 262144 cell variables
+# The grid sizes that can be split into blocks, which is every side length up to MAX_GRID_DIM that isn't prime
+GRID_DIMS = [grid_dim for grid_dim in range(4, MAX_GRID_DIM + 1)
+             if any(grid_dim % block_rows == 0 for block_rows in range(2, isqrt(grid_dim) + 1))]
+
+MAX_RULE_TEMPLATES = 8  # Number of rule templates kept in memory at once
+# The largest grid whose rule template is kept. A 36 x 36 template is about 400000 clauses and a 64 x 64 one millions,
+# and the layout solver that uses a template has its own copy of the clauses anyway
+MAX_TEMPLATE_DIM = 25
+_rule_templates = {}  # Keys are the arguments of rule_template, oldest first
+
+# Hyper sudoku is only defined for 9 x 9 grids, where its four extra blocks start at these columns and rows: top left,
+# bottom left, top right and bottom right
+HYPER_GRID_DIM = 9
+HYPER_BLOCKS = [(1, 1), (1, 5), (5, 1), (5, 5)]
+
+# Encodings for "every number occurs at most once" in a row, column or block. Pairwise needs no auxiliary variables but
+# has O(grid_dim ** 4) clauses, the others need auxiliary variables but far fewer clauses for large grids.
+AMO_ENCODINGS = ["pairwise", "seqcounter", "ladder", "bitwise", "totalizer", "product"]
+
+# Encodings for killer sudoku cage totals. Combination has one auxiliary variable per set of numbers that can fill a
+# cage, permutation has one per order of those numbers, which for a large cage is hundreds of thousands.
+CAGE_ENCODINGS = ["combination", "permutation"]
 
+# Encodings for greater than sudoku inequalities. Order uses binary implications between the two cells and no auxiliary
+# variables, tseitin has an auxiliary variable for each of the 36 pairs of numbers that satisfy an inequality.
+GT_ENCODINGS = ["order", "tseitin"]
 
-def define_clauses(puzzle: list[list[str]], sat_solver: SatSolver, root: App) -> None:
+
+def define_clauses(puzzle: list[list[str]], sudoku_type: str, grid_dim: int, constraints: dict,
+                   encoding: str = "auto", stats: SolveStats | None = None) -> list[list[int]]:
     """ Defines the clauses for different sorts of sudoku puzzle.
 
+    The clauses are collected into one formula, so that they can be given to the SAT solver all at once.
+
     Args:
         puzzle (list[list[str]]): The sudoku puzzle input stored as a 2D array of strings.
-        sat_solver (SatSolver): The SAT solver.
-        root (App): The app, contains some of the data needed to define clauses.
+        sudoku_type (str): The type of puzzle, e.g. "sudoku" or "killer_sudoku".
+        grid_dim (int): The side length of the sudoku grid.
+        constraints (dict): The data specific to the type of puzzle, i.e. ks_cages and ks_totals for killer sudoku,
+            horizontal_greater and vertical_greater for greater than sudoku. Killer sudoku can also have ks_encoding,
+            one of CAGE_ENCODINGS, and greater than sudoku gt_encoding, one of GT_ENCODINGS.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        stats (SolveStats | None): Where to record the time spent on each part of the formula, if anywhere.
+
+    Returns: The formula as a list of clauses.
     """
 
-    sudoku_type = root.puzzle_config.puzzle_type.get()
-    grid_dim = root.puzzle_config.grid_dim
-
+    formula = []
     if sudoku_type == "sudoku":
-        define_standard_clauses(puzzle, sat_solver, grid_dim)
+        define_standard_clauses(puzzle, formula, grid_dim, encoding, stats)
     if sudoku_type == "killer_sudoku":
-        define_killer_sudoku_clauses(puzzle, sat_solver, root)
+        define_killer_sudoku_clauses(puzzle, formula, constraints["ks_cages"], constraints["ks_totals"], encoding,
+                                     constraints.get("ks_encoding", "combination"), stats)
     if sudoku_type == "hyper_sudoku":
-        define_hyper_sudoku_clauses(puzzle, sat_solver)
+        define_hyper_sudoku_clauses(puzzle, formula, encoding, stats)
     if sudoku_type == "greater_than_sudoku":
-        define_gt_sudoku_clauses(puzzle, sat_solver, root)
+        define_gt_sudoku_clauses(puzzle, formula, constraints["horizontal_greater"], constraints["vertical_greater"],
+                                 encoding, constraints.get("gt_encoding", "order"), stats)
+    return formula
 
 
-def define_standard_clauses(puzzle: list[list[str]], sat_solver: SatSolver, grid_dim: int) -> None:
+def stream_clauses(puzzle: list[list[str]], sudoku_type: str, grid_dim: int, constraints: dict,
+                   encoding: str = "auto") -> Iterator[Sequence[int]]:
+    """ Generates the clauses for a puzzle one at a time, without collecting them into a formula.
+
+    The rule clauses are created a unit at a time (see rule_clause_groups) rather than taken from the rule template, so
+    even for a 64 x 64 grid neither a list of the whole formula nor a template is kept. Killer and greater than sudoku
+    clauses are created as in define_clauses, as they are only 9 x 9.
+
+    Args:
+        puzzle (list[list[str]]): The sudoku puzzle as a 2D array.
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the sudoku grid.
+        constraints (dict): The data specific to the type of puzzle, as for define_clauses.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+
+    Yields: The clauses, in the same order as define_clauses. Raises ValueError for a hyper sudoku grid that isn't
+        HYPER_GRID_DIM x HYPER_GRID_DIM.
+    """
+
+    if sudoku_type in ("sudoku", "hyper_sudoku"):
+        if sudoku_type == "hyper_sudoku" and grid_dim != HYPER_GRID_DIM:
+            raise ValueError("Hyper sudoku puzzles must be " + str(HYPER_GRID_DIM) + " x " + str(HYPER_GRID_DIM) + ".")
+        yield from given_clauses(puzzle, grid_dim)
+        encoding = choose_encoding(grid_dim, encoding)
+        top_var = grid_dim ** 3
+        for clauses, top_var in rule_clause_groups(grid_dim, encoding):
+            yield from clauses
+        if sudoku_type == "hyper_sudoku":
+            yield from hyper_rule_clauses(encoding, top_var)[0]
+    else:
+        yield from define_clauses(puzzle, sudoku_type, grid_dim, constraints, encoding)
+
+
+def define_standard_clauses(puzzle: list[list[str]], formula: list[list[int]], grid_dim: int,
+                            encoding: str = "auto", stats: SolveStats | None = None) -> None:
     """ Creates clauses for standard sudoku rules.
 
+    The rules themselves come from the cached rule template, so only the clauses for the known values are created here.
+
+    Args:
+        puzzle (list[list[str]]): The sudoku puzzle stored as a 2D array of strings.
+        formula (list[list[int]]): The formula the clauses are added to.
+        grid_dim (int): The side length of the sudoku grid. One of GRID_DIMS.
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS or "auto".
+        stats (SolveStats | None): Where to record the time spent on the givens and the rules, if anywhere.
+    """
+
+    with timed(stats, "encode_givens"):
+        formula.extend(given_clauses(puzzle, grid_dim))
+    with timed(stats, "encode_rules"):
+        formula.extend(rule_template(grid_dim, "sudoku", encoding).clauses)
+
+
+def given_clauses(puzzle: list[list[str]], grid_dim: int) -> list[list[int]]:
+    """ Creates clauses for the known values in the puzzle.
+
     Args:
         puzzle (list[list[str]]): The sudoku puzzle stored as a 2D array of strings.
-        sat_solver (SatSolver): The SAT solver.
-        grid_dim (int): The side length of the sudoku grid. Takes the value of 4, 6, 9, 16 or 25.
+        grid_dim (int): The side length of the sudoku grid.
+
+    Returns: A unit clause for every cell that has a value.
     """
 
-    # Clauses for known values in the puzzle
+    clauses = []
     for r in range(grid_dim):
         for c in range(grid_dim):
             if int(puzzle[r][c]) != 0:
-                sat_solver.add_clause([ncr_to_var(int(puzzle[r][c]), c, r, grid_dim)])
+                clauses.append([ncr_to_var(int(puzzle[r][c]), c, r, grid_dim)])
+    return clauses
+
+
+class ClauseTemplate:
+    """ The clauses for the rules of a type of puzzle, which are the same whatever numbers are in the puzzle.
+
+    Attributes:
+        clauses (tuple[tuple[int, ...], ...]): The rule clauses. Tuples, so the template can't be changed once built.
+        encoding (str): The at-most-one encoding used by the clauses.
+        grid_dim (int): The side length of the sudoku grid.
+        sudoku_type (str): The type of puzzle the rules are for, either "sudoku" or "hyper_sudoku".
+        top_var (int): The largest variable used by the clauses. Variables above grid_dim ** 3 are auxiliary variables
+            of the at-most-one encoding, so any other auxiliary variables have to start after top_var.
+    """
+
+    def __init__(self, grid_dim: int, sudoku_type: str, encoding: str, clauses: tuple[tuple[int, ...], ...],
+                 top_var: int) -> None:
+        """ Initiates ClauseTemplate. """
+
+        self.grid_dim = grid_dim
+        self.sudoku_type = sudoku_type
+        self.encoding = encoding
+        self.clauses = clauses
+        self.top_var = top_var
+
+
+def rule_template(grid_dim: int, sudoku_type: str = "sudoku", encoding: str = "auto") -> ClauseTemplate:
+    """ Gets the rule clauses for a grid size and type of puzzle, building them only the first time they are needed.
+
+    The MAX_RULE_TEMPLATES most recently used templates are kept, except for grids larger than MAX_TEMPLATE_DIM, whose
+    templates are built every time rather than kept in memory.
+
+    Args:
+        grid_dim (int): The side length of the sudoku grid.
+        sudoku_type (str): "hyper_sudoku" to include the extra hyper sudoku blocks, otherwise "sudoku".
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS or "auto".
+
+    Returns: The template, shared between calls with the same arguments while it is kept. Raises ValueError for a hyper
+        sudoku grid that isn't HYPER_GRID_DIM x HYPER_GRID_DIM, as the extra blocks are only defined for that size.
+    """
+
+    key = (grid_dim, sudoku_type, encoding)
+    if key in _rule_templates:
+        template = _rule_templates.pop(key)
+    else:
+        template = build_rule_template(grid_dim, sudoku_type, encoding)
+        if grid_dim > MAX_TEMPLATE_DIM:
+            return template
+        if len(_rule_templates) >= MAX_RULE_TEMPLATES:  # Drop the least recently used template
+            _rule_templates.pop(next(iter(_rule_templates)))
+    _rule_templates[key] = template  # Most recently used goes last
+    return template
+
+
+def build_rule_template(grid_dim: int, sudoku_type: str = "sudoku", encoding: str = "auto") -> ClauseTemplate:
+    """ Builds the rule clauses for a grid size and type of puzzle.
+
+    Args:
+        grid_dim (int): The side length of the sudoku grid.
+        sudoku_type (str): "hyper_sudoku" to include the extra hyper sudoku blocks, otherwise "sudoku".
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS or "auto".
+
+    Returns: The template. Raises ValueError for a hyper sudoku grid that isn't HYPER_GRID_DIM x HYPER_GRID_DIM.
+    """
+
+    if sudoku_type == "hyper_sudoku" and grid_dim != HYPER_GRID_DIM:
+        raise ValueError("Hyper sudoku puzzles must be " + str(HYPER_GRID_DIM) + " x " + str(HYPER_GRID_DIM) + ".")
+    encoding = choose_encoding(grid_dim, encoding)
+    clauses, top_var = standard_rule_clauses(grid_dim, encoding)
+    if sudoku_type == "hyper_sudoku":
+        hyper_clauses, top_var = hyper_rule_clauses(encoding, top_var)
+        clauses = clauses + hyper_clauses
+    return ClauseTemplate(grid_dim, sudoku_type, encoding, tuple(tuple(clause) for clause in clauses), top_var)
+
+
+def clear_rule_templates() -> None:
+    """ Drops all the kept rule templates, so the next template for every grid size is built from scratch. """
+
+    _rule_templates.clear()
+
+
+def choose_encoding(grid_dim: int, encoding: str) -> str:
+    """ Works out which at-most-one encoding to use.
+
+    Args:
+        grid_dim (int): The side length of the sudoku grid.
+        encoding (str): One of AMO_ENCODINGS, or "auto" to pick one based on the size of the grid.
+
+    Returns: The name of the encoding.
+    """
+
+    if encoding == "auto":
+        if grid_dim <= 9:  # Pairwise is small enough, and the solver propagates it best
+            return "pairwise"
+        return "seqcounter"
+    if encoding not in AMO_ENCODINGS:
+        raise ValueError("Unknown at-most-one encoding: " + str(encoding))
+    return encoding
+
+
+def standard_rule_clauses(grid_dim: int, encoding: str = "pairwise") -> tuple[list[list[int]], int]:
+    """ Creates the clauses for the standard sudoku rules, without any of the known values.
+
+    Args:
+        grid_dim (int): The side length of the sudoku grid. One of GRID_DIMS.
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS.
+
+    Returns: The clauses as a list of lists of integers, and the largest variable used.
+    """
+
+    clauses = []
+    top_var = grid_dim ** 3
+    for group_clauses, top_var in rule_clause_groups(grid_dim, encoding):
+        clauses.extend(group_clauses)
+    return clauses, top_var
+
+
+def rule_clause_groups(grid_dim: int, encoding: str = "pairwise") -> Iterator[tuple[list[list[int]], int]]:
+    """ Generates the clauses for the standard sudoku rules a row of cells or a unit at a time, so that they can be
+    used without all being kept in memory.
+
+    Args:
+        grid_dim (int): The side length of the sudoku grid. One of GRID_DIMS.
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS.
+
+    Yields: The clauses for each row of cells, then each row, column and block, along with the largest variable used so
+        far.
+    """
+
+    top_var = grid_dim ** 3  # Auxiliary variables go after the cell variables
 
     # Each cell gets at least one number
     for r in range(grid_dim):
+        row_clauses = []
         for c in range(grid_dim):
             clause_temp = []
             for n in range(1, grid_dim + 1):
                 clause_temp.append(ncr_to_var(n, c, r, grid_dim))
-            sat_solver.add_clause(clause_temp)
+            row_clauses.append(clause_temp)
+        yield row_clauses, top_var
 
     # Every number occurs at most once per row
     for r in range(grid_dim):
-        for n in range(1, grid_dim + 1):
-            for c in range(grid_dim - 1):
-                for c_prime in range(c + 1, grid_dim):
-                    sat_solver.add_clause(two_neg_clauses(n, c, r, n, c_prime, r, grid_dim))
+        unit_clauses, top_var = unit_rule([(c, r) for c in range(grid_dim)], grid_dim, encoding, top_var)
+        yield unit_clauses, top_var
 
     # Every number occurs at most one per column
     for c in range(grid_dim):
-        for n in range(1, grid_dim + 1):
-            for r in range(grid_dim - 1):
-                for r_prime in range(r + 1, grid_dim):
-                    sat_solver.add_clause(two_neg_clauses(n, c, r, n, c, r_prime, grid_dim))
+        unit_clauses, top_var = unit_rule([(c, r) for r in range(grid_dim)], grid_dim, encoding, top_var)
+        yield unit_clauses, top_var
 
     # Every number occurs at most once per block
-    if grid_dim == 6:
-        for r in range(0, grid_dim, 2):
-            for c in range(0, grid_dim, 3):
-                blocks_rule(sat_solver, c, r, grid_dim)
-    else:
-        sr_dim = int(sqrt(grid_dim))
-        for r in range(0, grid_dim, sr_dim):
-            for c in range(0, grid_dim, sr_dim):
-                blocks_rule(sat_solver, c, r, grid_dim)
+    block_rows, block_cols = block_dims(grid_dim)
+    for r in range(0, grid_dim, block_rows):
+        for c in range(0, grid_dim, block_cols):
+            unit_clauses, top_var = unit_rule(block_cells(c, r, grid_dim), grid_dim, encoding, top_var)
+            yield unit_clauses, top_var
 
 
-def blocks_rule(sat_solver: SatSolver, start_col: int, start_row: int, grid_dim: int) -> None:
-    """ Creates clauses to check that every number occurs at most once per block, for a specific block.
+def hyper_rule_clauses(encoding: str = "pairwise", top_var: int = HYPER_GRID_DIM ** 3) -> tuple[list[list[int]], int]:
+    """ Creates the clauses for the four extra blocks of a hyper sudoku puzzle, which is always 9 x 9.
+
+    Args:
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS.
+        top_var (int): The largest variable used so far.
+
+    Returns: The clauses as a list of lists of integers, and the largest variable used.
+    """
+
+    clauses = []
+    for start_col, start_row in HYPER_BLOCKS:
+        unit_clauses, top_var = unit_rule(block_cells(start_col, start_row, HYPER_GRID_DIM), HYPER_GRID_DIM, encoding,
+                                          top_var)
+        clauses.extend(unit_clauses)
+    return clauses, top_var
+
+
+def block_cells(start_col: int, start_row: int, grid_dim: int) -> list[tuple[int, int]]:
+    """ Lists the cells in a block.
 
     Args:
-        sat_solver (SatSolver): The SAT solver.
         start_col (int): The column of the top left most cell in the block.
         start_row (int): The row of the top left most cell in the block.
-        grid_dim (int): The side length of the sudoku grid. Takes the value of 4, 6, 9, 16 or 25.
+        grid_dim (int): The side length of the sudoku grid. One of GRID_DIMS.
+
+    Returns: The column and row of each cell, from left to right, up to down.
     """
 
-    if grid_dim == 6:
-        for n in range(1, 7):
-            for r in range(start_row, start_row + 2):
-                for c in range(start_col, start_col + 3):
-                    for r_prime in range(start_row, start_row + 2):
-                        for c_prime in range(start_col, start_col + 3):
-                            if col_row_mod(c, r, grid_dim) < col_row_mod(c_prime, r_prime, grid_dim):
-                                sat_solver.add_clause(two_neg_clauses(n, c, r, n, c_prime, r_prime, grid_dim))
-    else:
-        sr_dim = int(sqrt(grid_dim))
-        for n in range(1, grid_dim + 1):
-            for r in range(start_row, start_row + sr_dim):
-                for c in range(start_col, start_col + sr_dim):
-                    for r_prime in range(start_row, start_row + sr_dim):
-                        for c_prime in range(start_col, start_col + sr_dim):
-                            if col_row_mod(c, r, grid_dim) < col_row_mod(c_prime, r_prime, grid_dim):
-                                sat_solver.add_clause(two_neg_clauses(n, c, r, n, c_prime, r_prime, grid_dim))
+    block_rows, block_cols = block_dims(grid_dim)
+    cells = []
+    for r in range(start_row, start_row + block_rows):
+        for c in range(start_col, start_col + block_cols):
+            cells.append((c, r))
+    return cells
+
+
+def unit_rule(cells: list[tuple[int, int]], grid_dim: int, encoding: str,
+              top_var: int) -> tuple[list[list[int]], int]:
+    """ Creates clauses to check that every number occurs at most once in a row, column or block.
+
+    Args:
+        cells (list[tuple[int, int]]): The column and row of each cell in the row, column or block.
+        grid_dim (int): The side length of the sudoku grid.
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS.
+        top_var (int): The largest variable used so far.
+
+    Returns: The clauses as a list of lists of integers, and the largest variable used.
+    """
 
+    clauses = []
+    for n in range(1, grid_dim + 1):
+        number_clauses, top_var = at_most_one([ncr_to_var(n, c, r, grid_dim) for c, r in cells], encoding, top_var)
+        clauses.extend(number_clauses)
+    return clauses, top_var
 
-def two_neg_clauses(n1: int, c1: int, r1: int, n2: int, c2: int, r2: int, grid_dim: int) -> list[int]:
-    """ Creates two negated variables as a CNF clause.
+
+def at_most_one(lits: list[int], encoding: str, top_var: int) -> tuple[list[list[int]], int]:
+    """ Creates clauses so that at most one of the variables is true.
 
     Args:
-        n1 (int): The number of the first cell.
-        c1 (int): The column of the first cell.
-        r1 (int): The row of the first cell.
-        n2 (int): The number of the second cell.
-        c2 (int): The column of the second cell.
-        r2 (int): The row of the second cell.
-        grid_dim (int): The side length of the sudoku grid. Takes the value of 4, 6, 9, 16 or 25.
-
-    Returns: Two negated variables as a list of integers, to be added to the DIMACS file.
+        lits (list[int]): The variables.
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS.
+        top_var (int): The largest variable used so far. Any auxiliary variables are numbered after it.
+
+    Returns: The clauses as a list of lists of integers, and the largest variable used.
     """
 
-    return [- ncr_to_var(n1, c1, r1, grid_dim), - ncr_to_var(n2, c2, r2, grid_dim)]
+    if encoding == "pairwise" or len(lits) < 2:
+        clauses = []
+        for i in range(len(lits) - 1):
+            for j in range(i + 1, len(lits)):
+                clauses.append([- lits[i], - lits[j]])
+        return clauses, top_var
+    if encoding == "product":
+        return product_at_most_one(lits, top_var)
+    cnf = CardEnc.atmost(lits=lits, bound=1, top_id=top_var, encoding=getattr(EncType, encoding))
+    return cnf.clauses, max(cnf.nv, top_var)
+
+
+def product_at_most_one(lits: list[int], top_var: int) -> tuple[list[list[int]], int]:
+    """ Creates the product encoding of at-most-one.
+
+    The variables are laid out in a grid. Each variable implies its row's and its column's auxiliary variable, and at
+    most one row and one column variable can be true, so at most one of the variables can be true.
+
+    Args:
+        lits (list[int]): The variables.
+        top_var (int): The largest variable used so far.
+
+    Returns: The clauses as a list of lists of integers, and the largest variable used.
+    """
+
+    if len(lits) <= 4:
+        return at_most_one(lits, "pairwise", top_var)
+    row_count = ceil(sqrt(len(lits)))
+    col_count = ceil(len(lits) / row_count)
+    row_vars = list(range(top_var + 1, top_var + row_count + 1))
+    col_vars = list(range(top_var + row_count + 1, top_var + row_count + col_count + 1))
+    top_var = top_var + row_count + col_count
+
+    clauses = []
+    for i in range(len(lits)):
+        clauses.append([- lits[i], row_vars[i // col_count]])
+        clauses.append([- lits[i], col_vars[i % col_count]])
+    row_clauses, top_var = product_at_most_one(row_vars, top_var)
+    col_clauses, top_var = product_at_most_one(col_vars, top_var)
+    return clauses + row_clauses + col_clauses, top_var
 
 
 def ncr_to_var(number: int, column: int, row: int, grid_dim: int) -> int:
@@ -147,7 +459,7 @@ def ncr_to_var(number: int, column: int, row: int, grid_dim: int) -> int:
         number (int): The cell's number.
         column (int): The cell's column.
         row (int): The cell's row.
-        grid_dim (int): The side length of the sudoku grid. Takes the value of 4, 6, 9, 16 or 25.
+        grid_dim (int): The side length of the sudoku grid. One of GRID_DIMS.
 
     Returns: an integer to be used as a variable in the DIMACs file.
     """
@@ -155,337 +467,553 @@ def ncr_to_var(number: int, column: int, row: int, grid_dim: int) -> int:
     return int(number + (grid_dim * column) + ((grid_dim ** 2) * row))
 
 
-def col_row_mod(column: int, row: int, grid_dim: int) -> int:
-    """ Numbers a cell from 0 to (grid_dim - 1) within a block, from left to right, up to down.
+class VarMap:
+    """ The variables for the numbers in the cells of a grid, with lookups both ways and decoding of models.
+
+    The variables are numbered as in ncr_to_var, so they are 1 to grid_dim ** 3, and every auxiliary variable comes
+    after them. Models are decoded by the variable in each literal rather than by counting through the model, so a
+    cell's value doesn't depend on the literals before it.
+
+    Attributes:
+        cell_vars (np.ndarray): The variable for each number in each cell, with shape (grid_dim, grid_dim, grid_dim)
+            and indexed by row, column and number - 1.
+        grid_dim (int): The side length of the grid.
+        top_var (int): The highest cell variable, grid_dim ** 3.
+
+    Methods:
+        var: Gets the variable for a number in a cell.
+        ncr: Gets the number, column and row of a variable.
+        is_cell_var: Checks whether a variable is for a number in a cell rather than an auxiliary variable.
+        given_vars: Gets the variables for the known values in a puzzle held in a NumPy array.
+        decode: Converts a model into the values of the cells.
+        decode_array: Converts a model into the values of the cells as a NumPy array.
+    """
+
+    def __init__(self, grid_dim: int) -> None:
+        """ Initiates VarMap. """
+
+        self.grid_dim = grid_dim
+        self.top_var = grid_dim ** 3
+        self.cell_vars = np.zeros((grid_dim, grid_dim, grid_dim), dtype=np.int64)
+        self._ncr = [(0, 0, 0)] * (self.top_var + 1)  # Indexed by variable, so the reverse lookup is one step
+        for r in range(grid_dim):
+            for c in range(grid_dim):
+                for n in range(1, grid_dim + 1):
+                    var = ncr_to_var(n, c, r, grid_dim)
+                    self.cell_vars[r, c, n - 1] = var
+                    self._ncr[var] = (n, c, r)
+
+    def var(self, number: int, column: int, row: int) -> int:
+        """ Gets the variable for a number in a cell.
+
+        Args:
+            number (int): The number, from 1 to grid_dim.
+            column (int): The cell's column.
+            row (int): The cell's row.
+
+        Returns: The variable.
+        """
+
+        return int(self.cell_vars[row, column, number - 1])
+
+    def ncr(self, var: int) -> tuple[int, int, int]:
+        """ Gets the number, column and row of a variable.
+
+        Args:
+            var (int): The variable, or a literal of it.
+
+        Returns: The number, the column and the row. Raises ValueError for an auxiliary variable.
+        """
+
+        if not self.is_cell_var(var):
+            raise ValueError(str(var) + " isn't the variable of a number in a cell.")
+        return self._ncr[abs(var)]
+
+    def is_cell_var(self, var: int) -> bool:
+        """ Checks whether a variable is for a number in a cell rather than an auxiliary variable.
+
+        Args:
+            var (int): The variable, or a literal of it.
+
+        Returns: True if it is a cell variable.
+        """
+
+        return 0 < abs(var) <= self.top_var
+
+    def given_vars(self, puzzle: np.ndarray) -> list[int]:
+        """ Gets the variables for the known values in a puzzle held in a NumPy array.
+
+        Args:
+            puzzle (np.ndarray): The puzzle, with shape (grid_dim, grid_dim) and 0 where a cell is empty.
+
+        Returns: The variable for the value of every cell that has one, e.g. to use as assumptions.
+        """
+
+        rows, columns = np.nonzero(puzzle)
+        return self.cell_vars[rows, columns, puzzle[rows, columns].astype(np.int64) - 1].tolist()
+
+    def decode(self, model: list[int], masks: list[int] | None = None) -> list[int]:
+        """ Converts a model into the values of the cells.
+
+        Args:
+            model (list[int]): The model from the SAT solver, as for decode_array.
+            masks (list[int] | None): The candidates of each cell from propagation, as for decode_array.
+
+        Returns: The value of each cell, from left to right, up to down, with 0 for a cell with no true variable.
+        """
+
+        return self.decode_array(model, masks).ravel().tolist()
+
+    def decode_array(self, model: list[int], masks: list[int] | None = None) -> np.ndarray:
+        """ Converts a model into the values of the cells as a NumPy array.
+
+        The true cell variables are looked up in cell_vars to give a (grid_dim, grid_dim, grid_dim) array of booleans,
+        and the value of each cell is the number with the true variable, found with argmax.
+
+        Args:
+            model (list[int]): The model from the SAT solver, e.g. [-1, 2, -3, ...]. Only the literals of cell variables
+                are used, and variables missing from the model count as false.
+            masks (list[int] | None): The candidates of each cell from propagation, for a model of a residual formula.
+                If given, only the candidates of a cell can be true and cells with one candidate have that value.
+
+        Returns: The value of each cell, with shape (grid_dim, grid_dim), and 0 for a cell with no true variable.
+        """
+
+        # Only the true variables are converted to an array, as converting the whole of a long model costs more than
+        # the rest of the decoding. Cell variables come first in pysat's models, so the rest of the model is skipped.
+        true_vars = np.array([var for var in model[:self.top_var] if var > 0], dtype=np.int64)
+        truth = np.zeros(self.top_var + 1, dtype=bool)
+        truth[true_vars[true_vars <= self.top_var]] = True
+        cube = truth[self.cell_vars]
+        if masks is not None:
+            candidates = (np.asarray(masks, dtype=np.int64)[:, None] >> np.arange(self.grid_dim)) & 1
+            candidates = candidates.astype(bool).reshape(cube.shape)
+            single = candidates.sum(axis=2) == 1
+            cube = np.where(single[:, :, None], candidates, cube & candidates)
+        return np.where(cube.any(axis=2), cube.argmax(axis=2) + 1, 0)
+
+
+@lru_cache(maxsize=None)
+def get_var_map(grid_dim: int) -> VarMap:
+    """ Gets the variable map for a grid size, creating it the first time it is needed.
 
     Args:
-        column (int): The cell's column.
-        row (int): The cell's row.
-        grid_dim: The side length of the sudoku grid. Takes the value of 4, 6, 9, 16 or 25.
+        grid_dim (int): The side length of the grid.
 
-    Returns: An integer in the range 0 to (grid_dim - 1) (inclusive).
+    Returns: The variable map.
     """
 
-    if grid_dim == 6:
-        return (column % 3) + 3 * (row % 2)
-    else:
-        sr_dim = int(sqrt(grid_dim))
-        return (column % sr_dim) + sr_dim * (row % sr_dim)
+    return VarMap(grid_dim)
+
+
+@lru_cache(maxsize=None)
+def block_dims(grid_dim: int) -> tuple[int, int]:
+    """ Works out the size of a block.
+
+    A block is the most nearly square rectangle with grid_dim cells and no more rows than columns, e.g. 2 x 3 for a
+    6 x 6 grid, 2 x 4 for 8 x 8, 3 x 4 for 12 x 12 and 7 x 7 for 49 x 49.
+
+    Args:
+        grid_dim (int): The side length of the sudoku grid, one of GRID_DIMS.
+
+    Returns: The number of rows and the number of columns in a block. Raises ValueError if the grid is bigger than
+        MAX_GRID_DIM, or can't be split into blocks because grid_dim is prime.
+    """
+
+    if not 4 <= grid_dim <= MAX_GRID_DIM:
+        raise ValueError("Grids must be from 4 x 4 to " + str(MAX_GRID_DIM) + " x " + str(MAX_GRID_DIM) + ".")
+    block_rows = isqrt(grid_dim)
+    while grid_dim % block_rows != 0:
+        block_rows = block_rows - 1
+    if block_rows == 1:
+        raise ValueError("A " + str(grid_dim) + " x " + str(grid_dim) + " grid can't be split into blocks.")
+    return block_rows, grid_dim // block_rows
 
 
-def define_killer_sudoku_clauses(puzzle: list[list[str]], sat_solver: SatSolver, root: App) -> None:
+def define_killer_sudoku_clauses(puzzle: list[list[str]], formula: list[list[int]], cages: list[list[int]],
+                                 totals: list[int], encoding: str = "auto", cage_encoding: str = "combination",
+                                 stats: SolveStats | None = None) -> None:
     """ Creates clauses for a killer sudoku puzzle.
 
     Args:
         puzzle (list[list[str]]): The killer sudoku puzzle stored as a 2D array of strings.
-        sat_solver (SatSolver): The SAT solver.
-        root (App): The app, needed to access the cages, and the totals for those cages.
+        formula (list[list[int]]): The formula the clauses are added to.
+        cages (list[list[int]]): The cages, each one a list of the indices of the cells in that cage.
+        totals (list[int]): totals[i] is the total of the cage in cages[i].
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        cage_encoding (str): How the cage totals are encoded, one of CAGE_ENCODINGS.
+        stats (SolveStats | None): Where to record the time spent on the cages and the standard rules, if anywhere.
     """
 
-    cages = root.ks_cages
-    totals = root.ks_totals
-
-    x_var = 730
+    if cage_encoding not in CAGE_ENCODINGS:
+        raise ValueError("Unknown cage encoding: " + cage_encoding)
+    x_var = rule_template(9, "sudoku", encoding).top_var + 1
 
     # Killer sudoku summation rules
-    all_permutations = [0, 0, 0, 0, 0, 0, 0, 0, 0]
-    for i in range(len(totals)):
-        total = totals[i]
-        number_of_cells = len(cages[i])
-
-        # Generate all the permutations of length number_of_cells
-        if all_permutations[number_of_cells - 1] == 0:
-            ps = []
-            for n1 in range(1, 10):
-                if number_of_cells == 1:
-                    ps.append([n1])
-                else:
-                    for n2 in range(1, 10):
-                        if number_of_cells == 2:
-                            ps.append([n1, n2])
-                        else:
-                            for n3 in range(1, 10):
-                                if number_of_cells == 3:
-                                    ps.append([n1, n2, n3])
-                                else:
-                                    for n4 in range(1, 10):
-                                        if number_of_cells == 4:
-                                            ps.append([n1, n2, n3, n4])
-                                        else:
-                                            for n5 in range(1, 10):
-                                                if number_of_cells == 5:
-                                                    ps.append([n1, n2, n3, n4, n5])
-                                                else:
-                                                    for n6 in range(1, 10):
-                                                        if number_of_cells == 6:
-                                                            ps.append([n1, n2, n3, n4, n5, n6])
-                                                        else:
-                                                            for n7 in range(1, 10):
-                                                                if number_of_cells == 7:
-                                                                    ps.append([n1, n2, n3, n4, n5, n6, n7])
-                                                                else:
-                                                                    for n8 in range(1, 10):
-                                                                        if number_of_cells == 8:
-                                                                            ps.append([n1, n2, n3, n4, n5, n6, n7, n8])
-                                                                        else:
-                                                                            for n9 in range(1, 10):
-                                                                                ps.append([n1, n2, n3, n4, n5, n6, n7,
-                                                                                           n8, n9])
-
-            # Remove permutations with duplicate values
-            permutations_no_copies = []
-            for permutation in ps:
-                temp_list = []
-                for num in permutation:
-                    if num not in temp_list:
-                        temp_list.append(num)
-                if len(temp_list) == number_of_cells:
-                    permutations_no_copies.append(temp_list)
-            all_permutations[number_of_cells - 1] = permutations_no_copies
-
-        # Remove permutations that don't sum to the correct value
-        correct_permutations = []
-        for permutation in all_permutations[number_of_cells - 1]:
-            permutation_sum = 0
-            for num in permutation:
-                permutation_sum = permutation_sum + num
-            if permutation_sum == total:
-                correct_permutations.append(permutation)
-
-        # Encode number, column, row to unique variable
-        encoded_permutations = []
-        for permutation in correct_permutations:
-            encoded_permutation = []
-            for j in range(number_of_cells):
-                current_cell = cages[i][j]
-                current_row, current_column = i_to_rc(current_cell, 9)
-                current_number = permutation[j]
-                encoded_permutation.append(ncr_to_var(current_number, current_column, current_row, 9))
-            encoded_permutations.append(encoded_permutation)
-
-        # Convert DNF to CNF and add CNF clauses
-        x_var = dnf_to_cnf(encoded_permutations, x_var, sat_solver)
+    with timed(stats, "encode_cages"):
+        for i in range(len(totals)):
+            if cage_encoding == "combination":
+                x_var = cage_combination_clauses(cages[i], totals[i], x_var, formula)
+                continue
+            number_of_cells = len(cages[i])
+
+            # Encode number, column, row to unique variable
+            encoded_permutations = []
+            for permutation in cage_permutations(number_of_cells, totals[i]):
+                encoded_permutation = []
+                for j in range(number_of_cells):
+                    current_cell = cages[i][j]
+                    current_row, current_column = i_to_rc(current_cell, 9)
+                    current_number = permutation[j]
+                    encoded_permutation.append(ncr_to_var(current_number, current_column, current_row, 9))
+                encoded_permutations.append(encoded_permutation)
+
+            # Convert DNF to CNF and add CNF clauses
+            x_var = dnf_to_cnf(encoded_permutations, x_var, formula)
 
     # Standard sudoku rules (including numbers already in puzzle)
-    define_standard_clauses(puzzle, sat_solver, 9)
+    define_standard_clauses(puzzle, formula, 9, encoding, stats)
+
 
+def cage_combination_clauses(cage: list[int], total: int, x_var: int, formula: list[list[int]]) -> int:
+    """ Creates clauses for the total of a killer sudoku cage from the sets of numbers that can fill it.
 
-def define_hyper_sudoku_clauses(puzzle: list[list[str]], sat_solver: SatSolver) -> None:
+    Each set gets a variable, and one of them must be true. The numbers in a cage are all different, so a true set
+    fills the cage as long as each of its numbers is in some cell of the cage. A number that is in no set can't be
+    used in the cage at all, and any other number needs one of the sets containing it to be true.
+
+    Args:
+        cage (list[int]): The indices of the cells in the cage.
+        total (int): The total of the cage.
+        x_var (int): The next variable to use.
+        formula (list[list[int]]): The formula the clauses are added to.
+
+    Returns: The next variable that can be used.
+    """
+
+    cells = [i_to_rc(cell, 9) for cell in cage]
+    combinations_ = cage_combinations(len(cage), total)
+    formula.append([x_var + k for k in range(len(combinations_))])  # Empty if no set has this total
+
+    for k, combination in enumerate(combinations_):
+        for number in combination:
+            formula.append([- (x_var + k)] + [ncr_to_var(number, c, r, 9) for r, c in cells])
+
+    for number in range(1, 10):
+        containing = [x_var + k for k, combination in enumerate(combinations_) if number in combination]
+        for r, c in cells:
+            formula.append([- ncr_to_var(number, c, r, 9)] + containing)
+
+    # All different, which the sudoku rules don't cover if the cage crosses into another row, column and block
+    for j, (r1, c1) in enumerate(cells):
+        for r2, c2 in cells[j + 1:]:
+            if r1 != r2 and c1 != c2 and (r1 // 3, c1 // 3) != (r2 // 3, c2 // 3):
+                for number in range(1, 10):
+                    formula.append([- ncr_to_var(number, c1, r1, 9), - ncr_to_var(number, c2, r2, 9)])
+
+    return x_var + len(combinations_)
+
+
+@lru_cache(maxsize=None)
+def combination_table() -> dict[tuple[int, int], tuple[tuple[int, ...], ...]]:
+    """ Lists the sets of different numbers from 1 to 9 with each size and total.
+
+    There are only 511 such sets, so the whole table is built the first time it is needed.
+
+    Returns: The sets for each (size, total), each set in increasing order.
+    """
+
+    table = {}
+    for size in range(1, 10):
+        for combination in combinations(range(1, 10), size):
+            table.setdefault((size, sum(combination)), []).append(combination)
+    return {key: tuple(value) for key, value in table.items()}
+
+
+def cage_combinations(size: int, total: int) -> tuple[tuple[int, ...], ...]:
+    """ Gets the sets of different numbers that can fill a killer sudoku cage.
+
+    Args:
+        size (int): The number of cells in the cage.
+        total (int): The total of the cage.
+
+    Returns: The sets, each in increasing order. Empty if no set of that size has that total.
+    """
+
+    return combination_table().get((size, total), ())
+
+
+def cage_permutations(size: int, total: int) -> Iterator[tuple[int, ...]]:
+    """ Generates the orders the numbers in a killer sudoku cage can be in.
+
+    Args:
+        size (int): The number of cells in the cage.
+        total (int): The total of the cage.
+
+    Yields: The number in each cell of the cage, for every valid way of filling it.
+    """
+
+    for combination in cage_combinations(size, total):
+        yield from permutations(combination)
+
+
+def define_hyper_sudoku_clauses(puzzle: list[list[str]], formula: list[list[int]], encoding: str = "auto",
+                                stats: SolveStats | None = None) -> None:
     """ Creates clauses for a hyper sudoku puzzle.
 
     Args:
         puzzle (list[list[str]]): The hyper sudoku puzzle as a 2D array of strings.
-        sat_solver (SatSolver): The SAT solver.
+        formula (list[list[int]]): The formula the clauses are added to.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        stats (SolveStats | None): Where to record the time spent on the givens and the rules, if anywhere.
     """
 
-    blocks_rule(sat_solver, 1, 1, 9)  # Top left
-    blocks_rule(sat_solver, 1, 5, 9)  # Bottom left
-    blocks_rule(sat_solver, 5, 1, 9)  # Top right
-    blocks_rule(sat_solver, 5, 5, 9)  # Bottom right
-    define_standard_clauses(puzzle, sat_solver, 9)
+    template = rule_template(len(puzzle), "hyper_sudoku", encoding)  # Raises ValueError unless the grid is 9 x 9
+    with timed(stats, "encode_givens"):
+        formula.extend(given_clauses(puzzle, HYPER_GRID_DIM))
+    with timed(stats, "encode_rules"):
+        formula.extend(template.clauses)
 
 
-def define_gt_sudoku_clauses(puzzle: list[list[str]], sat_solver: SatSolver, root: App) -> None:
+def define_gt_sudoku_clauses(puzzle: list[list[str]], formula: list[list[int]], horizontal_greater: list[str],
+                             vertical_greater: list[str], encoding: str = "auto", gt_encoding: str = "order",
+                             stats: SolveStats | None = None) -> None:
     """ Creates clauses for a greater than sudoku puzzle.
 
     Args:
         puzzle (list[list[str]]): The greater than sudoku puzzle as a 2D array of strings.
-        sat_solver (SatSolver): The SAT solver.
-        root (App): The app, needed to access horizontal_greater and vertical_greater.
+        formula (list[list[int]]): The formula the clauses are added to.
+        horizontal_greater (list[str]): "left" or "right" for each horizontal inequality, whichever cell is greater.
+        vertical_greater (list[str]): "up" or "down" for each vertical inequality, whichever cell is greater.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        gt_encoding (str): How the inequalities are encoded, one of GT_ENCODINGS.
+        stats (SolveStats | None): Where to record the time spent on the inequalities and the standard rules, if
+            anywhere.
     """
 
-    horizontal_greater = root.puzzle_grid.horizontal_greater
-    vertical_greater = root.puzzle_grid.vertical_greater
-
-    for i in range(81):  # For every cell
-
-        # Check how many cells it is greater than
-        greater_than_count = 0
-        if i in [0, 3, 6, 27, 30, 33, 54, 57, 60]:  # Top left corner
-            edges_count = 2
-            right_i = int(i * (2 / 3))
-            down_i = int(right_i + ((i % 9) / 3))
-            if horizontal_greater[right_i] == "left":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[down_i] == "up":
-                greater_than_count = greater_than_count + 1
-        elif i in [2, 5, 8, 29, 32, 35, 56, 59, 62]:  # Top right corner
-            edges_count = 2
-            left_i = int(((2 * i) - 1) / 3)
-            down_i = int(left_i + (((i % 9) + 1) / 3))
-            if horizontal_greater[left_i] == "right":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[down_i] == "up":
-                greater_than_count = greater_than_count + 1
-        elif i in [18, 21, 24, 45, 48, 51, 72, 75, 78]:  # Bottom left corner
-            edges_count = 2
-            right_i = int(i * (2 / 3))
-            up_i = int(right_i - (3 - ((i % 9) / 3)))
-            if horizontal_greater[right_i] == "left":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[up_i] == "down":
-                greater_than_count = greater_than_count + 1
-        elif i in [20, 23, 26, 47, 50, 53, 74, 77, 80]:  # Bottom right corner
-            edges_count = 2
-            left_i = int(((2 * i) - 1) / 3)
-            up_i = int(left_i - (3 - (((i % 9) + 1) / 3)))
-            if horizontal_greater[left_i] == "right":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[up_i] == "down":
-                greater_than_count = greater_than_count + 1
-        elif i in [1, 4, 7, 28, 31, 34, 55, 58, 61]:  # Top side
-            edges_count = 3
-            left_i = int((i - 1) * (2 / 3))
-            right_i = left_i + 1
-            down_i = int(right_i + (((i % 9) - 1) / 3))
-            if horizontal_greater[left_i] == "right":
-                greater_than_count = greater_than_count + 1
-            if horizontal_greater[right_i] == "left":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[down_i] == "up":
-                greater_than_count = greater_than_count + 1
-        elif i in [9, 12, 15, 36, 39, 42, 63, 66, 69]:  # Left side
-            edges_count = 3
-            up_i = int((i % 9) + (18 * (i // 30)))
-            right_i = int(i * (2 / 3))
-            down_i = up_i + 9
-            if vertical_greater[up_i] == "down":
-                greater_than_count = greater_than_count + 1
-            if horizontal_greater[right_i] == "left":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[down_i] == "up":
-                greater_than_count = greater_than_count + 1
-        elif i in [11, 14, 17, 38, 41, 44, 65, 68, 71]:  # Right side
-            edges_count = 3
-            up_i = int((i % 9) + (18 * (i // 30)))
-            left_i = int(((i + 1) * (2 / 3)) - 1)
-            down_i = up_i + 9
-            if vertical_greater[up_i] == "down":
-                greater_than_count = greater_than_count + 1
-            if horizontal_greater[left_i] == "right":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[down_i] == "up":
-                greater_than_count = greater_than_count + 1
-        elif i in [19, 22, 25, 46, 49, 52, 73, 76, 79]:  # Bottom side
-            edges_count = 3
-            up_i = i - (((i // 30) + 1) * 9)
-            left_i = int((i - 1) * (2 / 3))
-            right_i = left_i + 1
-            if vertical_greater[up_i] == "down":
-                greater_than_count = greater_than_count + 1
-            if horizontal_greater[left_i] == "right":
-                greater_than_count = greater_than_count + 1
-            if horizontal_greater[right_i] == "left":
-                greater_than_count = greater_than_count + 1
-        else:  # Centre cell
-            edges_count = 4
-            up_i = i - (((i // 30) + 1) * 9)
-            left_i = int((i - 1) * (2 / 3))
-            right_i = left_i + 1
-            down_i = up_i + 9
-            if vertical_greater[up_i] == "down":
-                greater_than_count = greater_than_count + 1
-            if horizontal_greater[left_i] == "right":
-                greater_than_count = greater_than_count + 1
-            if horizontal_greater[right_i] == "left":
-                greater_than_count = greater_than_count + 1
-            if vertical_greater[down_i] == "up":
-                greater_than_count = greater_than_count + 1
-
-        i_row, i_col = i_to_rc(i, 9)  # Cell index as a row and column
-        en = [0]  # Encoded numbers
-        for j in range(1, 10):  # Encoded numbers 1 to 9 with cell row and column
-            en.append(ncr_to_var(j, i_col, i_row, 9))
-
-        # List of possibilities for each cell as CNF
-        if edges_count == 2:
-            if greater_than_count == 2:
-                sat_solver.add_clause([en[9], en[8], en[7], en[6], en[5], en[4], en[3]])
-            elif greater_than_count == 1:
-                sat_solver.add_clause([en[8], en[7], en[6], en[5], en[4], en[3], en[2]])
-            else:
-                sat_solver.add_clause([en[7], en[6], en[5], en[4], en[3], en[2], en[1]])
-        elif edges_count == 3:
-            if greater_than_count == 3:
-                sat_solver.add_clause([en[9], en[8], en[7], en[6], en[5], en[4]])
-            elif greater_than_count == 2:
-                sat_solver.add_clause([en[8], en[7], en[6], en[5], en[4], en[3]])
-            elif greater_than_count == 1:
-                sat_solver.add_clause([en[7], en[6], en[5], en[4], en[3], en[2]])
-            else:
-                sat_solver.add_clause([en[6], en[5], en[4], en[3], en[2], en[1]])
-        else:
-            if greater_than_count == 4:
-                sat_solver.add_clause([en[9], en[8], en[7], en[6], en[5]])
-            elif greater_than_count == 3:
-                sat_solver.add_clause([en[8], en[7], en[6], en[5], en[4]])
-            elif greater_than_count == 2:
-                sat_solver.add_clause([en[7], en[6], en[5], en[4], en[3]])
-            elif greater_than_count == 1:
-                sat_solver.add_clause([en[6], en[5], en[4], en[3], en[2]])
+    with timed(stats, "encode_inequalities"):
+        for i in range(81):  # For every cell
+
+            # Check how many cells it is greater than
+            greater_than_count = 0
+            if i in [0, 3, 6, 27, 30, 33, 54, 57, 60]:  # Top left corner
+                edges_count = 2
+                right_i = int(i * (2 / 3))
+                down_i = int(right_i + ((i % 9) / 3))
+                if horizontal_greater[right_i] == "left":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[down_i] == "up":
+                    greater_than_count = greater_than_count + 1
+            elif i in [2, 5, 8, 29, 32, 35, 56, 59, 62]:  # Top right corner
+                edges_count = 2
+                left_i = int(((2 * i) - 1) / 3)
+                down_i = int(left_i + (((i % 9) + 1) / 3))
+                if horizontal_greater[left_i] == "right":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[down_i] == "up":
+                    greater_than_count = greater_than_count + 1
+            elif i in [18, 21, 24, 45, 48, 51, 72, 75, 78]:  # Bottom left corner
+                edges_count = 2
+                right_i = int(i * (2 / 3))
+                up_i = int(right_i - (3 - ((i % 9) / 3)))
+                if horizontal_greater[right_i] == "left":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[up_i] == "down":
+                    greater_than_count = greater_than_count + 1
+            elif i in [20, 23, 26, 47, 50, 53, 74, 77, 80]:  # Bottom right corner
+                edges_count = 2
+                left_i = int(((2 * i) - 1) / 3)
+                up_i = int(left_i - (3 - (((i % 9) + 1) / 3)))
+                if horizontal_greater[left_i] == "right":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[up_i] == "down":
+                    greater_than_count = greater_than_count + 1
+            elif i in [1, 4, 7, 28, 31, 34, 55, 58, 61]:  # Top side
+                edges_count = 3
+                left_i = int((i - 1) * (2 / 3))
+                right_i = left_i + 1
+                down_i = int(right_i + (((i % 9) - 1) / 3))
+                if horizontal_greater[left_i] == "right":
+                    greater_than_count = greater_than_count + 1
+                if horizontal_greater[right_i] == "left":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[down_i] == "up":
+                    greater_than_count = greater_than_count + 1
+            elif i in [9, 12, 15, 36, 39, 42, 63, 66, 69]:  # Left side
+                edges_count = 3
+                up_i = int((i % 9) + (18 * (i // 30)))
+                right_i = int(i * (2 / 3))
+                down_i = up_i + 9
+                if vertical_greater[up_i] == "down":
+                    greater_than_count = greater_than_count + 1
+                if horizontal_greater[right_i] == "left":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[down_i] == "up":
+                    greater_than_count = greater_than_count + 1
+            elif i in [11, 14, 17, 38, 41, 44, 65, 68, 71]:  # Right side
+                edges_count = 3
+                up_i = int((i % 9) + (18 * (i // 30)))
+                left_i = int(((i + 1) * (2 / 3)) - 1)
+                down_i = up_i + 9
+                if vertical_greater[up_i] == "down":
+                    greater_than_count = greater_than_count + 1
+                if horizontal_greater[left_i] == "right":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[down_i] == "up":
+                    greater_than_count = greater_than_count + 1
+            elif i in [19, 22, 25, 46, 49, 52, 73, 76, 79]:  # Bottom side
+                edges_count = 3
+                up_i = i - (((i // 30) + 1) * 9)
+                left_i = int((i - 1) * (2 / 3))
+                right_i = left_i + 1
+                if vertical_greater[up_i] == "down":
+                    greater_than_count = greater_than_count + 1
+                if horizontal_greater[left_i] == "right":
+                    greater_than_count = greater_than_count + 1
+                if horizontal_greater[right_i] == "left":
+                    greater_than_count = greater_than_count + 1
+            else:  # Centre cell
+                edges_count = 4
+                up_i = i - (((i // 30) + 1) * 9)
+                left_i = int((i - 1) * (2 / 3))
+                right_i = left_i + 1
+                down_i = up_i + 9
+                if vertical_greater[up_i] == "down":
+                    greater_than_count = greater_than_count + 1
+                if horizontal_greater[left_i] == "right":
+                    greater_than_count = greater_than_count + 1
+                if horizontal_greater[right_i] == "left":
+                    greater_than_count = greater_than_count + 1
+                if vertical_greater[down_i] == "up":
+                    greater_than_count = greater_than_count + 1
+
+            i_row, i_col = i_to_rc(i, 9)  # Cell index as a row and column
+            en = [0]  # Encoded numbers
+            for j in range(1, 10):  # Encoded numbers 1 to 9 with cell row and column
+                en.append(ncr_to_var(j, i_col, i_row, 9))
+
+            # List of possibilities for each cell as CNF
+            if edges_count == 2:
+                if greater_than_count == 2:
+                    formula.append([en[9], en[8], en[7], en[6], en[5], en[4], en[3]])
+                elif greater_than_count == 1:
+                    formula.append([en[8], en[7], en[6], en[5], en[4], en[3], en[2]])
+                else:
+                    formula.append([en[7], en[6], en[5], en[4], en[3], en[2], en[1]])
+            elif edges_count == 3:
+                if greater_than_count == 3:
+                    formula.append([en[9], en[8], en[7], en[6], en[5], en[4]])
+                elif greater_than_count == 2:
+                    formula.append([en[8], en[7], en[6], en[5], en[4], en[3]])
+                elif greater_than_count == 1:
+                    formula.append([en[7], en[6], en[5], en[4], en[3], en[2]])
+                else:
+                    formula.append([en[6], en[5], en[4], en[3], en[2], en[1]])
             else:
-                sat_solver.add_clause([en[5], en[4], en[3], en[2], en[1]])
-
-    x_var = 730
-    for i in range(len(horizontal_greater)):  # For each horizontal button
-        left_cell = i + (i // 2)  # location of cell to the left of the inequality sign
-        right_cell = left_cell + 1  # location of cell to the right of the inequality sign
-
-        left_cell_encoded = [0]
-        right_cell_encoded = [0]
-        left_r, left_c = i_to_rc(left_cell, 9)
-        right_r, right_c = i_to_rc(right_cell, 9)
-        for j in range(1, 10):  # Encoded numbers 1 to 9 for left cell and right cell
-            left_cell_encoded.append(ncr_to_var(j, left_c, left_r, 9))
-            right_cell_encoded.append(ncr_to_var(j, right_c, right_r, 9))
-
-        # Create DNF clause
-        dnf_clause = []
-        for left_num in range(1, 10):
-            for right_num in range(1, 10):
-                if (left_num > right_num) and (horizontal_greater[i] == "left"):
-                    dnf_clause.append([left_cell_encoded[left_num], right_cell_encoded[right_num]])
-                if (left_num < right_num) and (horizontal_greater[i] == "right"):
-                    dnf_clause.append([left_cell_encoded[left_num], right_cell_encoded[right_num]])
-
-        #  Convert DNF to CNF
-        x_var = dnf_to_cnf(dnf_clause, x_var, sat_solver)
-
-    for i in range(len(vertical_greater)):  # For each vertical button
-        up_cell = i + (9 * (i // 18))  # Location of cell above the inequality sign
-        down_cell = up_cell + 9  # Location of cell below the inequality sign
-
-        up_cell_encoded = [0]
-        down_cell_encoded = [0]
-        up_r, up_c = i_to_rc(up_cell, 9)
-        down_r, down_c = i_to_rc(down_cell, 9)
-        for j in range(1, 10):  # Encoded numbers 1 to 9 for up cell and down cell
-            up_cell_encoded.append(ncr_to_var(j, up_c, up_r, 9))
-            down_cell_encoded.append(ncr_to_var(j, down_c, down_r, 9))
-
-        # Create DNF clause
-        dnf_clause = []
-        for up_num in range(1, 10):
-            for down_num in range(1, 10):
-                if (up_num > down_num) and (vertical_greater[i] == "up"):
-                    dnf_clause.append([up_cell_encoded[up_num], down_cell_encoded[down_num]])
-                if (up_num < down_num) and (vertical_greater[i] == "down"):
-                    dnf_clause.append([up_cell_encoded[up_num], down_cell_encoded[down_num]])
-
-        # Convert DNF to CNF
-        x_var = dnf_to_cnf(dnf_clause, x_var, sat_solver)
+                if greater_than_count == 4:
+                    formula.append([en[9], en[8], en[7], en[6], en[5]])
+                elif greater_than_count == 3:
+                    formula.append([en[8], en[7], en[6], en[5], en[4]])
+                elif greater_than_count == 2:
+                    formula.append([en[7], en[6], en[5], en[4], en[3]])
+                elif greater_than_count == 1:
+                    formula.append([en[6], en[5], en[4], en[3], en[2]])
+                else:
+                    formula.append([en[5], en[4], en[3], en[2], en[1]])
+
+        if gt_encoding not in GT_ENCODINGS:
+            raise ValueError("Unknown greater than encoding: " + gt_encoding)
+        x_var = rule_template(9, "sudoku", encoding).top_var + 1
+        for i in range(len(horizontal_greater)):  # For each horizontal button
+            left_cell = i + (i // 2)  # location of cell to the left of the inequality sign
+            right_cell = left_cell + 1  # location of cell to the right of the inequality sign
+
+            left_cell_encoded = [0]
+            right_cell_encoded = [0]
+            left_r, left_c = i_to_rc(left_cell, 9)
+            right_r, right_c = i_to_rc(right_cell, 9)
+            for j in range(1, 10):  # Encoded numbers 1 to 9 for left cell and right cell
+                left_cell_encoded.append(ncr_to_var(j, left_c, left_r, 9))
+                right_cell_encoded.append(ncr_to_var(j, right_c, right_r, 9))
+
+            if gt_encoding == "order":
+                if horizontal_greater[i] == "left":
+                    inequality_clauses(left_cell_encoded, right_cell_encoded, formula)
+                else:
+                    inequality_clauses(right_cell_encoded, left_cell_encoded, formula)
+                continue
+
+            # Create DNF clause
+            dnf_clause = []
+            for left_num in range(1, 10):
+                for right_num in range(1, 10):
+                    if (left_num > right_num) and (horizontal_greater[i] == "left"):
+                        dnf_clause.append([left_cell_encoded[left_num], right_cell_encoded[right_num]])
+                    if (left_num < right_num) and (horizontal_greater[i] == "right"):
+                        dnf_clause.append([left_cell_encoded[left_num], right_cell_encoded[right_num]])
+
+            #  Convert DNF to CNF
+            x_var = dnf_to_cnf(dnf_clause, x_var, formula)
+
+        for i in range(len(vertical_greater)):  # For each vertical button
+            up_cell = i + (9 * (i // 18))  # Location of cell above the inequality sign
+            down_cell = up_cell + 9  # Location of cell below the inequality sign
+
+            up_cell_encoded = [0]
+            down_cell_encoded = [0]
+            up_r, up_c = i_to_rc(up_cell, 9)
+            down_r, down_c = i_to_rc(down_cell, 9)
+            for j in range(1, 10):  # Encoded numbers 1 to 9 for up cell and down cell
+                up_cell_encoded.append(ncr_to_var(j, up_c, up_r, 9))
+                down_cell_encoded.append(ncr_to_var(j, down_c, down_r, 9))
+
+            if gt_encoding == "order":
+                if vertical_greater[i] == "up":
+                    inequality_clauses(up_cell_encoded, down_cell_encoded, formula)
+                else:
+                    inequality_clauses(down_cell_encoded, up_cell_encoded, formula)
+                continue
+
+            # Create DNF clause
+            dnf_clause = []
+            for up_num in range(1, 10):
+                for down_num in range(1, 10):
+                    if (up_num > down_num) and (vertical_greater[i] == "up"):
+                        dnf_clause.append([up_cell_encoded[up_num], down_cell_encoded[down_num]])
+                    if (up_num < down_num) and (vertical_greater[i] == "down"):
+                        dnf_clause.append([up_cell_encoded[up_num], down_cell_encoded[down_num]])
+
+            # Convert DNF to CNF
+            x_var = dnf_to_cnf(dnf_clause, x_var, formula)
 
     # Standard sudoku rules (including numbers already in puzzle
-    define_standard_clauses(puzzle, sat_solver, 9)
+    define_standard_clauses(puzzle, formula, 9, encoding, stats)
+
+
+def inequality_clauses(greater_encoded: list[int], lesser_encoded: list[int], formula: list[list[int]]) -> None:
+    """ Creates clauses so that one cell is greater than another, without auxiliary variables.
+
+    If the greater cell is n, the lesser cell must be one of 1 to n - 1, and if the lesser cell is n, the greater cell
+    must be one of n + 1 to 9. For n = 1 and n = 9 these become single literal clauses.
+
+    Args:
+        greater_encoded (list[int]): The variables for numbers 1 to 9 in the greater cell, with a 0 in front.
+        lesser_encoded (list[int]): The variables for numbers 1 to 9 in the lesser cell, with a 0 in front.
+        formula (list[list[int]]): The formula the clauses are added to.
+    """
+
+    for n in range(1, 10):
+        formula.append([- greater_encoded[n]] + lesser_encoded[1:n])
+        formula.append([- lesser_encoded[n]] + greater_encoded[n + 1:])
 
 
-def dnf_to_cnf(dnf_clause: list[list[int]], x_var: int, sat_solver: SatSolver) -> int:
+def dnf_to_cnf(dnf_clause: list[list[int]], x_var: int, formula: list[list[int]]) -> int:
     """ Converts a DNF clause to CNF.
 
     Args:
         dnf_clause (list[list[int]]):
         x_var (int): The next variable to use.
-        sat_solver (SatSolver): The SAT solver.
+        formula (list[list[int]]): The formula the clauses are added to.
 
     Returns: The next variable that can be used.
     """
@@ -495,18 +1023,18 @@ def dnf_to_cnf(dnf_clause: list[list[int]], x_var: int, sat_solver: SatSolver) -
         temp_clause = [x_var_new]
         for num in sub_clause:
             temp_clause.append(- num)
-        sat_solver.add_clause(temp_clause)
+        formula.append(temp_clause)
         for num in sub_clause:
             temp_clause = [- x_var_new, num]
-            sat_solver.add_clause(temp_clause)
+            formula.append(temp_clause)
         x_var_new = x_var_new + 1
-    sat_solver.add_clause([x_var_new])
+    formula.append([x_var_new])
     total_sub_clauses = len(dnf_clause)
     all_x_var = [- x_var_new]
     for i in range(total_sub_clauses):
         old_x_var = x_var_new - (i + 1)
-        sat_solver.add_clause([x_var_new, - old_x_var])
+        formula.append([x_var_new, - old_x_var])
         all_x_var.append(old_x_var)
-    sat_solver.add_clause(all_x_var)
+    formula.append(all_x_var)
     x_var_new = x_var_new + 1
     return x_var_new
@@ -0,0 +1,168 @@
+""" Reading and writing formulas in the DIMACS CNF format, and the keys of the formula cache on disk.
+
+DIMACS files can be given to any other SAT solver or profiling tool. The formulas written by the engine use the same
+variables as ncr_to_var, so a model from another solver can be decoded with VarMap.decode.
+
+Functions:
+    write_dimacs: Writes clauses to a DIMACS file as they are generated, without collecting them first.
+    read_dimacs: Reads the clauses from a DIMACS file.
+    read_header: Reads the number of variables and clauses from the header of a DIMACS file.
+    formula_key: Creates the cache key of the formula for a puzzle layout.
+    cache_path: Gets the path of a cached formula.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+# Part of every cache key, so that formulas cached by an older version of the encodings aren't used. Change it when
+# the clauses created by clause_creation.py change.
+CACHE_VERSION = 1
+HEADER_WIDTH = 40  # The header is padded to this width, so it can be filled in once the counts are known
+WRITE_BATCH = 4096  # The number of clauses written to the file at a time
+
+
+def write_dimacs(clauses: Iterable[Sequence[int]], path: str, nof_vars: int | None = None,
+                 comments: Sequence[str] = ()) -> tuple[int, int]:
+    """ Writes clauses to a DIMACS file as they are generated, without collecting them first.
+
+    The number of clauses (and of variables) isn't known until the last clause, so a blank header is written first
+    and filled in at the end.
+
+    Args:
+        clauses (Iterable[Sequence[int]]): The clauses, e.g. a generator.
+        path (str): The file to write.
+        nof_vars (int | None): The number of variables for the header. Defaults to the highest variable in the clauses.
+        comments (Sequence[str]): Lines to write as comments at the top of the file.
+
+    Returns: The number of variables and the number of clauses written.
+    """
+
+    top_var = 0
+    nof_clauses = 0
+    with open(path, "w", encoding="ascii") as file:
+        for comment in comments:
+            file.write("c " + comment + "\n")
+        header_position = file.tell()
+        file.write(" " * HEADER_WIDTH + "\n")
+        lines = []
+        for clause in clauses:
+            lines.append(" ".join(map(str, clause)) + " 0\n")
+            if clause:
+                top_var = max(top_var, max(clause), - min(clause))
+            if len(lines) == WRITE_BATCH:
+                file.writelines(lines)
+                nof_clauses = nof_clauses + len(lines)
+                lines = []
+        file.writelines(lines)
+        nof_clauses = nof_clauses + len(lines)
+        if nof_vars is None:
+            nof_vars = top_var
+        file.seek(header_position)
+        file.write(("p cnf " + str(nof_vars) + " " + str(nof_clauses)).ljust(HEADER_WIDTH))
+    return nof_vars, nof_clauses
+
+
+def read_dimacs(path: str) -> tuple[int, list[list[int]]]:
+    """ Reads the clauses from a DIMACS file.
+
+    The literals are converted by NumPy all at once rather than line by line. Clauses may span lines or share them, as
+    the format allows. A file that has been cut short or corrupted is rejected rather than loaded without some of its
+    clauses, as a formula with clauses missing can have solutions that aren't.
+
+    Args:
+        path (str): The file to read.
+
+    Returns: The number of variables from the header (or the highest variable if there is no header) and the clauses.
+        Raises ValueError if a literal isn't a whole number, the last clause doesn't end with 0, or the number of
+        clauses doesn't match the header.
+    """
+
+    nof_vars = None
+    nof_clauses = None
+    with open(path, encoding="ascii") as file:
+        text = file.read()
+    lines = text.split("\n", 1)
+    while lines[0].startswith(("c", "p")):  # The comments and header at the top
+        if lines[0].startswith("p"):
+            nof_vars, nof_clauses = int(lines[0].split()[2]), int(lines[0].split()[3])
+        lines = lines[1].split("\n", 1) if len(lines) > 1 else [""]
+    body = "\n".join(lines)
+    if "%" in body:  # End of the formula in some benchmark files
+        body = body[:body.index("%")]
+    if "c" in body:  # Comments between the clauses
+        body = "\n".join(line for line in body.splitlines() if not line.startswith("c"))
+
+    try:
+        literals = np.array(body.split(), dtype=np.int64)
+    except ValueError:
+        raise ValueError(path + " has a literal that isn't a whole number.") from None
+    if literals.size and literals[-1] != 0:
+        raise ValueError(path + " ends in the middle of a clause.")
+    ends = np.flatnonzero(literals == 0)
+    if nof_clauses is not None and len(ends) != nof_clauses:
+        raise ValueError(path + " has " + str(len(ends)) + " clauses, but its header says " + str(nof_clauses) + ".")
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    literal_list = literals.tolist()
+    clauses = [literal_list[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+    if nof_vars is None:
+        nof_vars = int(np.abs(literals).max(initial=0))
+    return nof_vars, clauses
+
+
+def read_header(path: str) -> tuple[int, int]:
+    """ Reads the number of variables and clauses from the header of a DIMACS file.
+
+    Args:
+        path (str): The file to read.
+
+    Returns: The number of variables and the number of clauses. Raises ValueError if the file has no header.
+    """
+
+    with open(path, encoding="ascii") as file:
+        for line in file:
+            if line.startswith("p"):
+                fields = line.split()
+                return int(fields[2]), int(fields[3])
+            if not line.startswith("c"):
+                break
+    raise ValueError(path + " has no DIMACS header.")
+
+
+def formula_key(sudoku_type: str, grid_dim: int, constraints: dict, encoding: str) -> str:
+    """ Creates the cache key of the formula for a puzzle layout.
+
+    The key is the SHA-256 hash of everything the formula depends on: the type of puzzle, the grid size, the encoding
+    and the constraints (cages, inequalities and their encodings), along with CACHE_VERSION.
+
+    Args:
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the grid.
+        constraints (dict): The data specific to the type of puzzle.
+        encoding (str): The at-most-one encoding, after "auto" has been resolved by choose_encoding.
+
+    Returns: The key, as 64 hexadecimal digits.
+    """
+
+    layout = {"version": CACHE_VERSION, "sudoku_type": sudoku_type, "grid_dim": grid_dim, "encoding": encoding,
+              "constraints": constraints}
+    return hashlib.sha256(json.dumps(layout, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cache_path(cache_dir: str, key: str) -> str:
+    """ Gets the path of a cached formula.
+
+    Args:
+        cache_dir (str): The directory of the cache.
+        key (str): The key from formula_key.
+
+    Returns: The path of the DIMACS file.
+    """
+
+    return os.path.join(cache_dir, key + ".cnf")
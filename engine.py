@@ -0,0 +1,1081 @@
+""" Headless solving engine. Works on plain data, so puzzles can be solved without the GUI (and without tkinter).
+
+Classes:
+    SatSolver: SAT solver, using any of the engines in SAT_SOLVERS.
+    LayoutSolver: A SAT solver that keeps the rule clauses for one puzzle layout loaded, so that puzzles with that
+        layout are each solved with one incremental call.
+    CancelToken: Lets a solve running in one thread be cancelled from another, e.g. by the Cancel button in the GUI.
+    SolveCancelled: Raised by a solve that has been cancelled.
+    SolveLimits: Limits on the time and work a solve may take, so that one pathological puzzle can't hold a worker
+        indefinitely.
+    SolveTimeout: Raised by a solve that reached one of its limits before finding an answer.
+
+Functions:
+    solve: Solves a puzzle given as plain data.
+    count_solutions: Counts the solutions of a puzzle given as plain data, stopping at a cap.
+    has_unique_solution: Checks whether a puzzle has exactly one solution.
+    solve_array: Solves a stack of puzzles held in a NumPy array.
+    export_dimacs: Writes the formula for a puzzle to a DIMACS file, e.g. to give it to another SAT solver.
+    load_dimacs: Loads a DIMACS file into a new SAT solver.
+    cached_formula: Gets the formula for an empty puzzle with a layout from the cache on disk, encoding and saving it
+        the first time.
+    duplicate_givens: Finds the puzzles in a NumPy array with a number given twice in a row, column or block.
+    choose_backend: Works out whether to solve a puzzle with the SAT solver or by backtracking.
+    solve_residual: Solves what is left of a standard or hyper sudoku puzzle after propagation, with a new SAT solver.
+    solve_portfolio: Races several SAT solvers on a puzzle in separate processes and returns the first answer.
+    portfolio_worker: Solves a puzzle with one SAT solver and puts the answer on a queue. Run in its own process.
+    get_layout_solver: Gets the layout solver for a puzzle layout, creating it if it hasn't been used recently.
+    clear_layout_solvers: Frees all the layout solvers, so the next puzzle of every layout is encoded from scratch.
+    layout_key: Creates a hashable key from the type, size and constraints of a puzzle.
+    check_puzzle: Checks that a puzzle is a square grid of numbers in the right range.
+    check_constraints: Checks that a type of puzzle can have a grid size, and that it has the constraints it needs.
+    decode: Converts the model found by the SAT solver into the values of the cells.
+    decode_residual: Converts the model for a residual formula into the values of the cells.
+    record_solver_stats: Records the conflicts, decisions and propagations of a SAT solver call.
+    sat_solve: Runs a SAT solver, within any limits and so that it can be cancelled if there is a cancel token.
+    check_stopped: Checks whether a solve has been cancelled or run out of time, for searches that don't use a SAT
+        solver.
+"""
+
+from __future__ import annotations
+from abc import ABC
+from functools import partial
+import multiprocessing
+import os
+import queue
+import threading
+from time import monotonic
+from typing import TYPE_CHECKING
+import numpy as np
+from pysat.solvers import Solver
+from backtrack import BACKTRACK_TYPES, solve_backtrack
+from canonical import canonical_form, lookup_solution, store_solution
+from clause_creation import block_dims, choose_encoding, define_clauses, get_var_map, ncr_to_var, stream_clauses
+from dimacs import cache_path, formula_key, read_dimacs, write_dimacs
+from propagation import masks_to_values, propagate, residual_clauses, unit_cells
+from solution_store import open_store, solution_key
+from solve_stats import timed
+
+if TYPE_CHECKING:
+    from solve_stats import SolveStats
+
+PUZZLE_TYPES = ["sudoku", "killer_sudoku", "hyper_sudoku", "greater_than_sudoku"]
+BACKENDS = ["sat", "backtrack", "portfolio"]
+
+SAT_SOLVERS = ["glucose3", "glucose4", "cadical153", "maplechrono", "lingeling", "minisat22"]  # pysat engines to use
+PORTFOLIO = ["glucose3", "cadical153", "maplechrono", "lingeling"]  # SAT solvers raced by the portfolio backend
+# SAT solvers without solve_limited in pysat, which can't be interrupted or given budgets. A cancelled solve with one
+# of these only stops once the solver has finished, and limits can't be used with them.
+UNINTERRUPTIBLE_SOLVERS = ["cadical153", "lingeling"]
+CANCEL_POLL_INTERVAL = 0.1  # Seconds between checks for a cancel while waiting for the portfolio
+VARIANT_GRID_DIM = 9  # Killer, hyper and greater than sudoku are only defined for 9 x 9 grids
+# The constraints each type of puzzle needs, and the number of inequalities of a greater than sudoku in each direction
+REQUIRED_CONSTRAINTS = {"sudoku": [], "killer_sudoku": ["ks_cages", "ks_totals"], "hyper_sudoku": [],
+                        "greater_than_sudoku": ["horizontal_greater", "vertical_greater"]}
+GT_INEQUALITIES = 54
+ARRAY_STATUSES = ["solved", "unsolvable", "invalid"]  # The statuses from solve_array, by their code
+MAX_LAYOUT_SOLVERS = 8  # Number of layout solvers kept loaded at once
+_layout_solvers = {}  # Keys from layout_key, oldest first
+
+
+class SatSolver(Solver, ABC):
+    """ SAT solver, using any of the engines in SAT_SOLVERS.
+
+    Attributes:
+        solver_name (str): The name of the engine, one of SAT_SOLVERS.
+    """
+
+    def __init__(self, solver_name: str = "glucose3") -> None:
+        """ Initiates SatSolver. """
+
+        if solver_name not in SAT_SOLVERS:
+            raise ValueError("Unknown SAT solver: " + str(solver_name))
+        super().__init__(name=solver_name)
+        self.solver_name = solver_name
+
+
+class LayoutSolver:
+    """ A SAT solver that keeps the rule clauses for one puzzle layout loaded, so that puzzles with that layout are each
+    solved with one incremental call.
+
+    The layout is the type of puzzle, the grid size and the constraints (cages, inequalities). The numbers in a puzzle
+    are passed to the SAT solver as assumptions rather than clauses, so nothing has to be encoded again between calls.
+
+    Attributes:
+        constraints (dict): The data specific to the type of puzzle.
+        encoding (str): The at-most-one encoding used for the sudoku rules.
+        grid_dim (int): The side length of the grid.
+        nof_clauses (int): The number of rule clauses loaded.
+        sat_solver (SatSolver): The SAT solver, with the rule clauses loaded.
+        sudoku_type (str): The type of puzzle.
+        top_var (int): The highest variable used so far, including the activation variables of count_solutions.
+
+    Methods:
+        solve: Solves a puzzle with this layout.
+        count_solutions: Counts the solutions of a puzzle with this layout, stopping at a cap.
+        assumptions: Converts the known values in a puzzle to assumptions for the SAT solver.
+        delete: Frees the SAT solver.
+    """
+
+    def __init__(self, sudoku_type: str, grid_dim: int, constraints: dict, encoding: str = "auto",
+                 solver_name: str = "glucose3", stats: SolveStats | None = None, cache_dir: str | None = None) -> None:
+        """ Initiates LayoutSolver. If cache_dir is given, the rule clauses are loaded from the formula cache there. """
+
+        self.sudoku_type = sudoku_type
+        self.grid_dim = grid_dim
+        self.constraints = constraints
+        self.encoding = encoding
+        self.sat_solver = SatSolver(solver_name)
+        with timed(stats, "encode"):
+            if cache_dir is None:
+                empty_puzzle = [[0] * grid_dim for _ in range(grid_dim)]
+                formula = define_clauses(empty_puzzle, sudoku_type, grid_dim, constraints, encoding, stats)
+            else:
+                formula = cached_formula(sudoku_type, grid_dim, constraints, encoding, cache_dir)
+        with timed(stats, "load"):
+            self.sat_solver.append_formula(formula)
+        self.nof_clauses = len(formula)
+        self.top_var = max(self.sat_solver.nof_vars(), grid_dim ** 3)
+
+    def solve(self, puzzle: list[list[int | str]], masks: list[int] | None = None, stats: SolveStats | None = None,
+              cancel: CancelToken | None = None, limits: SolveLimits | None = None) -> list[int] | None:
+        """ Solves a puzzle with this layout.
+
+        Args:
+            puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+            masks (list[int] | None): The candidates of each cell from propagation, if it has been done.
+            stats (SolveStats | None): Where to record the timings and counts, if anywhere.
+            cancel (CancelToken | None): Lets another thread cancel the solve, if given.
+            limits (SolveLimits | None): The limits for the SAT solver call, if any.
+
+        Returns: The value of each cell, from left to right, up to down, or None if there is no solution.
+        """
+
+        with timed(stats, "assumptions"):
+            assumptions = self.assumptions(puzzle, masks)
+        before = None
+        if stats is not None:
+            stats.add_count("clauses", self.nof_clauses)
+            stats.add_count("variables", self.sat_solver.nof_vars())
+            stats.add_count("assumptions", len(assumptions))
+            before = self.sat_solver.accum_stats()  # The solver is reused, so its statistics are cumulative
+        with timed(stats, "sat"):
+            satisfiable = sat_solve(self.sat_solver, assumptions, cancel, limits)
+        if stats is not None:
+            record_solver_stats(stats, self.sat_solver, before)
+        if not satisfiable:
+            return None
+        with timed(stats, "decode"):
+            return decode(self.sat_solver.get_model(), self.grid_dim)
+
+    def count_solutions(self, puzzle: list[list[int | str]], cap: int = 2, masks: list[int] | None = None) -> int:
+        """ Counts the solutions of a puzzle with this layout, stopping at a cap.
+
+        After each solution is found, a clause ruling it out is added and the solver is called again. The clause only
+        uses the cell variables, so solutions that differ only in auxiliary variables aren't counted twice. Every
+        clause includes a new activation variable, which is assumed true during the count and then set false for good,
+        so that the clauses don't affect later puzzles.
+
+        Args:
+            puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+            cap (int): The most solutions to count, e.g. 2 to check whether a puzzle has a unique solution.
+            masks (list[int] | None): The candidates of each cell from propagation, if it has been done.
+
+        Returns: The number of solutions, at most cap.
+        """
+
+        self.top_var = self.top_var + 1
+        activation_var = self.top_var
+        assumptions = self.assumptions(puzzle, masks) + [activation_var]
+        count = 0
+        while count < cap and self.sat_solver.solve(assumptions=assumptions):
+            count = count + 1
+            model = self.sat_solver.get_model()
+            self.sat_solver.add_clause([- activation_var] + [- var for var in model[:self.grid_dim ** 3] if var > 0])
+        self.sat_solver.add_clause([- activation_var])
+        return count
+
+    def assumptions(self, puzzle: list[list[int | str]], masks: list[int] | None = None) -> list[int]:
+        """ Converts the known values in a puzzle to assumptions for the SAT solver.
+
+        Args:
+            puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+            masks (list[int] | None): The candidates of each cell from propagation. If given, the cells solved by
+                propagation are assumed too, and the candidates it ruled out are assumed false.
+
+        Returns: One variable for every cell that has a value, and a negated variable for every ruled out candidate.
+        """
+
+        assumptions = []
+        for r in range(self.grid_dim):
+            for c in range(self.grid_dim):
+                if masks is not None:
+                    mask = masks[(r * self.grid_dim) + c]
+                    if mask & (mask - 1) == 0:
+                        assumptions.append(ncr_to_var(mask.bit_length(), c, r, self.grid_dim))
+                    else:
+                        for n in range(self.grid_dim):
+                            if not mask & (1 << n):
+                                assumptions.append(- ncr_to_var(n + 1, c, r, self.grid_dim))
+                elif int(puzzle[r][c]) != 0:
+                    assumptions.append(ncr_to_var(int(puzzle[r][c]), c, r, self.grid_dim))
+        return assumptions
+
+    def delete(self) -> None:
+        """ Frees the SAT solver. """
+
+        self.sat_solver.delete()
+
+
+class CancelToken:
+    """ Lets a solve running in one thread be cancelled from another, e.g. by the Cancel button in the GUI.
+
+    The token is passed to solve, which hands it on to every SAT solver call. Cancelling interrupts the SAT solver that
+    is running, if there is one, and any later call is not started. The solver stays usable, so a layout solver that
+    was interrupted keeps its clauses for the next puzzle.
+
+    Attributes:
+        cancelled (bool): Whether cancel has been called.
+
+    Methods:
+        cancel: Cancels the solve, interrupting the SAT solver if one is running.
+        interrupt: Interrupts the SAT solver if one is running, without cancelling the solve.
+        check: Raises SolveCancelled if the solve has been cancelled.
+        run: Runs a SAT solver within any limits, so that cancel can interrupt it.
+    """
+
+    def __init__(self) -> None:
+        """ Initiates CancelToken. """
+
+        self.cancelled = False
+        self._sat_solver = None  # The SAT solver that is running, if any
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        """ Cancels the solve, interrupting the SAT solver if one is running. Can be called from any thread. """
+
+        self.cancelled = True
+        self.interrupt()
+
+    def interrupt(self) -> None:
+        """ Interrupts the SAT solver if one is running, without cancelling the solve. Used for the time limit. """
+
+        with self._lock:
+            if self._sat_solver is not None:
+                self._sat_solver.interrupt()
+
+    def check(self) -> None:
+        """ Raises SolveCancelled if the solve has been cancelled. """
+
+        if self.cancelled:
+            raise SolveCancelled("The solve was cancelled.")
+
+    def run(self, sat_solver: SatSolver, assumptions: list[int], limits: SolveLimits | None = None) -> bool:
+        """ Runs a SAT solver within any limits, so that cancel can interrupt it.
+
+        The conflict and propagation limits are set as the solver's budgets, and the time limit is kept by a timer
+        thread that interrupts the solver. Budgets are always set, so ones left from an earlier call with limits don't
+        apply to this one.
+
+        Args:
+            sat_solver (SatSolver): The SAT solver, with its clauses loaded.
+            assumptions (list[int]): The assumptions for the call.
+            limits (SolveLimits | None): The limits for the call, if any.
+
+        Returns: Whether the formula is satisfiable. Raises SolveCancelled if the solve was cancelled, even if the
+            solver finished before it could be interrupted, and SolveTimeout if a limit was reached.
+        """
+
+        if sat_solver.solver_name in UNINTERRUPTIBLE_SOLVERS:
+            if limits is not None:
+                raise ValueError(sat_solver.solver_name + " can't be given limits.")
+            self.check()
+            satisfiable = sat_solver.solve(assumptions=assumptions)
+            self.check()
+            return satisfiable
+        timer = None
+        with self._lock:
+            self.check()
+            self._sat_solver = sat_solver
+        try:
+            sat_solver.conf_budget(-1)  # Turns off both budgets, so setting one budget to -1 would turn off the other
+            if limits is not None:
+                if limits.conflicts is not None:
+                    sat_solver.conf_budget(limits.conflicts)
+                if limits.propagations is not None:
+                    sat_solver.prop_budget(limits.propagations)
+                if limits.deadline is not None:
+                    timer = threading.Timer(limits.remaining(), self.interrupt)
+                    timer.daemon = True
+                    timer.start()
+            satisfiable = sat_solver.solve_limited(assumptions=assumptions, expect_interrupt=True)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            with self._lock:
+                self._sat_solver = None
+                sat_solver.clear_interrupt()  # Some solvers keep an interrupt until it is cleared
+        self.check()
+        if satisfiable is None:  # The solver stopped without an answer, and it wasn't cancelled
+            raise SolveTimeout("The SAT solver reached its " + limits.describe() + " without finding an answer.")
+        return satisfiable
+
+
+class SolveCancelled(Exception):
+    """ Raised by a solve that has been cancelled. """
+
+
+class SolveLimits:
+    """ Limits on the time and work a solve may take, so that one pathological puzzle can't hold a worker indefinitely.
+
+    The time limit covers the whole solve, counting from when the limits are created, and is checked before the SAT
+    solver is called as well as during the call. The conflict and propagation limits are budgets for the SAT solver
+    call. Glucose only checks its budgets between restarts, so it can go a few thousand conflicts over a small budget.
+
+    Attributes:
+        conflicts (int | None): The most conflicts the SAT solver may have, or None for no limit.
+        deadline (float | None): When the time runs out, in time.monotonic seconds, or None for no time limit.
+        propagations (int | None): The most propagations the SAT solver may do, or None for no limit.
+        time_limit (float | None): The most seconds the solve may take, or None for no limit.
+
+    Methods:
+        remaining: The seconds left before the time limit.
+        describe: Describes the limits, for error messages.
+    """
+
+    def __init__(self, time_limit: float | None = None, conflicts: int | None = None,
+                 propagations: int | None = None) -> None:
+        """ Initiates SolveLimits. """
+
+        for name, limit in (("time", time_limit), ("conflict", conflicts), ("propagation", propagations)):
+            if limit is not None and limit <= 0:
+                raise ValueError("The " + name + " limit must be positive.")
+        self.time_limit = time_limit
+        self.conflicts = conflicts
+        self.propagations = propagations
+        self.deadline = None if time_limit is None else monotonic() + time_limit
+
+    def remaining(self) -> float | None:
+        """ The seconds left before the time limit.
+
+        Returns: The seconds left, or None if there is no time limit. Raises SolveTimeout if the time has run out.
+        """
+
+        if self.deadline is None:
+            return None
+        seconds = self.deadline - monotonic()
+        if seconds <= 0:
+            raise SolveTimeout("The solve took longer than its time limit of " + str(self.time_limit) + " seconds.")
+        return seconds
+
+    def describe(self) -> str:
+        """ Describes the limits, for error messages.
+
+        Returns: E.g. "time limit of 10 seconds or conflict limit of 100000".
+        """
+
+        limits = []
+        if self.time_limit is not None:
+            limits.append("time limit of " + str(self.time_limit) + " seconds")
+        if self.conflicts is not None:
+            limits.append("conflict limit of " + str(self.conflicts))
+        if self.propagations is not None:
+            limits.append("propagation limit of " + str(self.propagations))
+        return " or ".join(limits)
+
+
+class SolveTimeout(TimeoutError):
+    """ Raised by a solve that reached one of its limits before finding an answer. """
+
+
+def solve(puzzle: list[list[int | str]], sudoku_type: str = "sudoku", constraints: dict | None = None,
+          encoding: str = "auto", backend: str = "auto", presolve: bool = True, incremental: bool = True,
+          solver_name: str = "glucose3", stats: SolveStats | None = None, cache_dir: str | None = None,
+          cancel: CancelToken | None = None, time_limit: float | None = None, conflict_limit: int | None = None,
+          propagation_limit: int | None = None, symmetry_cache: bool = False,
+          solution_store: str | None = None) -> list[list[int]] | None:
+    """ Solves a puzzle given as plain data.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 (or "0") where a cell is empty.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        constraints (dict | None): The data specific to the type of puzzle. For killer sudoku, ks_cages (list of cages,
+            each a list of cell indices) and ks_totals (list of cage totals). For greater than sudoku,
+            horizontal_greater (54 strings, "left" or "right") and vertical_greater (54 strings, "up" or "down").
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        backend (str): One of BACKENDS, or "auto" to choose the faster one for the type and size of puzzle. The
+            portfolio backend races the SAT solvers in PORTFOLIO against each other.
+        presolve (bool): Whether to fill in what can be worked out logically (see propagation.py) before searching.
+            Standard and hyper sudoku puzzles that are solved this way never reach the SAT solver.
+        incremental (bool): Whether to use the layout solver, which keeps its clauses loaded for the next puzzle. If
+            False, standard and hyper sudoku puzzles that have been presolved are given to a new SAT solver with only
+            the clauses for the unsolved cells.
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+        stats (SolveStats | None): Where to record the time spent in each phase (see solve_stats.py), the size of the
+            formula and the work done by the SAT solver, if anywhere.
+        cache_dir (str | None): A directory for the formula cache (see cached_formula), so that a layout solved in an
+            earlier run doesn't have to be encoded again. None to always encode.
+        cancel (CancelToken | None): Lets another thread cancel the solve, e.g. to keep a GUI responsive. If it is
+            cancelled, SolveCancelled is raised.
+        time_limit (float | None): The most seconds the solve may take, or None for no limit. Backtracking can't be
+            interrupted, so for that backend the limit is only checked once it has finished.
+        conflict_limit (int | None): The most conflicts the SAT solver may have, or None for no limit.
+        propagation_limit (int | None): The most propagations the SAT solver may do, or None for no limit. Neither
+            budget applies to the portfolio backend, which only has the time limit.
+        symmetry_cache (bool): Whether to answer standard sudoku puzzles that are symmetries of ones already solved
+            (the numbers relabelled, the rows and columns reordered within the blocks, and so on) from a cache of
+            solutions, without encoding or solving them (see canonical.py). Finding the canonical form takes about as
+            long as solving an easy 9 x 9 puzzle, so this is only worth it when symmetries are common or puzzles hard.
+        solution_store (str | None): An SQLite file of solutions (see solution_store.py), so that a puzzle solved
+            before, in this run or an earlier one, is answered without encoding or solving it. None to always solve.
+
+    Returns: The solution as a 2D array of integers, or None if the puzzle has no solution. If a limit is reached
+        first, SolveTimeout is raised, so that running out of time isn't mistaken for there being no solution. Limits
+        can't be used with the solvers in UNINTERRUPTIBLE_SOLVERS.
+    """
+
+    if sudoku_type not in PUZZLE_TYPES:
+        raise ValueError("Unknown puzzle type: " + str(sudoku_type))
+    grid_dim = check_puzzle(puzzle)
+    if constraints is None:
+        constraints = {}
+    check_constraints(sudoku_type, grid_dim, constraints)
+    limits = None
+    if time_limit is not None or conflict_limit is not None or propagation_limit is not None:
+        limits = SolveLimits(time_limit, conflict_limit, propagation_limit)
+        if solver_name in UNINTERRUPTIBLE_SOLVERS and backend != "portfolio":
+            raise ValueError(solver_name + " can't be given limits.")
+
+    if solution_store is not None:
+        store = open_store(solution_store)
+        key = solution_key(puzzle, sudoku_type, grid_dim, constraints)
+        with timed(stats, "store"):
+            found, solution = store.get(key)
+        if found:
+            if stats is not None:
+                stats.backend = "solution store"
+            return solution
+        solution = solve(puzzle, sudoku_type, constraints, encoding, backend, presolve, incremental, solver_name, stats,
+                         cache_dir, cancel, time_limit, conflict_limit, propagation_limit, symmetry_cache)
+        store.put(key, solution)  # Not reached if the solve is cancelled or times out
+        return solution
+
+    if symmetry_cache and sudoku_type == "sudoku":
+        with timed(stats, "canonical"):
+            form = canonical_form(puzzle)
+        if form is not None:
+            found, solution = lookup_solution(form)
+            if found:
+                if stats is not None:
+                    stats.backend = "symmetry cache"
+                return solution
+            solution = solve(puzzle, sudoku_type, constraints, encoding, backend, presolve, incremental, solver_name,
+                             stats, cache_dir, cancel, time_limit, conflict_limit, propagation_limit)
+            store_solution(form, solution)  # Not reached if the solve is cancelled or times out
+            return solution
+
+    masks = None
+    if presolve:
+        with timed(stats, "propagate"):
+            masks = propagate(puzzle, sudoku_type)
+        if masks is None:  # Propagation found a contradiction
+            if stats is not None:
+                stats.backend = "propagation"
+            return None
+        values = masks_to_values(masks)
+        if all(values) and sudoku_type in BACKTRACK_TYPES:  # Only the standard rules to satisfy, so it is solved
+            if stats is not None:
+                stats.backend = "propagation"
+            return [values[r * grid_dim:(r + 1) * grid_dim] for r in range(grid_dim)]
+        puzzle = [values[r * grid_dim:(r + 1) * grid_dim] for r in range(grid_dim)]
+
+    backend = choose_backend(sudoku_type, grid_dim, backend)
+    if stats is not None:
+        stats.backend = backend
+    if backend == "backtrack":
+        check = None
+        if cancel is not None or limits is not None:
+            check = partial(check_stopped, cancel, limits)
+        with timed(stats, "search"):
+            solution = solve_backtrack(puzzle, sudoku_type, check)
+    elif backend == "portfolio":
+        timeout = None if limits is None else limits.remaining()
+        with timed(stats, "search"):
+            winner, solution = solve_portfolio(puzzle, sudoku_type, constraints, encoding, timeout=timeout,
+                                               cancel=cancel)
+        if stats is not None:
+            stats.backend = "portfolio (" + winner + ")"
+    elif masks is not None and not incremental and sudoku_type in BACKTRACK_TYPES:
+        solution = solve_residual(masks, grid_dim, sudoku_type, encoding, solver_name, stats, cancel, limits)
+    else:
+        layout_solver = get_layout_solver(sudoku_type, grid_dim, constraints, encoding, solver_name, stats, cache_dir)
+        solution = layout_solver.solve(puzzle, masks, stats, cancel, limits)
+    if solution is None:
+        return None
+    return [solution[r * grid_dim:(r + 1) * grid_dim] for r in range(grid_dim)]
+
+
+def count_solutions(puzzle: list[list[int | str]], sudoku_type: str = "sudoku", constraints: dict | None = None,
+                    cap: int = 2, encoding: str = "auto", presolve: bool = True, solver_name: str = "glucose3") -> int:
+    """ Counts the solutions of a puzzle given as plain data, stopping at a cap.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 (or "0") where a cell is empty.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        constraints (dict | None): The data specific to the type of puzzle, as for solve.
+        cap (int): The most solutions to count. With the default of 2 the answer is 0, 1 or "at least 2".
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        presolve (bool): Whether to use propagation first. A standard or hyper sudoku puzzle that propagation solves
+            has exactly one solution, so the SAT solver isn't needed.
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+
+    Returns: The number of solutions, at most cap.
+    """
+
+    if sudoku_type not in PUZZLE_TYPES:
+        raise ValueError("Unknown puzzle type: " + str(sudoku_type))
+    grid_dim = check_puzzle(puzzle)
+    if constraints is None:
+        constraints = {}
+    check_constraints(sudoku_type, grid_dim, constraints)
+    if cap < 1:
+        return 0
+
+    masks = None
+    if presolve:
+        masks = propagate(puzzle, sudoku_type)
+        if masks is None:  # Propagation found a contradiction
+            return 0
+        if all(mask & (mask - 1) == 0 for mask in masks) and sudoku_type in BACKTRACK_TYPES:
+            return 1
+    return get_layout_solver(sudoku_type, grid_dim, constraints, encoding, solver_name).count_solutions(puzzle, cap,
+                                                                                                         masks)
+
+
+def has_unique_solution(puzzle: list[list[int | str]], sudoku_type: str = "sudoku", constraints: dict | None = None,
+                        **kwargs) -> bool:
+    """ Checks whether a puzzle has exactly one solution.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 (or "0") where a cell is empty.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        constraints (dict | None): The data specific to the type of puzzle, as for solve.
+        **kwargs: Passed on to count_solutions, e.g. encoding or solver_name.
+
+    Returns: True if the puzzle has exactly one solution.
+    """
+
+    return count_solutions(puzzle, sudoku_type, constraints, 2, **kwargs) == 1
+
+
+def solve_array(puzzles: np.ndarray, sudoku_type: str = "sudoku", constraints: dict | list[dict] | None = None,
+                encoding: str = "auto", solver_name: str = "glucose3") -> tuple[np.ndarray, np.ndarray]:
+    """ Solves a stack of puzzles held in a NumPy array.
+
+    The puzzles are checked all at once, and the known values are turned into assumptions for the layout solver and
+    the models into values with NumPy, so no puzzle is converted to lists or strings. Every puzzle goes to the layout
+    solver, without propagation first, which is the fastest way through a collection of puzzles.
+
+    Args:
+        puzzles (np.ndarray): The puzzles, with shape (N, grid_dim, grid_dim) and 0 where a cell is empty, usually
+            with dtype uint8.
+        sudoku_type (str): The type of every puzzle, one of PUZZLE_TYPES.
+        constraints (dict | list[dict] | None): The data specific to the type of puzzle, as for solve. Either one
+            dictionary shared by every puzzle or a list with one for each puzzle.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+
+    Returns: The solutions, with the same shape and dtype as the puzzles and 0 in every cell of a puzzle that wasn't
+        solved, and the status of each puzzle as a uint8 array of codes, the index of "solved", "unsolvable" or
+        "invalid" in ARRAY_STATUSES. A puzzle is invalid if it has a number out of range, and unsolvable if it has no
+        solution, including a number given twice in a row, column or block. Raises ValueError if the array isn't a
+        stack of square grids, or if there isn't one constraints dictionary for each puzzle.
+    """
+
+    if sudoku_type not in PUZZLE_TYPES:
+        raise ValueError("Unknown puzzle type: " + str(sudoku_type))
+    puzzles = np.asarray(puzzles)
+    if puzzles.ndim != 3 or puzzles.shape[1] != puzzles.shape[2]:
+        raise ValueError("The puzzles must have shape (N, grid_dim, grid_dim), not " + str(puzzles.shape) + ".")
+    count, grid_dim = puzzles.shape[0], puzzles.shape[1]
+    if constraints is None:
+        constraints = {}
+    if isinstance(constraints, list) and len(constraints) != count:
+        raise ValueError("There must be one constraints dictionary for each puzzle.")
+    for puzzle_constraints in (constraints if isinstance(constraints, list) else [constraints]):
+        check_constraints(sudoku_type, grid_dim, puzzle_constraints)
+
+    status = np.full(count, ARRAY_STATUSES.index("unsolvable"), dtype=np.uint8)
+    solutions = np.zeros_like(puzzles)
+    invalid = ((puzzles < 0) | (puzzles > grid_dim)).any(axis=(1, 2))
+    status[invalid] = ARRAY_STATUSES.index("invalid")
+    to_solve = ~invalid
+    to_solve[np.flatnonzero(~invalid)[duplicate_givens(puzzles[~invalid], sudoku_type)]] = False
+
+    var_map = get_var_map(grid_dim)
+    for i in np.flatnonzero(to_solve):
+        layout_constraints = constraints[i] if isinstance(constraints, list) else constraints
+        sat_solver = get_layout_solver(sudoku_type, grid_dim, layout_constraints, encoding, solver_name).sat_solver
+        if sat_solver.solve(assumptions=var_map.given_vars(puzzles[i])):  # There exists a solution
+            solutions[i] = var_map.decode_array(sat_solver.get_model())
+            status[i] = ARRAY_STATUSES.index("solved")
+    return solutions, status
+
+
+def duplicate_givens(puzzles: np.ndarray, sudoku_type: str = "sudoku") -> np.ndarray:
+    """ Finds the puzzles in a NumPy array with a number given twice in a row, column or block.
+
+    Every known value is given a key from its puzzle, its unit and the number, and a key that occurs more than once is
+    a repeated number, so every puzzle is checked at once.
+
+    Args:
+        puzzles (np.ndarray): The puzzles, with shape (N, grid_dim, grid_dim), 0 where a cell is empty and no number
+            above grid_dim.
+        sudoku_type (str): The type of puzzle. Only hyper sudoku has units other than the rows, columns and blocks.
+
+    Returns: A boolean array with shape (N,), True for each puzzle with a repeated number.
+    """
+
+    count, grid_dim = puzzles.shape[0], puzzles.shape[1]
+    units = unit_cells(grid_dim, "hyper_sudoku" if sudoku_type == "hyper_sudoku" else "sudoku")
+    unit_ids = np.repeat(np.arange(len(units)), [len(unit) for unit in units])
+    cells = np.array([cell for unit in units for cell in unit])
+    values = puzzles.reshape(count, grid_dim ** 2)[:, cells].astype(np.int64)  # One column for each unit and cell
+    keys = ((np.arange(count)[:, None] * len(units)) + unit_ids) * (grid_dim + 1) + values
+    keys, key_counts = np.unique(keys[values > 0], return_counts=True)
+    repeated = np.zeros(count, dtype=bool)
+    repeated[keys[key_counts > 1] // (len(units) * (grid_dim + 1))] = True
+    return repeated
+
+
+def export_dimacs(puzzle: list[list[int | str]], path: str, sudoku_type: str = "sudoku",
+                  constraints: dict | None = None, encoding: str = "auto") -> tuple[int, int]:
+    """ Writes the formula for a puzzle to a DIMACS file, e.g. to give it to another SAT solver.
+
+    The clauses are written as they are generated (see stream_clauses), so the formula is never collected into a list.
+    The known values are unit clauses, so the file can be solved on its own.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        path (str): The file to write.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        constraints (dict | None): The data specific to the type of puzzle, as for solve.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+
+    Returns: The number of variables and the number of clauses written.
+    """
+
+    if sudoku_type not in PUZZLE_TYPES:
+        raise ValueError("Unknown puzzle type: " + str(sudoku_type))
+    grid_dim = check_puzzle(puzzle)
+    if constraints is None:
+        constraints = {}
+    check_constraints(sudoku_type, grid_dim, constraints)
+    comments = [sudoku_type + " " + str(grid_dim) + " x " + str(grid_dim) + ", " + choose_encoding(grid_dim, encoding)
+                + " encoding", "variable = number + grid_dim * column + grid_dim ** 2 * row, as in ncr_to_var"]
+    return write_dimacs(stream_clauses(puzzle, sudoku_type, grid_dim, constraints, encoding), path,
+                        comments=comments)
+
+
+def load_dimacs(path: str, solver_name: str = "glucose3") -> SatSolver:
+    """ Loads a DIMACS file into a new SAT solver.
+
+    Args:
+        path (str): The file to read, e.g. from export_dimacs.
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+
+    Returns: The SAT solver, with the clauses added. The caller should delete it once it is done with it.
+    """
+
+    sat_solver = SatSolver(solver_name)
+    sat_solver.append_formula(read_dimacs(path)[1])
+    return sat_solver
+
+
+def cached_formula(sudoku_type: str, grid_dim: int, constraints: dict, encoding: str,
+                   cache_dir: str) -> list[list[int]]:
+    """ Gets the formula for an empty puzzle with a layout from the cache on disk, encoding and saving it the first
+    time.
+
+    The formulas are DIMACS files named by formula_key, so a layout (e.g. a set of killer sudoku cages) always maps to
+    the same file and a changed layout to a different one. A file is written under a temporary name and then renamed,
+    so processes sharing the cache never read a half written formula.
+
+    Args:
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the grid.
+        constraints (dict): The data specific to the type of puzzle.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        cache_dir (str): The directory of the cache, created if it doesn't exist.
+
+    Returns: The formula as a list of clauses.
+    """
+
+    path = cache_path(cache_dir, formula_key(sudoku_type, grid_dim, constraints, choose_encoding(grid_dim, encoding)))
+    if os.path.exists(path):
+        try:
+            return read_dimacs(path)[1]
+        except ValueError:  # A corrupt file is encoded again and replaced, rather than loaded without some clauses
+            pass
+    empty_puzzle = [[0] * grid_dim for _ in range(grid_dim)]
+    formula = define_clauses(empty_puzzle, sudoku_type, grid_dim, constraints, encoding)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary_path = path + "." + str(os.getpid()) + ".tmp"
+    write_dimacs(formula, temporary_path)
+    os.replace(temporary_path, path)
+    return formula
+
+
+def choose_backend(sudoku_type: str, grid_dim: int, backend: str = "auto") -> str:
+    """ Works out whether to solve a puzzle with the SAT solver or by backtracking.
+
+    Args:
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the grid.
+        backend (str): One of BACKENDS, or "auto" to choose the faster one for the type and size of puzzle.
+
+    Returns: The name of the backend.
+    """
+
+    if backend == "auto":
+        # Backtracking takes microseconds on small grids, where building the SAT solver would take longer than solving.
+        # From 9 x 9 up, the SAT solver (with its rules already loaded) is as fast on easy puzzles and much faster on
+        # hard ones.
+        if sudoku_type in BACKTRACK_TYPES and grid_dim <= 6:
+            return "backtrack"
+        return "sat"
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend: " + str(backend))
+    if backend == "backtrack" and sudoku_type not in BACKTRACK_TYPES:
+        raise ValueError("Only " + " and ".join(BACKTRACK_TYPES) + " puzzles can be solved by backtracking.")
+    return backend
+
+
+def solve_residual(masks: list[int], grid_dim: int, sudoku_type: str = "sudoku", encoding: str = "auto",
+                   solver_name: str = "glucose3", stats: SolveStats | None = None,
+                   cancel: CancelToken | None = None, limits: SolveLimits | None = None) -> list[int] | None:
+    """ Solves what is left of a standard or hyper sudoku puzzle after propagation, with a new SAT solver.
+
+    Args:
+        masks (list[int]): The candidates of each cell, from propagate.
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku".
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS or "auto".
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+        stats (SolveStats | None): Where to record the timings and counts, if anywhere.
+        cancel (CancelToken | None): Lets another thread cancel the solve, if given.
+        limits (SolveLimits | None): The limits for the SAT solver call, if any.
+
+    Returns: The value of each cell, from left to right, up to down, or None if there is no solution.
+    """
+
+    sat_solver = SatSolver(solver_name)
+    with timed(stats, "encode"):
+        formula = residual_clauses(masks, grid_dim, sudoku_type, encoding)
+    with timed(stats, "load"):
+        sat_solver.append_formula(formula)
+    try:
+        with timed(stats, "sat"):
+            satisfiable = sat_solve(sat_solver, [], cancel, limits)
+    except (SolveCancelled, SolveTimeout):
+        sat_solver.delete()
+        raise
+    if stats is not None:
+        stats.add_count("clauses", len(formula))
+        stats.add_count("variables", sat_solver.nof_vars())
+        record_solver_stats(stats, sat_solver)
+    with timed(stats, "decode"):
+        solution = decode_residual(sat_solver.get_model(), masks, grid_dim) if satisfiable else None
+    sat_solver.delete()
+    return solution
+
+
+def solve_portfolio(puzzle: list[list[int | str]], sudoku_type: str = "sudoku", constraints: dict | None = None,
+                    encoding: str = "auto", solver_names: list[str] | None = None, timeout: float | None = None,
+                    cancel: CancelToken | None = None) -> tuple[str, list[int] | None]:
+    """ Races several SAT solvers on a puzzle in separate processes and returns the first answer.
+
+    How long a solver takes on a hard puzzle varies a lot from one solver to another, so the first of several to finish
+    is usually much faster than any one of them on its own. Once one solver has answered the others are terminated.
+    Each process builds its own formula, so nothing large has to be sent between processes. Standard and hyper sudoku
+    puzzles are propagated first, and only the residual clauses are built.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        constraints (dict | None): The data specific to the type of puzzle.
+        encoding (str): The at-most-one encoding for the sudoku rules, one of AMO_ENCODINGS or "auto".
+        solver_names (list[str] | None): The SAT solvers to race, from SAT_SOLVERS. Defaults to PORTFOLIO.
+        timeout (float | None): How long to wait for an answer, in seconds, or None to wait as long as it takes.
+        cancel (CancelToken | None): Lets another thread cancel the race, if given. It is checked every
+            CANCEL_POLL_INTERVAL seconds, and the processes are terminated once it has been cancelled.
+
+    Returns: The name of the solver that answered first, and the value of each cell from left to right, up to down, or
+        None if there is no solution. Raises SolveTimeout (a TimeoutError) if no solver answers in time, and
+        RuntimeError if they all fail.
+    """
+
+    if solver_names is None:
+        solver_names = PORTFOLIO
+    for solver_name in solver_names:
+        if solver_name not in SAT_SOLVERS:
+            raise ValueError("Unknown SAT solver: " + str(solver_name))
+    if constraints is None:
+        constraints = {}
+    puzzle = [[int(value) for value in row] for row in puzzle]
+    masks = None
+    if sudoku_type in BACKTRACK_TYPES:
+        masks = propagate(puzzle, sudoku_type)
+        if masks is None:  # Propagation found a contradiction
+            return solver_names[0], None
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=portfolio_worker, daemon=True,
+                                         args=(solver_name, puzzle, sudoku_type, constraints, encoding, masks, results))
+                 for solver_name in solver_names]
+    for process in processes:
+        process.start()
+    deadline = None if timeout is None else monotonic() + timeout
+    try:
+        failures = []
+        while len(failures) < len(processes):
+            wait = None if deadline is None else max(deadline - monotonic(), 0)
+            if cancel is not None:
+                wait = CANCEL_POLL_INTERVAL if wait is None else min(wait, CANCEL_POLL_INTERVAL)
+            try:
+                solver_name, solution, error = results.get(timeout=wait)
+            except queue.Empty:
+                if cancel is not None:
+                    cancel.check()
+                if deadline is None or monotonic() < deadline:
+                    continue
+                raise SolveTimeout("No SAT solver in the portfolio answered within " + str(timeout) + " seconds.")
+            if error is None:
+                return solver_name, solution
+            failures.append(solver_name + ": " + error)
+        raise RuntimeError("Every SAT solver in the portfolio failed. " + "; ".join(failures))
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        results.close()
+
+
+def portfolio_worker(solver_name: str, puzzle: list[list[int]], sudoku_type: str, constraints: dict, encoding: str,
+                     masks: list[int] | None, results: multiprocessing.Queue) -> None:
+    """ Solves a puzzle with one SAT solver and puts the answer on a queue. Run in its own process.
+
+    Args:
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+        puzzle (list[list[int]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        sudoku_type (str): The type of puzzle.
+        constraints (dict): The data specific to the type of puzzle.
+        encoding (str): The at-most-one encoding for the sudoku rules.
+        masks (list[int] | None): The candidates of each cell from propagation, to solve only the residual clauses.
+        results (multiprocessing.Queue): Where the answer goes, as the solver name, the value of each cell (or None if
+            there is no solution) and an error message (or None if the solver worked).
+    """
+
+    try:
+        grid_dim = len(puzzle)
+        if masks is not None:
+            solution = solve_residual(masks, grid_dim, sudoku_type, encoding, solver_name)
+        else:
+            sat_solver = SatSolver(solver_name)
+            sat_solver.append_formula(define_clauses(puzzle, sudoku_type, grid_dim, constraints, encoding))
+            if sat_solver.solve():  # There exists a solution
+                solution = decode(sat_solver.get_model(), grid_dim)
+            else:
+                solution = None
+            sat_solver.delete()
+        results.put((solver_name, solution, None))
+    except Exception as error:  # Reported to the parent process, which would otherwise wait for this solver forever
+        results.put((solver_name, None, repr(error)))
+
+
+def get_layout_solver(sudoku_type: str, grid_dim: int, constraints: dict, encoding: str = "auto",
+                      solver_name: str = "glucose3", stats: SolveStats | None = None,
+                      cache_dir: str | None = None) -> LayoutSolver:
+    """ Gets the layout solver for a puzzle layout, creating it if it hasn't been used recently.
+
+    Args:
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the grid.
+        constraints (dict): The data specific to the type of puzzle.
+        encoding (str): The at-most-one encoding for the sudoku rules.
+        solver_name (str): The SAT solver to use, one of SAT_SOLVERS.
+        stats (SolveStats | None): Where to record the time spent encoding, if the layout solver has to be created.
+        cache_dir (str | None): The directory of the formula cache to create the layout solver from, if any.
+
+    Returns: The layout solver.
+    """
+
+    key = layout_key(sudoku_type, grid_dim, constraints) + (encoding, solver_name)
+    if key in _layout_solvers:
+        layout_solver = _layout_solvers.pop(key)
+    else:
+        layout_solver = LayoutSolver(sudoku_type, grid_dim, constraints, encoding, solver_name, stats, cache_dir)
+        if len(_layout_solvers) >= MAX_LAYOUT_SOLVERS:  # Free the least recently used solver
+            _layout_solvers.pop(next(iter(_layout_solvers))).delete()
+    _layout_solvers[key] = layout_solver  # Most recently used goes last
+    return layout_solver
+
+
+def clear_layout_solvers() -> None:
+    """ Frees all the layout solvers, so the next puzzle of every layout is encoded from scratch. """
+
+    while _layout_solvers:
+        _layout_solvers.popitem()[1].delete()
+
+
+def layout_key(sudoku_type: str, grid_dim: int, constraints: dict) -> tuple:
+    """ Creates a hashable key from the type, size and constraints of a puzzle.
+
+    Args:
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the grid.
+        constraints (dict): The data specific to the type of puzzle.
+
+    Returns: The key as a tuple.
+    """
+
+    key = [sudoku_type, grid_dim]
+    if sudoku_type == "killer_sudoku":
+        key.append(tuple(tuple(cage) for cage in constraints["ks_cages"]))
+        key.append(tuple(constraints["ks_totals"]))
+        key.append(constraints.get("ks_encoding", "combination"))
+    if sudoku_type == "greater_than_sudoku":
+        key.append(tuple(constraints["horizontal_greater"]))
+        key.append(tuple(constraints["vertical_greater"]))
+        key.append(constraints.get("gt_encoding", "order"))
+    return tuple(key)
+
+
+def check_puzzle(puzzle: list[list[int | str]]) -> int:
+    """ Checks that a puzzle is a square grid of numbers in the right range, with a size that splits into blocks.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array.
+
+    Returns: The side length of the grid.
+    """
+
+    grid_dim = len(puzzle)
+    block_dims(grid_dim)  # Raises ValueError if the grid is too big or can't be split into blocks
+    for row in puzzle:
+        if len(row) != grid_dim:
+            raise ValueError("The puzzle must be a square grid.")
+        for value in row:
+            if not 0 <= int(value) <= grid_dim:
+                raise ValueError("Numbers must be less than " + str(grid_dim + 1))
+    return grid_dim
+
+
+def check_constraints(sudoku_type: str, grid_dim: int, constraints: dict) -> None:
+    """ Checks that a type of puzzle can have a grid size, and that it has the constraints it needs.
+
+    Raises ValueError if a killer, hyper or greater than sudoku isn't VARIANT_GRID_DIM x VARIANT_GRID_DIM, if any of
+    REQUIRED_CONSTRAINTS are missing, or if the cages or inequalities don't fit the grid, so a bad puzzle is reported
+    before it reaches the encoders.
+
+    Args:
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        grid_dim (int): The side length of the grid.
+        constraints (dict): The data specific to the type of puzzle.
+    """
+
+    if sudoku_type != "sudoku" and grid_dim != VARIANT_GRID_DIM:
+        raise ValueError(sudoku_type + " puzzles must be " + str(VARIANT_GRID_DIM) + " x " + str(VARIANT_GRID_DIM)
+                         + ".")
+    missing = [name for name in REQUIRED_CONSTRAINTS[sudoku_type] if name not in constraints]
+    if missing:
+        raise ValueError(sudoku_type + " puzzles need the constraints " + ", ".join(missing) + ".")
+    if sudoku_type == "killer_sudoku":
+        if len(constraints["ks_cages"]) != len(constraints["ks_totals"]):
+            raise ValueError("There must be one total for each cage.")
+        if not all(0 <= cell < grid_dim ** 2 for cage in constraints["ks_cages"] for cell in cage):
+            raise ValueError("Cage cells must be from 0 to " + str(grid_dim ** 2 - 1) + ".")
+    if sudoku_type == "greater_than_sudoku":
+        for name, directions in [("horizontal_greater", ("left", "right")), ("vertical_greater", ("up", "down"))]:
+            if len(constraints[name]) != GT_INEQUALITIES or not set(constraints[name]) <= set(directions):
+                raise ValueError(name + " must be " + str(GT_INEQUALITIES) + " of " + " or ".join(directions) + ".")
+
+
+def decode(model: list[int], grid_dim: int) -> list[int]:
+    """ Converts the model found by the SAT solver into the values of the cells.
+
+    Args:
+        model (list[int]): The model from the SAT solver.
+        grid_dim (int): The side length of the grid.
+
+    Returns: The value of each cell, from left to right, up to down.
+    """
+
+    return get_var_map(grid_dim).decode(model)
+
+
+def decode_residual(model: list[int], masks: list[int], grid_dim: int) -> list[int]:
+    """ Converts the model for a residual formula into the values of the cells.
+
+    Args:
+        model (list[int]): The model from the SAT solver.
+        masks (list[int]): The candidates of each cell, from propagate.
+        grid_dim (int): The side length of the grid.
+
+    Returns: The value of each cell, from left to right, up to down.
+    """
+
+    return get_var_map(grid_dim).decode(model, masks)
+
+
+def record_solver_stats(stats: SolveStats, sat_solver: SatSolver, before: dict | None = None) -> None:
+    """ Records the conflicts, decisions and propagations of a SAT solver call.
+
+    Args:
+        stats (SolveStats): Where to record them.
+        sat_solver (SatSolver): The SAT solver, after the call.
+        before (dict | None): The solver's accum_stats from before the call, for a solver that has been used before.
+    """
+
+    after = sat_solver.accum_stats()
+    for name in ("conflicts", "decisions", "propagations"):
+        stats.add_count(name, after.get(name, 0) - (before.get(name, 0) if before is not None else 0))
+
+
+def sat_solve(sat_solver: SatSolver, assumptions: list[int], cancel: CancelToken | None = None,
+              limits: SolveLimits | None = None) -> bool:
+    """ Runs a SAT solver, within any limits and so that it can be cancelled if there is a cancel token.
+
+    Args:
+        sat_solver (SatSolver): The SAT solver, with its clauses loaded.
+        assumptions (list[int]): The assumptions for the call.
+        cancel (CancelToken | None): Lets another thread interrupt the solver, if given.
+        limits (SolveLimits | None): The limits for the call, if any.
+
+    Returns: Whether the formula is satisfiable. Raises SolveCancelled if the solve was cancelled, and SolveTimeout if
+        a limit was reached.
+    """
+
+    if cancel is None and limits is None:
+        return sat_solver.solve(assumptions=assumptions)
+    if cancel is None:
+        cancel = CancelToken()  # Only used to interrupt the solver when the time runs out
+    return cancel.run(sat_solver, assumptions, limits)
+
+
+def check_stopped(cancel: CancelToken | None = None, limits: SolveLimits | None = None) -> None:
+    """ Checks whether a solve has been cancelled or run out of time, for searches that don't use a SAT solver.
+
+    Args:
+        cancel (CancelToken | None): The cancel token of the solve, if any.
+        limits (SolveLimits | None): The limits of the solve, if any. Only the time limit applies, as the conflict and
+            propagation limits are budgets for the SAT solver.
+
+    Returns: None. Raises SolveCancelled if the solve was cancelled, and SolveTimeout if the time has run out.
+    """
+
+    if cancel is not None:
+        cancel.check()
+    if limits is not None:
+        limits.remaining()
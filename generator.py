@@ -0,0 +1,316 @@
+""" Generating puzzles with a unique solution, for every type of puzzle and grid size.
+
+A random solved grid is made first. Killer sudoku cages and greater than sudoku inequalities are taken from the solved
+grid. Then clues are removed one at a time, in a random order, keeping each removal only if the puzzle still has one
+solution. The solution is blocked in the layout solver by a single clause, so checking a removal is one incremental
+SAT call with the remaining clues as assumptions. Nothing is encoded again. Many removals don't need the SAT solver at
+all, because the other numbers in the cell's row, column and block already force its value. Grids bigger than 9 x 9
+are checked with propagation instead of the SAT solver by default (see generate).
+
+Generating many puzzles is spread over a process pool, one puzzle per task.
+
+Functions:
+    generate: Generates a puzzle with a unique solution.
+    generate_many: Generates puzzles in parallel, in a process pool.
+    generate_task: Generates the puzzle for one seed. Run in the worker processes.
+    random_solution: Creates a random solved grid.
+    shuffled_solution: Creates a random solved grid by shuffling a patterned one.
+    random_cages: Splits a solved grid into random killer sudoku cages.
+    greater_than_constraints: Creates the inequalities of a greater than sudoku puzzle from a solved grid.
+    remove_clues: Removes as many clues as possible from a solved grid while keeping the solution unique.
+    forced_by_peers: Checks whether the other numbers in a cell's row, column and block leave only one possibility.
+"""
+
+from __future__ import annotations
+from functools import partial
+import multiprocessing
+import os
+import random
+from typing import TYPE_CHECKING
+from clause_creation import GRID_DIMS as SUDOKU_GRID_DIMS, block_dims
+from engine import PUZZLE_TYPES, LayoutSolver, get_layout_solver, solve_residual
+from propagation import cell_peers, propagate
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+GRID_DIMS = {"sudoku": SUDOKU_GRID_DIMS, "killer_sudoku": [9], "hyper_sudoku": [9], "greater_than_sudoku": [9]}
+MAX_CAGE_SIZE = 5
+# Above this size, clues are only removed when their peers force them, as propagating the whole grid after every
+# removal would take tens of minutes for 64 x 64
+MAX_PROPAGATION_DIM = 25
+
+
+def generate(grid_dim: int = 9, sudoku_type: str = "sudoku", seed: int | None = None,
+             logic_only: bool | None = None) -> tuple[list[list[int]], dict, list[list[int]]]:
+    """ Generates a puzzle with a unique solution.
+
+    Args:
+        grid_dim (int): The side length of the grid. Killer, hyper and greater than sudoku are only 9 x 9.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        seed (int | None): The seed for the random number generator, so the same puzzle is generated every time, or
+            None for a different puzzle every time.
+        logic_only (bool | None): Whether to only remove clues while propagation can still solve the puzzle, instead
+            of checking with the SAT solver. The puzzles have more clues, but checking a 16 x 16 or larger puzzle with
+            few clues can take the SAT solver seconds. Defaults to True for grids bigger than 9 x 9. Only for standard
+            and hyper sudoku.
+
+    Returns: The puzzle as a 2D array with 0 where a cell is empty, the constraints for the type of puzzle (as used by
+        engine.solve) and the solution.
+    """
+
+    if sudoku_type not in PUZZLE_TYPES:
+        raise ValueError("Unknown puzzle type: " + str(sudoku_type))
+    if grid_dim not in GRID_DIMS[sudoku_type]:
+        raise ValueError(sudoku_type + " puzzles can't be " + str(grid_dim) + " x " + str(grid_dim))
+    if logic_only is None:
+        logic_only = grid_dim > 9
+    if logic_only and sudoku_type not in ("sudoku", "hyper_sudoku"):
+        raise ValueError("Only sudoku and hyper sudoku puzzles can be generated with propagation only.")
+    rng = random.Random(seed)
+
+    solution = random_solution(grid_dim, "hyper_sudoku" if sudoku_type == "hyper_sudoku" else "sudoku", rng)
+    constraints = {}
+    if sudoku_type == "killer_sudoku":
+        constraints = random_cages(solution, rng)
+    if sudoku_type == "greater_than_sudoku":
+        constraints = greater_than_constraints(solution)
+
+    if logic_only:
+        puzzle = remove_clues(solution, sudoku_type, rng)
+    elif sudoku_type in ("sudoku", "hyper_sudoku"):  # Same layout every time, so use the shared solver
+        puzzle = remove_clues(solution, sudoku_type, rng, get_layout_solver(sudoku_type, grid_dim, constraints))
+    else:
+        layout_solver = LayoutSolver(sudoku_type, grid_dim, constraints)
+        puzzle = remove_clues(solution, sudoku_type, rng, layout_solver)
+        layout_solver.delete()
+    return puzzle, constraints, solution
+
+
+def generate_many(count: int, grid_dim: int = 9, sudoku_type: str = "sudoku", seed: int = 0, workers: int | None = None,
+                  logic_only: bool | None = None) -> Iterator[tuple[list[list[int]], dict, list[list[int]]]]:
+    """ Generates puzzles in parallel, in a process pool.
+
+    Puzzle i is generated with seed + i, so the same puzzles come out every time (though with more than one worker,
+    not necessarily in the same order).
+
+    Args:
+        count (int): The number of puzzles.
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        seed (int): The seed of the first puzzle.
+        workers (int | None): The number of worker processes. Defaults to one per CPU.
+        logic_only (bool | None): Whether to check removals with propagation only, as for generate.
+
+    Yields: The puzzle, its constraints and its solution, as for generate, as soon as each is ready.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    task = partial(generate_task, grid_dim=grid_dim, sudoku_type=sudoku_type, logic_only=logic_only)
+    if workers == 1:
+        yield from map(task, range(seed, seed + count))
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(task, range(seed, seed + count))
+
+
+def generate_task(seed: int, grid_dim: int = 9, sudoku_type: str = "sudoku",
+                  logic_only: bool | None = None) -> tuple[list[list[int]], dict, list[list[int]]]:
+    """ Generates the puzzle for one seed. Run in the worker processes.
+
+    Args:
+        seed (int): The seed for the random number generator.
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        logic_only (bool | None): Whether to check removals with propagation only, as for generate.
+
+    Returns: The puzzle, its constraints and its solution, as for generate.
+    """
+
+    return generate(grid_dim, sudoku_type, seed, logic_only)
+
+
+def random_solution(grid_dim: int, sudoku_type: str, rng: random.Random) -> list[list[int]]:
+    """ Creates a random solved grid.
+
+    The first row is a random order of the numbers, then a few more cells are given random numbers that propagation
+    still allows. A new SAT solver fills in the rest, as the shared layout solver's answer depends on what it has
+    learnt from earlier puzzles and so wouldn't be the same for the same seed. If the random numbers turn out to have
+    no solution, it starts again. Grids bigger than 9 x 9 are made by shuffled_solution instead, as an almost empty
+    16 x 16 or larger grid can take the SAT solver minutes to fill in.
+
+    Args:
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku".
+        rng (random.Random): The random number generator.
+
+    Returns: The grid as a 2D array of integers.
+    """
+
+    if grid_dim > 9:
+        return shuffled_solution(grid_dim, rng)
+    while True:
+        puzzle = [[0] * grid_dim for _ in range(grid_dim)]
+        puzzle[0] = rng.sample(range(1, grid_dim + 1), grid_dim)
+        masks = propagate(puzzle, sudoku_type, locked_candidates=False)
+        for cell in rng.sample(range(grid_dim, grid_dim ** 2), grid_dim):
+            if masks is None:
+                break
+            if masks[cell] & (masks[cell] - 1):  # Not already decided
+                candidates = [n + 1 for n in range(grid_dim) if masks[cell] & (1 << n)]
+                puzzle[cell // grid_dim][cell % grid_dim] = rng.choice(candidates)
+                masks = propagate(puzzle, sudoku_type, locked_candidates=False)
+        if masks is not None:
+            values = solve_residual(masks, grid_dim, sudoku_type)
+            if values is not None:
+                return [values[r * grid_dim:(r + 1) * grid_dim] for r in range(grid_dim)]
+
+
+def shuffled_solution(grid_dim: int, rng: random.Random) -> list[list[int]]:
+    """ Creates a random solved grid by shuffling a patterned one.
+
+    The numbers are relabelled, and the rows and columns are shuffled within their bands and stacks of blocks, which
+    keeps every row, column and block valid.
+
+    Args:
+        grid_dim (int): The side length of the grid.
+        rng (random.Random): The random number generator.
+
+    Returns: The grid as a 2D array of integers.
+    """
+
+    block_rows, block_cols = block_dims(grid_dim)
+    labels = rng.sample(range(1, grid_dim + 1), grid_dim)
+    bands = rng.sample(range(grid_dim // block_rows), grid_dim // block_rows)
+    stacks = rng.sample(range(grid_dim // block_cols), grid_dim // block_cols)
+    rows = [(band * block_rows) + r for band in bands for r in rng.sample(range(block_rows), block_rows)]
+    cols = [(stack * block_cols) + c for stack in stacks for c in rng.sample(range(block_cols), block_cols)]
+    return [[labels[((block_cols * (r % block_rows)) + (r // block_rows) + c) % grid_dim] for c in cols] for r in rows]
+
+
+def random_cages(solution: list[list[int]], rng: random.Random) -> dict:
+    """ Splits a solved grid into random killer sudoku cages.
+
+    Each cage grows from a random cell into neighbouring cells (left, right, up or down) that aren't in a cage yet, up
+    to MAX_CAGE_SIZE cells and never repeating a number.
+
+    Args:
+        solution (list[list[int]]): A solved 9 x 9 grid.
+        rng (random.Random): The random number generator.
+
+    Returns: The constraints of the killer sudoku puzzle, i.e. ks_cages and ks_totals.
+    """
+
+    values = [value for row in solution for value in row]
+    caged = [False] * 81
+    cages = []
+    for start in rng.sample(range(81), 81):
+        if caged[start]:
+            continue
+        cage = [start]
+        caged[start] = True
+        size = rng.randint(1, MAX_CAGE_SIZE)
+        while len(cage) < size:
+            neighbours = []
+            for cell in cage:
+                for neighbour in (cell - 9, cell + 9, cell - 1 if cell % 9 else -1, cell + 1 if cell % 9 != 8 else -1):
+                    if 0 <= neighbour < 81 and not caged[neighbour] and \
+                            values[neighbour] not in [values[i] for i in cage]:
+                        neighbours.append(neighbour)
+            if not neighbours:
+                break
+            neighbour = rng.choice(neighbours)
+            cage.append(neighbour)
+            caged[neighbour] = True
+        cages.append(sorted(cage))
+    return {"ks_cages": cages, "ks_totals": [sum(values[cell] for cell in cage) for cage in cages]}
+
+
+def greater_than_constraints(solution: list[list[int]]) -> dict:
+    """ Creates the inequalities of a greater than sudoku puzzle from a solved grid.
+
+    Args:
+        solution (list[list[int]]): A solved 9 x 9 grid.
+
+    Returns: The constraints of the greater than sudoku puzzle, i.e. horizontal_greater and vertical_greater.
+    """
+
+    values = [value for row in solution for value in row]
+    horizontal_greater = []
+    vertical_greater = []
+    for i in range(54):
+        left_cell = i + (i // 2)
+        up_cell = i + (9 * (i // 18))
+        horizontal_greater.append("left" if values[left_cell] > values[left_cell + 1] else "right")
+        vertical_greater.append("up" if values[up_cell] > values[up_cell + 9] else "down")
+    return {"horizontal_greater": horizontal_greater, "vertical_greater": vertical_greater}
+
+
+def remove_clues(solution: list[list[int]], sudoku_type: str, rng: random.Random,
+                 layout_solver: LayoutSolver | None = None) -> list[list[int]]:
+    """ Removes as many clues as possible from a solved grid while keeping the solution unique.
+
+    With a layout solver, a clause saying "not this solution", switched on by a new activation variable, is added to
+    it. While it is switched on, any solution the SAT solver finds is a second solution, so a removal is safe if the SAT
+    solver finds nothing. The clause is switched off for good at the end. Without a layout solver, a removal is only
+    kept if propagation can still solve the whole puzzle, which also means the solution is unique. Grids bigger than
+    MAX_PROPAGATION_DIM only lose clues that are forced by their peers when they are removed. Filling the removed
+    cells back in, last removed first, each one is forced again, so the solution is still unique.
+
+    Args:
+        solution (list[list[int]]): The solved grid.
+        sudoku_type (str): The type of puzzle. Only standard and hyper sudoku can be checked without a layout solver.
+        rng (random.Random): The random number generator, for the order the clues are tried in.
+        layout_solver (LayoutSolver | None): The layout solver for the puzzle's type, size and constraints, or None to
+            check removals with propagation only.
+
+    Returns: The puzzle as a 2D array, with 0 where a cell is empty.
+    """
+
+    grid_dim = len(solution)
+    rule_type = "hyper_sudoku" if sudoku_type == "hyper_sudoku" else "sudoku"
+    peers = cell_peers(grid_dim, rule_type)
+    puzzle = [row[:] for row in solution]
+    if layout_solver is not None:
+        layout_solver.top_var = layout_solver.top_var + 1
+        activation_var = layout_solver.top_var
+        layout_solver.sat_solver.add_clause([- activation_var] + [- var for var in layout_solver.assumptions(solution)])
+
+    for cell in rng.sample(range(grid_dim ** 2), grid_dim ** 2):
+        r, c = divmod(cell, grid_dim)
+        puzzle[r][c] = 0
+        if forced_by_peers(puzzle, cell, peers):
+            continue
+        if layout_solver is None and grid_dim > MAX_PROPAGATION_DIM:
+            puzzle[r][c] = solution[r][c]
+        elif layout_solver is None:
+            masks = propagate(puzzle, rule_type)
+            if masks is None or any(mask & (mask - 1) for mask in masks):  # Not solved by propagation
+                puzzle[r][c] = solution[r][c]
+        elif layout_solver.sat_solver.solve(assumptions=layout_solver.assumptions(puzzle) + [activation_var]):
+            puzzle[r][c] = solution[r][c]  # Another solution, so the clue is needed
+
+    if layout_solver is not None:
+        layout_solver.sat_solver.add_clause([- activation_var])
+    return puzzle
+
+
+def forced_by_peers(puzzle: list[list[int]], cell: int, peers: tuple[tuple[int, ...], ...]) -> bool:
+    """ Checks whether the other numbers in a cell's row, column and block leave only one possibility.
+
+    Args:
+        puzzle (list[list[int]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        cell (int): The index of the cell.
+        peers (tuple[tuple[int, ...], ...]): The peers of each cell, from propagation.cell_peers.
+
+    Returns: True if every number but one is in a peer of the cell.
+    """
+
+    grid_dim = len(puzzle)
+    used = 0
+    for peer in peers[cell]:
+        value = puzzle[peer // grid_dim][peer % grid_dim]
+        if value:
+            used |= 1 << (value - 1)
+    return used.bit_count() == grid_dim - 1
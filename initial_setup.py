@@ -10,6 +10,7 @@ from __future__ import annotations
 import tkinter as tk
 from tkinter import ttk
 from typing import TYPE_CHECKING
+from clause_creation import GRID_DIMS
 from ks_cages_setup import ks_total_clicked, KillerSudokuCageDef
 from misc_funcs import size_str_to_int
 from puzzle_grids import GreaterThanSudokuGrid, HyperSudokuGrid, KillerSudokuGrid, SudokuGrid
@@ -143,7 +144,7 @@ class App(tk.Tk):
             cell_texts[i].configure(state="normal")
             cell_texts[i].tag_add("make black", "1.0", "end")
             cell_texts[i].tag_config("make black", foreground="black")
-            cell_texts[i].delete("1.0")
+            cell_texts[i].delete("1.0", "end")
 
     def ks_done_button_clicked(self) -> None:
         """ User has finished adding a total to a killer sudoku cage.
@@ -225,7 +226,7 @@ class PuzzleConfig:
         grid_size_label.grid(column=0, row=0, )
         self.current_size = tk.StringVar()
         self.grid_size_combobox = ttk.Combobox(self.grid_size_frame, textvariable=self.current_size, state="readonly",
-                                               values=["4 x 4", "6 x 6", "9 x 9", "16 x 16", "25 x 25"])
+                                               values=[str(n) + " x " + str(n) for n in GRID_DIMS])
         self.grid_size_combobox.set("9 x 9")
         self.grid_size_combobox.grid(column=1, row=0, padx=5)
 
@@ -1,5 +1,10 @@
-from initial_setup import App
+import sys
 
 if __name__ == "__main__":
-    app = App()
-    app.mainloop()
+    if len(sys.argv) > 1:  # Solve puzzles from the command line, see batch.py
+        from batch import main
+        sys.exit(main(sys.argv[1:]))
+    else:
+        from initial_setup import App
+        app = App()
+        app.mainloop()
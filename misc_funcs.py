@@ -3,10 +3,14 @@
 Functions:
     i_to_rc: Converts the index of a cell to row and column coordinates.
     disable_cell_text: Disables a list of text boxes, so the contents of the text boxes can no longer be modified.
+    enable_cell_text: Enables a list of text boxes again, so the user can change their contents.
     size_str_to_int: Converts string representation of a grid size to a more useful integer.
 """
 
-import tkinter as tk
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    import tkinter as tk
 
 
 def i_to_rc(i: int, grid_dim: int) -> tuple[int, int]:
@@ -34,21 +38,23 @@ def disable_cell_text(cell_texts: list[tk.Text], grid_dim: int) -> None:
         cell_texts[i].configure(state="disabled")
 
 
+def enable_cell_text(cell_texts: list[tk.Text], grid_dim: int) -> None:
+    """ Enables a list of text boxes again, so the user can change their contents.
+
+    Args:
+        cell_texts (list[Text]): list of text boxes, one for each cell in a puzzle grid.
+        grid_dim (int): The height/width of the grid.
+    """
+    for i in range(grid_dim ** 2):
+        cell_texts[i].configure(state="normal")
+
+
 def size_str_to_int(number_string: str) -> int:
     """ Converts string representation of a grid size to a more useful integer.
 
     Args:
-        number_string (str): The dimension of the grid.
+        number_string (str): The dimension of the grid, e.g. "9 x 9".
 
     Returns: The side of length of the grid as an int.
     """
-    if number_string == "4 x 4":
-        return 4
-    if number_string == "6 x 6":
-        return 6
-    if number_string == "9 x 9":
-        return 9
-    if number_string == "16 x 16":
-        return 16
-    if number_string == "25 x 25":
-        return 25
+    return int(number_string.split(" x ")[0])  # E.g. "12 x 12", where both sides are the same
@@ -0,0 +1,271 @@
+""" Logical solving of the standard sudoku rules, used to shrink (or avoid) the work given to the SAT solver.
+
+The candidates for each cell are kept as a bitmask, bit n - 1 for number n. Three techniques are applied until none of
+them makes progress: naked singles (a cell has one candidate left), hidden singles (a number has one place left in a
+row, column or block) and locked candidates (the places for a number in one unit all lie in another unit, so the number
+can't go anywhere else in that other unit).
+
+Functions:
+    propagate: Finds the candidates for every cell using naked singles, hidden singles and locked candidates.
+    unit_cells: Lists the cells in each row, column and block.
+    cell_peers: Lists the cells that share a row, column or block with each cell.
+    unit_intersections: Lists the pairs of units that share more than one cell.
+    assign: Puts a number in a cell and removes it from the candidates of the cell's peers.
+    eliminate: Removes candidates from a cell.
+    masks_to_values: Converts candidate masks to cell values, 0 where a cell has more than one candidate.
+    residual_clauses: Creates the clauses for the cells that propagation couldn't solve.
+"""
+
+from __future__ import annotations
+from functools import lru_cache
+from backtrack import cell_units
+from clause_creation import at_most_one, choose_encoding, ncr_to_var
+
+
+def propagate(puzzle: list[list[int | str]], sudoku_type: str = "sudoku", locked_candidates: bool = True,
+              hidden_singles: bool = True) -> list[int] | None:
+    """ Finds the candidates for every cell using naked singles, hidden singles and locked candidates.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        sudoku_type (str): "hyper_sudoku" to include the extra hyper sudoku blocks. Any other type only uses the
+            standard rules, which still apply to killer and greater than sudoku.
+        locked_candidates (bool): Whether to use locked candidates as well as singles.
+        hidden_singles (bool): Whether to use hidden singles. If False, only naked singles are used.
+
+    Returns: The candidates of each cell as a bitmask, from left to right, up to down, or None if the puzzle has no
+        solution. Raises ValueError for a hyper sudoku grid that isn't 9 x 9 (see backtrack.cell_units).
+    """
+
+    grid_dim = len(puzzle)
+    if sudoku_type != "hyper_sudoku":
+        sudoku_type = "sudoku"
+    units = unit_cells(grid_dim, sudoku_type)
+    peers = cell_peers(grid_dim, sudoku_type)
+    masks = [(1 << grid_dim) - 1] * (grid_dim ** 2)
+
+    for r in range(grid_dim):
+        for c in range(grid_dim):
+            if int(puzzle[r][c]) != 0:
+                bit = 1 << (int(puzzle[r][c]) - 1)
+                if not masks[(r * grid_dim) + c] & bit or not assign(masks, (r * grid_dim) + c, bit, peers):
+                    return None
+
+    all_numbers = (1 << grid_dim) - 1
+    changed = hidden_singles
+    while changed:
+        changed = False
+
+        # Hidden singles. A number that is a candidate in exactly one cell of a unit has to go in that cell.
+        for unit in units:
+            once = 0  # Numbers that are a candidate in at least one cell
+            twice = 0  # Numbers that are a candidate in at least two cells
+            placed = 0
+            for cell in unit:
+                mask = masks[cell]
+                twice |= once & mask
+                once |= mask
+                if mask & (mask - 1) == 0:
+                    placed |= mask
+            if once != all_numbers:  # A number can't go anywhere in this unit
+                return None
+            hidden = once & ~twice & ~placed
+            while hidden:
+                bit = hidden & - hidden
+                hidden ^= bit
+                for cell in unit:
+                    if masks[cell] & bit:
+                        if not assign(masks, cell, bit, peers):
+                            return None
+                        break
+                changed = True
+        if changed or not locked_candidates:
+            continue
+
+        # Locked candidates. Numbers that can only go in the cells a unit shares with another unit can't go anywhere
+        # else in the other unit.
+        for shared, unit_rest, other_rest in unit_intersections(grid_dim, sudoku_type):
+            in_shared = 0
+            for cell in shared:
+                in_shared |= masks[cell]
+            in_rest = 0
+            for cell in unit_rest:
+                in_rest |= masks[cell]
+            locked = in_shared & ~in_rest
+            if locked:
+                for cell in other_rest:
+                    if masks[cell] & locked:
+                        if not eliminate(masks, cell, locked, peers):
+                            return None
+                        changed = True
+
+    return masks
+
+
+@lru_cache(maxsize=None)
+def unit_cells(grid_dim: int, sudoku_type: str = "sudoku") -> tuple[tuple[int, ...], ...]:
+    """ Lists the cells in each row, column and block.
+
+    Args:
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku".
+
+    Returns: For each unit (numbered as in backtrack.cell_units), the indices of its cells.
+    """
+
+    units = {}
+    for cell, cell_unit_list in enumerate(cell_units(grid_dim, sudoku_type)):
+        for unit in cell_unit_list:
+            units.setdefault(unit, []).append(cell)
+    return tuple(tuple(units[unit]) for unit in sorted(units))
+
+
+@lru_cache(maxsize=None)
+def cell_peers(grid_dim: int, sudoku_type: str = "sudoku") -> tuple[tuple[int, ...], ...]:
+    """ Lists the cells that share a row, column or block with each cell.
+
+    Args:
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku".
+
+    Returns: For each cell, the indices of its peers.
+    """
+
+    units = unit_cells(grid_dim, sudoku_type)
+    peers = []
+    for cell, cell_unit_list in enumerate(cell_units(grid_dim, sudoku_type)):
+        cell_peer_set = set()
+        for unit in cell_unit_list:
+            cell_peer_set.update(units[unit])
+        cell_peer_set.discard(cell)
+        peers.append(tuple(sorted(cell_peer_set)))
+    return tuple(peers)
+
+
+@lru_cache(maxsize=None)
+def unit_intersections(grid_dim: int, sudoku_type: str = "sudoku") -> tuple[tuple, ...]:
+    """ Lists the pairs of units that share more than one cell.
+
+    Args:
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku".
+
+    Returns: Each pair both ways round, as the cells the units share, the rest of the first unit and the rest of the
+        second unit.
+    """
+
+    units = unit_cells(grid_dim, sudoku_type)
+    intersections = []
+    for unit in units:
+        for other_unit in units:
+            shared = set(unit) & set(other_unit)
+            if 1 < len(shared) < len(unit):
+                intersections.append((tuple(sorted(shared)), tuple(cell for cell in unit if cell not in shared),
+                                      tuple(cell for cell in other_unit if cell not in shared)))
+    return tuple(intersections)
+
+
+def assign(masks: list[int], cell: int, bit: int, peers: tuple[tuple[int, ...], ...]) -> bool:
+    """ Puts a number in a cell and removes it from the candidates of the cell's peers.
+
+    Peers that are left with one candidate are assigned too (naked singles).
+
+    Args:
+        masks (list[int]): The candidates of each cell. Changed in place.
+        cell (int): The index of the cell.
+        bit (int): The number, as a bitmask.
+        peers (tuple[tuple[int, ...], ...]): The peers of each cell, from cell_peers.
+
+    Returns: False if a cell is left with no candidates, otherwise True.
+    """
+
+    pending = [(cell, bit)]  # A list rather than recursion, as a chain of naked singles can be hundreds of cells long
+    while pending:
+        cell, bit = pending.pop()
+        masks[cell] = bit
+        for peer in peers[cell]:
+            if masks[peer] & bit:
+                masks[peer] &= ~bit
+                if masks[peer] == 0:
+                    return False
+                if masks[peer] & (masks[peer] - 1) == 0:  # One candidate left
+                    pending.append((peer, masks[peer]))
+    return True
+
+
+def eliminate(masks: list[int], cell: int, bits: int, peers: tuple[tuple[int, ...], ...]) -> bool:
+    """ Removes candidates from a cell.
+
+    If the cell is left with one candidate, it is assigned (naked single).
+
+    Args:
+        masks (list[int]): The candidates of each cell. Changed in place.
+        cell (int): The index of the cell.
+        bits (int): The candidates to remove, as a bitmask.
+        peers (tuple[tuple[int, ...], ...]): The peers of each cell, from cell_peers.
+
+    Returns: False if a cell is left with no candidates, otherwise True.
+    """
+
+    masks[cell] &= ~bits
+    if masks[cell] == 0:
+        return False
+    if masks[cell] & (masks[cell] - 1) == 0:  # One candidate left
+        return assign(masks, cell, masks[cell], peers)
+    return True
+
+
+def masks_to_values(masks: list[int]) -> list[int]:
+    """ Converts candidate masks to cell values, 0 where a cell has more than one candidate.
+
+    Args:
+        masks (list[int]): The candidates of each cell.
+
+    Returns: The value of each cell.
+    """
+
+    return [mask.bit_length() if mask & (mask - 1) == 0 else 0 for mask in masks]
+
+
+def residual_clauses(masks: list[int], grid_dim: int, sudoku_type: str = "sudoku",
+                     encoding: str = "auto") -> list[list[int]]:
+    """ Creates the clauses for the cells that propagation couldn't solve.
+
+    Solved cells get no clauses and their variables aren't used at all. The other cells only get variables for their
+    remaining candidates, and a number only gets an at-most-one constraint in the units where it hasn't been placed.
+
+    Args:
+        masks (list[int]): The candidates of each cell, from propagate.
+        grid_dim (int): The side length of the grid.
+        sudoku_type (str): Either "sudoku" or "hyper_sudoku".
+        encoding (str): The at-most-one encoding, one of AMO_ENCODINGS or "auto".
+
+    Returns: The formula as a list of clauses. Variables are numbered as in ncr_to_var, with any auxiliary variables
+        after grid_dim ** 3.
+    """
+
+    encoding = choose_encoding(grid_dim, encoding)
+    formula = []
+    top_var = grid_dim ** 3
+
+    # Each unsolved cell gets one of its candidates
+    for cell, mask in enumerate(masks):
+        if mask & (mask - 1):
+            r, c = divmod(cell, grid_dim)
+            lits = [ncr_to_var(n + 1, c, r, grid_dim) for n in range(grid_dim) if mask & (1 << n)]
+            formula.append(lits)
+            if encoding != "pairwise":
+                cell_clauses, top_var = at_most_one(lits, encoding, top_var)
+                formula.extend(cell_clauses)
+
+    # Every number that hasn't been placed occurs exactly once in each unit
+    for unit in unit_cells(grid_dim, sudoku_type):
+        for n in range(grid_dim):
+            places = [cell for cell in unit if masks[cell] & (1 << n)]
+            if len(places) > 1:
+                lits = [ncr_to_var(n + 1, cell % grid_dim, cell // grid_dim, grid_dim) for cell in places]
+                unit_clauses, top_var = at_most_one(lits, encoding, top_var)
+                formula.extend(unit_clauses)
+                formula.append(lits)
+
+    return formula
@@ -9,13 +9,16 @@ Classes:
 
 from __future__ import annotations
 import tkinter as tk
-from math import sqrt
 from typing import TYPE_CHECKING
+from clause_creation import block_dims
 from ks_cages_setup import generate_ks_colours
 from misc_funcs import i_to_rc
 if TYPE_CHECKING:
     from initial_setup import App
 
+GRID_WIDTH = 900  # The most pixels a standard sudoku grid is wide, unless the cells would be smaller than the minimum
+MIN_CELL_WIDTH = 16
+
 
 class SudokuGrid(tk.Canvas):
     """The grid of a standard sudoku puzzle.
@@ -33,10 +36,9 @@ class SudokuGrid(tk.Canvas):
         self.cell_texts = []
         self.display_answer = []
 
-        if grid_size == 25:
-            cell_width = 36
-        else:
-            cell_width = 50
+        # Cells get smaller as the grid gets bigger, so that a 64 x 64 grid still fits on the screen
+        cell_width = max(MIN_CELL_WIDTH, min(50, GRID_WIDTH // grid_size))
+        line_width = max(1, min(4, cell_width // 9))
         self["width"] = (grid_size * cell_width) + 50
         self["height"] = (grid_size * cell_width) + 50
 
@@ -45,42 +47,31 @@ class SudokuGrid(tk.Canvas):
         c2 = (grid_size * cell_width) + 25
         self.create_polygon(c1, c1, c1, c2, c2, c2, c2, c1, width=10, fill="white", outline="black")
 
-        # Grid bold lines
-        bold_lines = []
-        if grid_size == 6:
-            bold_lines.append(self.create_line(175, 25, 175, 325, width=8))
-            bold_lines.append(self.create_line(25, 125, 325, 125, width=8))
-            bold_lines.append(self.create_line(25, 225, 325, 225, width=8))
-        else:
-            bold_start = int(25 + (cell_width * sqrt(grid_size)))
-            bold_stop = int(26 + (cell_width * (grid_size - sqrt(grid_size))))
-            bold_step = int(cell_width * sqrt(grid_size))
-            for i in range(bold_start, bold_stop, bold_step):
-                bold_lines.append(self.create_line(i, c1, i, c2, width=8))
-                bold_lines.append(self.create_line(c1, i, c2, i, width=8))
-
         # Grid light lines
         light_lines = []
-        light_start = 25 + cell_width
-        light_stop = 26 + (cell_width * (grid_size - 1))
-        light_step = cell_width
-        for i in range(light_start, light_stop, light_step):
-            light_lines.append(self.create_line(i, c1, i, c2, width=4))
-            light_lines.append(self.create_line(c1, i, c2, i, width=4))
+        for i in range(1, grid_size):
+            light_lines.append(self.create_line(c1 + (i * cell_width), c1, c1 + (i * cell_width), c2,
+                                                width=line_width))
+            light_lines.append(self.create_line(c1, c1 + (i * cell_width), c2, c1 + (i * cell_width),
+                                                width=line_width))
 
-        # Create cell_texts text boxes
-        if grid_size == 25:
-            for i in range(625):
-                self.cell_texts.append(tk.Text(self, height=1, width=2, font=("Arial", 12), relief="flat"))
-                self.display_answer.append(False)
-        if grid_size == 16:
-            for i in range(256):
-                self.cell_texts.append(tk.Text(self, height=1, width=2, font=("Arial", 19), relief="flat"))
-                self.display_answer.append(False)
-        else:
-            for i in range(grid_size ** 2):
-                self.cell_texts.append(tk.Text(self, height=1, width=1, font=("Arial", 19), relief="flat"))
-                self.display_answer.append(False)
+        # Grid bold lines, between the blocks
+        bold_lines = []
+        block_rows, block_cols = block_dims(grid_size)
+        for i in range(block_cols, grid_size, block_cols):
+            bold_lines.append(self.create_line(c1 + (i * cell_width), c1, c1 + (i * cell_width), c2,
+                                               width=2 * line_width))
+        for i in range(block_rows, grid_size, block_rows):
+            bold_lines.append(self.create_line(c1, c1 + (i * cell_width), c2, c1 + (i * cell_width),
+                                               width=2 * line_width))
+
+        # Create cell_texts text boxes, wide enough for two digits once numbers go above 9
+        font_size = 19 if cell_width >= 50 else max(6, cell_width // 3)
+        text_width = 1 if grid_size <= 9 else 2
+        for i in range(grid_size ** 2):
+            self.cell_texts.append(tk.Text(self, height=1, width=text_width, font=("Arial", font_size),
+                                           relief="flat"))
+            self.display_answer.append(False)
 
         # Containers to hold text boxes
         grid_windows = []
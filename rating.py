@@ -0,0 +1,125 @@
+""" Rating how difficult a puzzle is, without the GUI.
+
+Two measures are combined. The first is the hardest technique a person needs: propagation is tried with naked singles
+only, then with hidden singles too, then with locked candidates too, and the first one that solves the puzzle gives
+the technique. A puzzle none of them solves needs search. The second is the work the SAT solver does on the puzzle
+(conflicts, decisions and propagations). These are taken from the solve that found the solution if it is passed to
+rate, so a puzzle isn't solved twice. Otherwise the puzzle is solved with the layout solver, which keeps what it learnt
+from earlier puzzles with the same layout, so the counts for a hard puzzle can vary a little with what was solved
+before it.
+
+Ratings are cached, so rating a corpus that contains repeats, or rating the same puzzle again, costs nothing.
+
+Functions:
+    rate: Rates how difficult a puzzle is.
+    hardest_technique: Finds the hardest technique needed to solve a puzzle by propagation.
+    solver_stats: Solves a puzzle with the layout solver and returns the SAT solver's statistics.
+"""
+
+from __future__ import annotations
+from math import log10
+from engine import PUZZLE_TYPES, check_constraints, check_puzzle, get_layout_solver, layout_key
+from propagation import propagate
+from solve_stats import SolveStats
+
+# Techniques from easiest to hardest. Search means propagation alone can't solve the puzzle.
+TECHNIQUES = ["naked_singles", "hidden_singles", "locked_candidates", "search"]
+LABELS = ["easy", "medium", "hard", "expert"]
+MAX_RATINGS = 100000  # Number of ratings kept in the cache
+_ratings = {}  # Keys from the puzzle and its layout, oldest first
+
+
+def rate(puzzle: list[list[int | str]], sudoku_type: str = "sudoku", constraints: dict | None = None,
+         stats: SolveStats | None = None) -> dict:
+    """ Rates how difficult a puzzle is.
+
+    The score is the level of the hardest technique (0 for naked singles up to 3 for search) plus log10(1 + conflicts),
+    so puzzles that need search are also ordered by how hard the SAT solver found them.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 (or "0") where a cell is empty.
+        sudoku_type (str): The type of puzzle, one of PUZZLE_TYPES.
+        constraints (dict | None): The data specific to the type of puzzle, as for engine.solve.
+        stats (SolveStats | None): The statistics of an engine.solve call that found a solution to the puzzle, to take
+            the SAT solver's work from. If the puzzle was solved without the SAT solver (e.g. by backtracking or from
+            the solution store), or stats is None, the puzzle is solved again to get them.
+
+    Returns: The rating, with the technique (one of TECHNIQUES), its level, the label (one of LABELS), the score and
+        the SAT solver's conflicts, decisions and propagations. The technique is None if the puzzle has no solution.
+    """
+
+    if sudoku_type not in PUZZLE_TYPES:
+        raise ValueError("Unknown puzzle type: " + str(sudoku_type))
+    grid_dim = check_puzzle(puzzle)
+    if constraints is None:
+        constraints = {}
+    check_constraints(sudoku_type, grid_dim, constraints)
+    key = (tuple(int(value) for row in puzzle for value in row),) + layout_key(sudoku_type, grid_dim, constraints)
+    if key in _ratings:
+        rating = _ratings.pop(key)
+        _ratings[key] = rating  # Most recently used goes last
+        return rating
+
+    technique = hardest_technique(puzzle, sudoku_type)
+    if stats is not None and (stats.backend == "propagation" or "conflicts" in stats.counts):
+        # Propagation solves a puzzle without the SAT solver doing any work
+        stats = {"satisfiable": True, "conflicts": stats.counts.get("conflicts", 0),
+                 "decisions": stats.counts.get("decisions", 0), "propagations": stats.counts.get("propagations", 0)}
+    else:
+        stats = solver_stats(puzzle, sudoku_type, grid_dim, constraints)
+    if technique is None or not stats["satisfiable"]:
+        rating = {"technique": None, "level": None, "label": "unsolvable", "score": None}
+    else:
+        level = TECHNIQUES.index(technique)
+        rating = {"technique": technique, "level": level, "label": LABELS[level],
+                  "score": level + log10(1 + stats["conflicts"])}
+    rating.update({"conflicts": stats["conflicts"], "decisions": stats["decisions"],
+                   "propagations": stats["propagations"]})
+
+    if len(_ratings) >= MAX_RATINGS:  # Forget the least recently used rating
+        _ratings.pop(next(iter(_ratings)))
+    _ratings[key] = rating
+    return rating
+
+
+def hardest_technique(puzzle: list[list[int | str]], sudoku_type: str = "sudoku") -> str | None:
+    """ Finds the hardest technique needed to solve a puzzle by propagation.
+
+    Only the standard rules (and the extra hyper sudoku blocks) are used, so killer and greater than sudoku puzzles
+    usually need search.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        sudoku_type (str): The type of puzzle.
+
+    Returns: One of TECHNIQUES, or None if propagation shows the puzzle has no solution.
+    """
+
+    for technique in TECHNIQUES[:-1]:
+        masks = propagate(puzzle, sudoku_type, locked_candidates=technique == "locked_candidates",
+                          hidden_singles=technique != "naked_singles")
+        if masks is None:
+            return None
+        if all(mask & (mask - 1) == 0 for mask in masks):
+            if sudoku_type in ("sudoku", "hyper_sudoku"):
+                return technique
+            return "search"  # The cages or inequalities still have to be checked
+    return "search"
+
+
+def solver_stats(puzzle: list[list[int | str]], sudoku_type: str, grid_dim: int, constraints: dict) -> dict:
+    """ Solves a puzzle with the layout solver and returns the SAT solver's statistics.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 where a cell is empty.
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the grid.
+        constraints (dict): The data specific to the type of puzzle.
+
+    Returns: Whether the puzzle is satisfiable, and the number of conflicts, decisions and propagations.
+    """
+
+    stats = SolveStats()
+    satisfiable = get_layout_solver(sudoku_type, grid_dim, constraints).solve(puzzle, stats=stats) is not None
+    return {"satisfiable": satisfiable, "conflicts": stats.counts["conflicts"], "decisions": stats.counts["decisions"],
+            "propagations": stats.counts["propagations"]}
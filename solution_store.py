@@ -0,0 +1,211 @@
+""" Keeping the solutions of puzzles on disk, so a puzzle submitted again is answered without encoding or solving it.
+
+The solutions are kept in an SQLite database, keyed by solution_key: a hash of the type of puzzle, the grid size, the
+givens and the data specific to the type (the cages and totals of a killer sudoku, the inequalities of a greater than
+sudoku). Each solution is stored as one byte per cell, and an unsolvable puzzle as NULL, so it isn't searched again
+either. The database is in WAL mode, so the processes of the command line tool can share one.
+
+The most recently used solutions are also kept in memory, up to max_memory bytes, so a repeat doesn't touch the disk.
+A store opened with the path IN_MEMORY has no database at all, only the solutions in memory, which are lost when the
+process ends.
+
+Classes:
+    SolutionStore: The solutions of puzzles, on disk with the most recently used in memory.
+
+Functions:
+    entry_size: The bytes of memory taken by a key and its solution.
+    solution_key: Creates the key of a puzzle in the store.
+    open_store: Gets the store at a path, opening it the first time it is used.
+    close_stores: Closes every store opened by open_store.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+from math import isqrt
+import os
+import sqlite3
+import sys
+import threading
+
+# Part of every key, so that solutions stored by an older version aren't used. Change it if what a key means changes.
+STORE_VERSION = 1
+MAX_MEMORY = 64 * 1024 * 1024  # Default bytes of solutions kept in memory by each store
+BUSY_TIMEOUT = 30  # Seconds to wait for another process that is writing to the database
+VARIANT_KEYS = ["ks_cages", "ks_totals", "horizontal_greater", "vertical_greater"]  # Constraints that change solutions
+IN_MEMORY = ":memory:"  # The path of a store that keeps its solutions in memory only, without writing any file
+_stores = {}  # Open stores by path
+_stores_lock = threading.Lock()  # Stops two threads opening the same store at once
+
+
+class SolutionStore:
+    """ The solutions of puzzles, on disk with the most recently used in memory.
+
+    Stores can be used from several threads at once, e.g. by the GUI's worker threads.
+
+    Attributes:
+        path (str): The SQLite database, or IN_MEMORY for none.
+        max_memory (int): The most bytes of keys and solutions kept in memory. The least recently used are dropped from
+            memory (but not from the disk) to keep under it.
+        memory_used (int): The bytes of keys and solutions in memory.
+
+    Methods:
+        get: Looks up the solution of a puzzle.
+        put: Stores the solution of a puzzle.
+        close: Closes the database.
+    """
+
+    def __init__(self, path: str, max_memory: int = MAX_MEMORY) -> None:
+        """ Initiates SolutionStore, creating the database if it doesn't exist.
+
+        Args:
+            path (str): The SQLite database, or IN_MEMORY to keep the solutions in memory only.
+            max_memory (int): The most bytes of keys and solutions to keep in memory.
+        """
+
+        self.path = path
+        self.max_memory = max_memory
+        self.memory_used = 0
+        self._memory = {}  # Keys to solutions (bytes, or None if unsolvable), least recently used first
+        self._lock = threading.Lock()
+        self._connection = None
+        if path == IN_MEMORY:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Every statement is committed as it is run, and the lock stops two threads using the connection at once
+        self._connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                 "(key TEXT PRIMARY KEY, grid_dim INTEGER NOT NULL, solution BLOB)")
+
+    def get(self, key: str) -> tuple[bool, list[list[int]] | None]:
+        """ Looks up the solution of a puzzle.
+
+        Args:
+            key (str): The key of the puzzle, from solution_key.
+
+        Returns: Whether the puzzle is in the store, and if so its solution as a 2D array, or None if it has no
+            solution.
+        """
+
+        with self._lock:
+            if key in self._memory:
+                solution = self._memory.pop(key)
+                self._memory[key] = solution  # Most recently used goes last
+            elif self._connection is None:
+                return False, None
+            else:
+                row = self._connection.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return False, None
+                solution = row[0]
+                self._remember(key, solution)
+        if solution is None:
+            return True, None
+        grid_dim = isqrt(len(solution))
+        return True, [list(solution[r * grid_dim:(r + 1) * grid_dim]) for r in range(grid_dim)]
+
+    def put(self, key: str, solution: list[list[int]] | None) -> None:
+        """ Stores the solution of a puzzle.
+
+        Args:
+            key (str): The key of the puzzle, from solution_key.
+            solution (list[list[int]] | None): The solution as a 2D array, or None if the puzzle has no solution.
+        """
+
+        grid_dim = 0 if solution is None else len(solution)
+        if solution is not None:
+            solution = bytes(value for row in solution for value in row)  # Numbers are at most 64, so fit in a byte
+        with self._lock:
+            if self._connection is not None:
+                self._connection.execute("INSERT OR REPLACE INTO solutions (key, grid_dim, solution) VALUES (?, ?, ?)",
+                                         (key, grid_dim, solution))
+            self._remember(key, solution)
+
+    def close(self) -> None:
+        """ Closes the database. The store can't be used afterwards. """
+
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._memory.clear()
+            self.memory_used = 0
+
+    def _remember(self, key: str, solution: bytes | None) -> None:
+        """ Keeps a solution in memory, dropping the least recently used ones if there are too many bytes.
+
+        Args:
+            key (str): The key of the puzzle.
+            solution (bytes | None): The solution, one byte per cell, or None if the puzzle has no solution.
+        """
+
+        if key in self._memory:
+            self.memory_used = self.memory_used - entry_size(key, self._memory.pop(key))
+        self._memory[key] = solution
+        self.memory_used = self.memory_used + entry_size(key, solution)
+        while self.memory_used > self.max_memory and self._memory:
+            old_key = next(iter(self._memory))
+            self.memory_used = self.memory_used - entry_size(old_key, self._memory.pop(old_key))
+
+
+def entry_size(key: str, solution: bytes | None) -> int:
+    """ The bytes of memory taken by a key and its solution.
+
+    Args:
+        key (str): The key of the puzzle.
+        solution (bytes | None): The solution, one byte per cell, or None if the puzzle has no solution.
+
+    Returns: The size in bytes.
+    """
+
+    return sys.getsizeof(key) + sys.getsizeof(solution)
+
+
+def solution_key(puzzle: list[list[int | str]], sudoku_type: str, grid_dim: int, constraints: dict) -> str:
+    """ Creates the key of a puzzle in the store.
+
+    The key is the SHA-256 hash of the type of puzzle, the grid size, the givens and the constraints in VARIANT_KEYS,
+    along with STORE_VERSION. Constraints that only choose an encoding (e.g. ks_encoding) aren't included, as they don't
+    change which grids are solutions.
+
+    Args:
+        puzzle (list[list[int | str]]): The puzzle as a 2D array, with 0 (or "0") where a cell is empty.
+        sudoku_type (str): The type of puzzle.
+        grid_dim (int): The side length of the grid.
+        constraints (dict): The data specific to the type of puzzle.
+
+    Returns: The key, as 64 hexadecimal digits.
+    """
+
+    entry = {"version": STORE_VERSION, "sudoku_type": sudoku_type, "grid_dim": grid_dim,
+             "givens": [int(value) for row in puzzle for value in row],
+             "constraints": {name: constraints[name] for name in VARIANT_KEYS if name in constraints}}
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def open_store(path: str) -> SolutionStore:
+    """ Gets the store at a path, opening it the first time it is used.
+
+    Args:
+        path (str): The SQLite database, or IN_MEMORY.
+
+    Returns: The store, shared by every caller in the process that uses the same path, including other threads.
+    """
+
+    if path != IN_MEMORY:
+        path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SolutionStore(path)
+        return _stores[path]
+
+
+def close_stores() -> None:
+    """ Closes every store opened by open_store. """
+
+    with _stores_lock:
+        while _stores:
+            _stores.popitem()[1].close()
@@ -1,66 +1,131 @@
-""" Solving puzzles code, other than the clause creation for the SAT solver.
+""" Solving puzzles from the GUI. The solving itself is done by the headless engine.
 
-Classes:
-    SatSolver: SAT solver.
+The engine runs in a worker thread, so that the window keeps responding while a large or hard puzzle is solved. The
+worker only works on plain data and never touches the widgets: it puts its answer on a queue, which the Tk event loop
+checks every POLL_INTERVAL milliseconds, and the answer is shown from there. The Cancel button interrupts the SAT
+solver through a CancelToken, and the solver gives up by itself after TIME_LIMIT seconds. Solutions are kept in
+SOLUTION_STORE (in memory, unless a file is chosen), so solving a puzzle again is answered straight away.
 
 Functions:
     solve_sudoku: Solves the puzzle.
+    solve_worker: Runs the engine and puts its answer on a queue. Run in the worker thread.
+    poll_worker: Checks whether the worker thread has answered, and shows the answer if it has.
     get_input: Retrieves an input from the puzzle grid, and also checks if it is a valid input or not.
-    decode: Converts the solution into values for display.
+    get_constraints: Collects the data specific to the type of puzzle from the app.
+    get_original_puzzle: Collects the puzzle without the user's answers, for checking their progress.
+    show_solution: Displays the solution, or tells the user there isn't one.
+    decode: Displays the solution in the cells chosen by the user.
     show_answer: Displays the answer in a cell text box.
-    check_progress: Checks whether the user has solved the puzzle correctly so far, and tells them if they have or not.
-        If there are mistakes, they are highlighted.
+    check_answers: Works out whether the user's answers so far are correct. Run in the worker thread.
+    check_progress: Tells the user whether they have solved the puzzle correctly so far. If there are mistakes, they
+        are highlighted.
 """
 
 from __future__ import annotations
-from abc import ABC
-from pysat.solvers import Glucose3
+from functools import partial
+import os
+import queue
 from random import randint
+import threading
 import tkinter as tk
-from tkinter.messagebox import showerror, showinfo
+from tkinter.messagebox import showerror, showinfo, showwarning
 from typing import TYPE_CHECKING
-from clause_creation import define_clauses
-from misc_funcs import disable_cell_text, i_to_rc
+from engine import CancelToken, SolveCancelled, SolveTimeout, solve
+from solution_store import IN_MEMORY
+from solve_stats import SolveStats
+from misc_funcs import disable_cell_text, enable_cell_text, i_to_rc
 if TYPE_CHECKING:
+    from collections.abc import Callable
     from initial_setup import App
 
-
-class SatSolver(Glucose3, ABC):
-    """ SAT solver. """
-
-    def __init__(self) -> None:
-        """ Initiates SatSolver. """
-
-        super().__init__()
+POLL_INTERVAL = 50  # Milliseconds between checks for the worker thread's answer
+TIME_LIMIT = 300  # Seconds before the solver gives up on a puzzle, the Cancel button can stop it sooner
+# Solutions are kept in memory, so a puzzle that is entered again in the same session isn't solved again. Setting the
+# environment variable SUDOKU_SOLVER_STORE to the path of an SQLite file keeps them there, for later sessions too.
+SOLUTION_STORE = os.environ.get("SUDOKU_SOLVER_STORE", IN_MEMORY)
 
 
 def solve_sudoku(root: App) -> None:
     """ Solves the puzzle.
 
+    The input is read here, and the engine is started in a worker thread. The answer is shown by poll_worker once the
+    worker has finished.
+
     Args:
-        root (App): Needed to access cell_option, cell_texts, solve_button, clear_button and grid_dim.
+        root (App): Needed to access cell_option, cell_texts, grid_dim and solve_clear.
     """
 
     cell_option = root.misc_solve_options.cell_option.get()
     cell_texts = root.puzzle_grid.cell_texts
-    solve_button = root.solve_clear.solve_button
-    clear_button = root.solve_clear.clear_button
     grid_dim = root.puzzle_config.grid_dim
+    stats = SolveStats()
+
+    with stats.phase("input"):
+        is_valid, puzzle = get_input(cell_texts, grid_dim)  # Bool, is user input valid; Puzzle input as a 2D list
+    if not is_valid:
+        return
+    sudoku_type = root.puzzle_config.puzzle_type.get()
+    constraints = get_constraints(root)
+    if cell_option == "check_progress":
+        work = partial(check_answers, puzzle, get_original_puzzle(root), sudoku_type, constraints)
+        show = partial(check_progress, puzzle)
+    else:
+        work = partial(solve, puzzle, sudoku_type, constraints, stats=stats, time_limit=TIME_LIMIT,
+                       solution_store=SOLUTION_STORE)
+        show = partial(show_solution, stats=stats)
+
+    cancel_token = CancelToken()
+    answers = queue.Queue()
+    disable_cell_text(cell_texts, grid_dim)  # So the puzzle can't be changed while it is being solved
+    root.solve_clear.solving_started(cancel_token)
+    threading.Thread(target=solve_worker, args=(work, cancel_token, answers), daemon=True).start()
+    root.after(POLL_INTERVAL, poll_worker, root, answers, show)
+
 
-    is_valid, puzzle = get_input(cell_texts, grid_dim)  # Bool, is user input valid; Puzzle input as a list of lists
-    if is_valid and (cell_option == "check_progress"):
-        check_progress(puzzle, root)
-    elif is_valid:
-        sat_solver = SatSolver()
-        define_clauses(puzzle, sat_solver, root)
-        if sat_solver.solve():  # There exists a solution
-            decode(sat_solver, root)
+def solve_worker(work: Callable, cancel_token: CancelToken, answers: queue.Queue) -> None:
+    """ Runs the engine and puts its answer on a queue. Run in the worker thread.
+
+    Args:
+        work (Callable): Calls the engine, taking the cancel token as the keyword argument cancel.
+        cancel_token (CancelToken): Lets the Cancel button stop the engine.
+        answers (queue.Queue): Where the answer goes, as the answer and the exception raised (or None).
+    """
+
+    try:
+        answers.put((work(cancel=cancel_token), None))
+    except Exception as error:  # Shown to the user by poll_worker, rather than lost with the thread
+        answers.put((None, error))
+
+
+def poll_worker(root: App, answers: queue.Queue, show: Callable) -> None:
+    """ Checks whether the worker thread has answered, and shows the answer if it has. Otherwise, checks again after
+    POLL_INTERVAL milliseconds.
+
+    Args:
+        root (App): Needed to access solve_clear, cell_texts and grid_dim.
+        answers (queue.Queue): Where the worker thread puts its answer.
+        show (Callable): Shows the answer, taking the answer and root.
+    """
+
+    try:
+        answer, error = answers.get_nowait()
+    except queue.Empty:
+        root.after(POLL_INTERVAL, poll_worker, root, answers, show)
+        return
+
+    root.solve_clear.solving_finished()
+    enable_cell_text(root.puzzle_grid.cell_texts, root.puzzle_config.grid_dim)  # The answer is shown in the cells
+    if error is not None:  # Let the user try again
+        root.solve_clear.solve_button["state"] = "normal"
+        if isinstance(error, SolveCancelled):
+            root.solve_clear.status_label["text"] = "Solve cancelled."
+        elif isinstance(error, SolveTimeout):  # Not the same as there being no solution
+            showwarning(title="Timed out", message="The solver gave up after " + str(TIME_LIMIT) + " seconds without "
+                                                   "finding a solution. The puzzle may still have one.")
         else:
-            showerror(title="Error", message="No solution found.")
-        disable_cell_text(cell_texts, grid_dim)
-        solve_button["state"] = "disabled"
-        clear_button["state"] = "normal"
-        sat_solver.delete()
+            showerror(title="Error", message="The puzzle couldn't be solved: " + str(error))
+        return
+    show(answer, root)
 
 
 def get_input(cell_texts: list[tk.Text], grid_dim: int) -> tuple[bool, list[list[str]]]:
@@ -88,7 +153,7 @@ def get_input(cell_texts: list[tk.Text], grid_dim: int) -> tuple[bool, list[list
             is_valid = False
             break
         else:
-            row.append(cell_texts[i].get("1.0"))
+            row.append(cell_texts[i].get("1.0", 'end - 1c'))
         # Check if on the last cell of a row
         if (i + 1) % grid_dim == 0: 
             puzzle.append(row)
@@ -96,14 +161,80 @@ def get_input(cell_texts: list[tk.Text], grid_dim: int) -> tuple[bool, list[list
     return is_valid, puzzle
 
 
-def decode(sat_solver: SatSolver, root: App) -> list[str]:
-    """ Converts the solution into values for display.
+def get_constraints(root: App) -> dict:
+    """ Collects the data specific to the type of puzzle from the app.
+
+    Args:
+        root (App): Needed to access puzzle_type, ks_cages, ks_totals, horizontal_greater and vertical_greater.
+
+    Returns: The constraints in the form used by the engine.
+    """
+
+    sudoku_type = root.puzzle_config.puzzle_type.get()
+    constraints = {}
+    if sudoku_type == "killer_sudoku":
+        constraints["ks_cages"] = root.ks_cages
+        constraints["ks_totals"] = root.ks_totals
+    if sudoku_type == "greater_than_sudoku":
+        constraints["horizontal_greater"] = root.puzzle_grid.horizontal_greater
+        constraints["vertical_greater"] = root.puzzle_grid.vertical_greater
+    return constraints
+
+
+def get_original_puzzle(root: App) -> list[list[str]]:
+    """ Collects the puzzle without the user's answers, for checking their progress.
+
+    Args:
+        root (App): Needed to access cell_texts, grid_dim and display_answer.
+
+    Returns: The puzzle as a 2D array of strings, with only the cells marked as clues filled in.
+    """
+
+    cell_texts = root.puzzle_grid.cell_texts
+    grid_dim = root.puzzle_config.grid_dim
+    display_answer = root.puzzle_grid.display_answer
+
+    original_puzzle = []
+    row = []
+    for i in range(grid_dim ** 2):
+        if display_answer[i]:
+            row.append(cell_texts[i].get("1.0", 'end - 1c'))
+        else:
+            row.append("0")
+        if (i + 1) % grid_dim == 0:
+            original_puzzle.append(row)
+            row = []
+    return original_puzzle
+
+
+def show_solution(solution: list[list[int]] | None, root: App, stats: SolveStats) -> None:
+    """ Displays the solution, or tells the user there isn't one.
+
+    Args:
+        solution (list[list[int]] | None): The solution from the engine, or None if there is no solution.
+        root (App): Needed to access cell_texts, solve_button, clear_button, status_label, show_stats and grid_dim.
+        stats (SolveStats): The timings of the solve, which the time taken to display the solution is added to.
+    """
+
+    if solution is not None:  # There exists a solution
+        with stats.phase("display"):
+            decode(solution, root)
+    else:
+        showerror(title="Error", message="No solution found.")
+    root.solve_clear.status_label["text"] = stats.summary() if root.misc_solve_options.show_stats.get() else ""
+    disable_cell_text(root.puzzle_grid.cell_texts, root.puzzle_config.grid_dim)
+    root.solve_clear.solve_button["state"] = "disabled"
+    root.solve_clear.clear_button["state"] = "normal"
+
+
+def decode(solution: list[list[int]], root: App) -> list[int]:
+    """ Displays the solution in the cells chosen by the user.
 
     Args:
-        sat_solver (SatSolver): The SAT solver.
+        solution (list[list[int]]): The solution from the engine.
         root (App): Needed to access cell_option, grid_dim, cell_texts and display_answer.
 
-    Returns: If the cell_option is check_progress, then returns a list of decoded values.
+    Returns: The solution as a flat list of values, one for each cell.
     """
 
     cell_option = root.misc_solve_options.cell_option.get()
@@ -111,21 +242,7 @@ def decode(sat_solver: SatSolver, root: App) -> list[str]:
     cell_texts = root.puzzle_grid.cell_texts
     display_answer = root.puzzle_grid.display_answer
 
-    solution = sat_solver.get_model()
-    true_vars = []
-    for i in solution:
-        if i > 0:  # Only use the variables that aren't negated, i.e. the variables that are true
-            true_vars.append(i)
-    row = 0
-    column = 0
-    true_vars_decoded = []
-    for i in true_vars:
-        # Convert variables back to usable values for a sudoku grid
-        true_vars_decoded.append(i - (grid_dim * column) - ((grid_dim ** 2) * row))
-        column = column + 1
-        if column == grid_dim:
-            row = row + 1
-            column = 0
+    true_vars_decoded = [value for row in solution for value in row]
 
     if cell_option == "all":
         for i in range(grid_dim ** 2):
@@ -148,16 +265,15 @@ def decode(sat_solver: SatSolver, root: App) -> list[str]:
                 if display_answer[i]:
                     show_answer(cell_texts, true_vars_decoded, i)
 
-    if cell_option == "check_progress":
-        return true_vars_decoded
+    return true_vars_decoded
 
 
-def show_answer(cell_texts: list[tk.Text], true_vars_decoded: list[str], index: int) -> None:
+def show_answer(cell_texts: list[tk.Text], true_vars_decoded: list[int], index: int) -> None:
     """ Displays the answer in a cell text box.
 
     Args:
         cell_texts (list[tk.Text]): List of text boxes on the puzzle grid.
-        true_vars_decoded (list[str]): The decoded solution as a list of strings.
+        true_vars_decoded (list[int]): The decoded solution as a list of integers.
         index (int): The index of the cell.
     """
 
@@ -166,63 +282,67 @@ def show_answer(cell_texts: list[tk.Text], true_vars_decoded: list[str], index:
     cell_texts[index].tag_config("make blue", foreground="blue")
 
 
-def check_progress(puzzle: list[list[str]], root: App) -> None:
-    """ Checks whether the user has solved the puzzle correctly so far, and tells them if they have or not. If there
-    are mistakes, they are highlighted.
+def check_answers(puzzle: list[list[str]], original_puzzle: list[list[str]], sudoku_type: str, constraints: dict,
+                  cancel: CancelToken | None = None) -> tuple[bool, list[list[int]] | None]:
+    """ Works out whether the user's answers so far are correct. Run in the worker thread.
+
+    Args:
+        puzzle (list[list[str]]): The puzzle input, including the user's answers, as a 2D array of strings.
+        original_puzzle (list[list[str]]): The puzzle without the user's answers, from get_original_puzzle.
+        sudoku_type (str): The type of puzzle.
+        constraints (dict): The data specific to the type of puzzle.
+        cancel (CancelToken | None): Lets the Cancel button stop the engine.
+
+    Returns: Whether the puzzle can still be solved with the user's answers, and if it can't, the solution to the
+        original puzzle (None if that can't be solved either).
+    """
+
+    if solve(puzzle, sudoku_type, constraints, cancel=cancel, time_limit=TIME_LIMIT) is not None:
+        return True, None
+    return False, solve(original_puzzle, sudoku_type, constraints, cancel=cancel, time_limit=TIME_LIMIT,
+                        solution_store=SOLUTION_STORE)
+
+
+def check_progress(puzzle: list[list[str]], answer: tuple[bool, list[list[int]] | None], root: App) -> None:
+    """ Tells the user whether they have solved the puzzle correctly so far. If there are mistakes, they are
+    highlighted.
 
     Args:
         puzzle (list[list[str]]): The puzzle input as a 2D array of strings.
-        root (App): Needed to access solve_button, clear_button, cell_texts, grid_dim and display_answer.
+        answer (tuple[bool, list[list[int]] | None]): From check_answers.
+        root (App): Needed to access solve_button, clear_button, cell_texts and grid_dim.
     """
 
     solve_button = root.solve_clear.solve_button
-    clear_button = root.solve_clear.solve_button
+    clear_button = root.solve_clear.clear_button
     cell_texts = root.puzzle_grid.cell_texts
     grid_dim = root.puzzle_config.grid_dim
-    display_answer = root.puzzle_grid.display_answer
+    is_correct, original_puzzle_solution = answer
 
-    sat_solver = SatSolver()
-    define_clauses(puzzle, sat_solver, root)
-    if sat_solver.solve():  # The puzzle can be solved with the user's answers, ie the puzzle is correct so far
+    if is_correct:
+        # The puzzle can be solved with the user's answers, ie the puzzle is correct so far
         showinfo("Congratulations", "Your progress is correct so far.")
         disable_cell_text(cell_texts, grid_dim)
         solve_button["state"] = "disabled"
         clear_button["state"] = "normal"
 
-    else:  # Puzzle couldn't be solved with user's answers, so define original puzzle
-        sat_solver.delete()
-        original_puzzle = []
-        row = []
+    elif original_puzzle_solution is None:  # Original puzzle couldn't be solved
+        showerror(title="Error", message="No solution found to original puzzle.")
+        disable_cell_text(cell_texts, grid_dim)
+        solve_button["state"] = "disabled"
+        clear_button["state"] = "normal"
+
+    else:  # Original puzzle can be solved
+        incorrect_user_answers = []
         for i in range(grid_dim ** 2):
-            if display_answer[i]:
-                row.append(cell_texts[i].get("1.0"))
-            else:
-                row.append("0")
-            if (i + 1) % grid_dim == 0:
-                original_puzzle.append(row)
-                row = []
-        sat_solver2 = SatSolver()
-        define_clauses(original_puzzle, sat_solver2, root)
-        if not sat_solver2.solve():  # Original puzzle couldn't be solved
-            showerror(title="Error", message="No solution found to original puzzle.")
-            disable_cell_text(cell_texts, grid_dim)
-            solve_button["state"] = "disabled"
-            clear_button["state"] = "normal"
-            sat_solver2.delete()
-
-        else:  # Original puzzle can be solved
-            original_puzzle_solution = decode(sat_solver2, root)
-            incorrect_user_answers = []
-            for i in range(grid_dim ** 2):
-                row, col = i_to_rc(i, grid_dim)
-                if str(original_puzzle_solution[i]) != puzzle[row][col]:
-                    # Compare user answers to solution
-                    incorrect_user_answers.append(i)
-            for i in range(len(incorrect_user_answers)):  # Highlight incorrect user answers
-                cell_texts[incorrect_user_answers[i]].tag_add("make red", "1.0", "end")
-                cell_texts[incorrect_user_answers[i]].tag_config("make red", foreground="red")
-            showinfo("Information", "Errors have been highlighted.")
-            disable_cell_text(cell_texts, grid_dim)
-            solve_button["state"] = "disabled"
-            clear_button["state"] = "normal"
-            sat_solver2.delete()
+            row, col = i_to_rc(i, grid_dim)
+            if str(original_puzzle_solution[row][col]) != puzzle[row][col]:
+                # Compare user answers to solution
+                incorrect_user_answers.append(i)
+        for i in range(len(incorrect_user_answers)):  # Highlight incorrect user answers
+            cell_texts[incorrect_user_answers[i]].tag_add("make red", "1.0", "end")
+            cell_texts[incorrect_user_answers[i]].tag_config("make red", foreground="red")
+        showinfo("Information", "Errors have been highlighted.")
+        disable_cell_text(cell_texts, grid_dim)
+        solve_button["state"] = "disabled"
+        clear_button["state"] = "normal"
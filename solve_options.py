@@ -1,7 +1,7 @@
 """ Everything relating to the user selecting how much of the solution they would like, and confirmation.
 
 Classes:
-    SolveClear: This contains the 'solve' and 'clear' buttons.
+    SolveClear: This contains the 'solve', 'clear' and 'cancel' buttons, and shows when a solve is running.
     MiscOptions: This contains the solving options - solve all cells, solve a random cell, solve specified cells, check
         the user's current progress.
     ChooseCellsWindow: Window to choose cell(s) to solve (specific cell option), or to mark which cells were worked out
@@ -9,21 +9,33 @@ Classes:
 """
 
 from __future__ import annotations
-from math import sqrt
 import tkinter as tk
+from tkinter import ttk
 from typing import TYPE_CHECKING
+from clause_creation import block_dims
 from solve import solve_sudoku
 if TYPE_CHECKING:
+    from engine import CancelToken
     from initial_setup import App
 
 
 class SolveClear:
-    """ This contains the 'solve' and 'clear' buttons.
+    """ This contains the 'solve', 'clear' and 'cancel' buttons, and shows when a solve is running.
 
     Attributes:
         buttons_frame (tk.Frame): A frame containing the buttons.
+        cancel_button (tk.Button): A button to stop a solve that is running. Only enabled while solving.
+        cancel_token (CancelToken): Cancels the solve that is running. Has None type when nothing is being solved.
         clear_button (tk.Button): A button to clear numbers from the sudoku grid once it has been solved.
+        progress_bar (ttk.Progressbar): Moves back and forth while a solve is running, and is hidden otherwise. The
+            SAT solver can't say how far through it is, so the bar doesn't show how long is left.
         solve_button (tk.Button): Solve button to solve the puzzle.
+        status_label (tk.Label): Shows how long each phase of the last solve took, if the user asked to see it.
+
+    Methods:
+        cancel_button_clicked: Cancels the solve that is running.
+        solving_started: Shows that a solve is running, and lets the user cancel it.
+        solving_finished: Hides the progress bar and disables the cancel button once the solve has finished.
     """
 
     def __init__(self, root: App, container: tk.Frame) -> None:
@@ -35,8 +47,51 @@ class SolveClear:
         self.clear_button = tk.Button(self.buttons_frame, text="Clear", font=20, command=root.clear_button_clicked)
         self.clear_button.grid(column=1, row=0, padx=5)
         self.clear_button["state"] = "disabled"
+        self.cancel_button = tk.Button(self.buttons_frame, text="Cancel", font=20, command=self.cancel_button_clicked)
+        self.cancel_button.grid(column=2, row=0, padx=5)
+        self.cancel_button["state"] = "disabled"
+        self.cancel_token = None
+        self.progress_bar = ttk.Progressbar(self.buttons_frame, mode="indeterminate", length=200)
+        self.status_label = tk.Label(self.buttons_frame, text="", wraplength=300, justify="left")
+        self.status_label.grid(column=0, row=2, columnspan=3)
         self.buttons_frame.grid(column=0, row=5, pady=5)
 
+    def solving_started(self, cancel_token: CancelToken) -> None:
+        """ Shows that a solve is running, and lets the user cancel it.
+
+        Args:
+            cancel_token (CancelToken): The token passed to the engine for this solve.
+        """
+
+        self.cancel_token = cancel_token
+        self.solve_button["state"] = "disabled"
+        self.clear_button["state"] = "disabled"
+        self.cancel_button["state"] = "normal"
+        self.status_label["text"] = "Solving..."
+        self.progress_bar.grid(column=0, row=1, columnspan=3, pady=5)
+        self.progress_bar.start()
+
+    def solving_finished(self) -> None:
+        """ Hides the progress bar and disables the cancel button once the solve has finished. """
+
+        self.cancel_token = None
+        self.cancel_button["state"] = "disabled"
+        self.status_label["text"] = ""
+        self.progress_bar.stop()
+        self.progress_bar.grid_remove()
+
+    def cancel_button_clicked(self) -> None:
+        """ Cancels the solve that is running.
+
+        The SAT solver is interrupted, and the worker thread reports back once it has stopped, so the other buttons
+        are only re-enabled then.
+        """
+
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.cancel_button["state"] = "disabled"
+            self.status_label["text"] = "Cancelling..."
+
 
 class MiscOptions:
     """ This contains the solving options - solve all cells, solve a random cell, solve specified cells, check the
@@ -45,6 +100,7 @@ class MiscOptions:
     Attributes:
         cell_option (tk.StringVar): The chosen option of the four radio buttons.
         misc_options_frame (tk.Frame): The frame that contains the radio buttons and instructions.
+        show_stats (tk.BooleanVar): Whether to show how long each phase of solving took.
     """
 
     def __init__(self, container: tk.Frame) -> None:
@@ -70,6 +126,11 @@ class MiscOptions:
         check_progress_rb.grid(row=4, sticky="W")
         self.cell_option.set("all")
 
+        self.show_stats = tk.BooleanVar()
+        show_stats_cb = tk.Checkbutton(self.misc_options_frame, text="Show solve timings", variable=self.show_stats,
+                                       font=20)
+        show_stats_cb.grid(row=5, sticky="W")
+
 
 class ChooseCellsWindow(tk.Toplevel):
     """ Window to choose cell(s) to solve (specific cell option), or to mark which cells were worked out by the user
@@ -108,7 +169,9 @@ class ChooseCellsWindow(tk.Toplevel):
         # Create inner_grid_frames, grid_buttons, display_answers
         for i in range(grid_dim ** 2):
             if grid_dim > 9:
-                cell_frames.append(tk.Frame(grid_frame, height=30, width=30))
+                # Smaller again for the biggest grids, so that they still fit on the screen
+                cell_width = max(12, min(30, 900 // grid_dim))
+                cell_frames.append(tk.Frame(grid_frame, height=cell_width, width=cell_width))
             else:
                 cell_frames.append(tk.Frame(grid_frame, height=50, width=50))
             # noinspection PyTypeChecker
@@ -119,36 +182,20 @@ class ChooseCellsWindow(tk.Toplevel):
             self.display_answer.append(False)
 
         # Display cell_frames, arranging into blocks
-        if grid_dim == 6:
-            for j in range(6):
-                for i in range(6):
-                    i_diff = i // 2
-                    j_diff = j // 3
-                    cell_frames[i + (j * 6)].grid(row=(j + j_diff), column=(i + i_diff))
-            # Add space between blocks
-            for i in range(6, 12):
+        block_rows, block_cols = block_dims(grid_dim)
+        for j in range(grid_dim):
+            for i in range(grid_dim):
+                i_diff = i // block_cols
+                j_diff = j // block_rows
+                cell_frames[i + (j * grid_dim)].grid(row=(j + j_diff), column=(i + i_diff))
+        # Horizontal space
+        for j in range(1, grid_dim // block_rows):
+            for i in range((grid_dim * ((j * block_rows) - 1)), grid_dim * (j * block_rows)):
                 cell_frames[i].grid(pady=(0, 15))
-            for i in range(18, 24):
-                cell_frames[i].grid(pady=(0, 15))
-            for i in range(36):
-                if i % 6 == 2:
-                    cell_frames[i].grid(padx=(0, 15))
-        else:
-            gd_sqrt = int(sqrt(grid_dim))
-            for j in range(grid_dim):
-                for i in range(grid_dim):
-                    i_diff = i // gd_sqrt
-                    j_diff = j // gd_sqrt
-                    cell_frames[i + (j * grid_dim)].grid(row=(j + j_diff), column=(i + i_diff))
-            # Horizontal space
-            for j in range(1, gd_sqrt):
-                for i in range((grid_dim * ((j * gd_sqrt) - 1)), grid_dim * (j * gd_sqrt)):
-                    cell_frames[i].grid(pady=(0, 15))
-            # Vertical space
-            for j in range(1, gd_sqrt):
-                for i in range(grid_dim ** 2):
-                    if i % grid_dim == (gd_sqrt * j) - 1:
-                        cell_frames[i].grid(padx=(0, 15))
+        # Vertical space
+        for i in range(grid_dim ** 2):
+            if i % grid_dim % block_cols == block_cols - 1 and i % grid_dim != grid_dim - 1:
+                cell_frames[i].grid(padx=(0, 15))
 
         grid_frame.pack(padx=10, pady=10)
         self.done_button = tk.Button(self, font=20, text="Done", command=lambda x=root: self.done_button_clicked(x))
@@ -0,0 +1,124 @@
+""" Timings and counts for each phase of solving a puzzle, so that a slow solve can be traced to the phase that is slow.
+
+The engine records into a SolveStats when one is passed to solve, and does nothing extra otherwise. The phases are:
+    input: Reading the puzzle from the GUI.
+    store: Looking the puzzle up in the solution store (see solution_store.py).
+    canonical: Finding the canonical form of the puzzle, for the symmetry cache (see canonical.py).
+    propagate: Naked singles, hidden singles and locked candidates (see propagation.py).
+    encode: Creating the clauses, split into encode_givens, encode_rules, encode_cages and encode_inequalities. This is
+        only done the first time a layout is solved, as the layout solver keeps its clauses loaded.
+    load: Adding the clauses to the SAT solver.
+    assumptions: Converting the puzzle to assumptions for the layout solver.
+    sat: The SAT solver itself.
+    search: Backtracking, or the SAT solvers racing in the portfolio.
+    decode: Converting the model to the values of the cells.
+    display: Showing the solution in the GUI.
+
+Classes:
+    SolveStats: Timings and counts for one solve.
+
+Functions:
+    timed: Times a phase, or does nothing if there are no stats to record into.
+"""
+
+from __future__ import annotations
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import ContextManager
+
+
+class SolveStats:
+    """ Timings and counts for one solve.
+
+    Attributes:
+        backend (str): How the puzzle was solved, e.g. "sat", "backtrack" or "propagation". Empty until solve is called.
+        counts (dict[str, int]): Counters, e.g. the clauses and variables in the formula and the conflicts, decisions
+            and propagations of the SAT solver.
+        times (dict[str, float]): The seconds spent in each phase, in the order the phases were first entered.
+
+    Methods:
+        phase: Times a phase, adding to any time already spent in it.
+        add_time: Adds to the time spent in a phase.
+        add_count: Adds to a counter.
+        total_time: The time spent in all the top level phases.
+        summary: A one line description of the timings and counts.
+    """
+
+    def __init__(self) -> None:
+        """ Initiates SolveStats. """
+
+        self.backend = ""
+        self.times = {}
+        self.counts = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """ Times a phase, adding to any time already spent in it.
+
+        Args:
+            name (str): The name of the phase.
+        """
+
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """ Adds to the time spent in a phase.
+
+        Args:
+            name (str): The name of the phase.
+            seconds (float): The time to add.
+        """
+
+        self.times[name] = self.times.get(name, 0.0) + seconds
+
+    def add_count(self, name: str, amount: int) -> None:
+        """ Adds to a counter.
+
+        Args:
+            name (str): The name of the counter.
+            amount (int): The amount to add.
+        """
+
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def total_time(self) -> float:
+        """ The time spent in all the top level phases.
+
+        Returns: The time in seconds. The encode_ phases are part of encode, so they aren't counted again.
+        """
+
+        return sum(seconds for name, seconds in self.times.items() if not name.startswith("encode_"))
+
+    def summary(self) -> str:
+        """ A one line description of the timings and counts.
+
+        Returns: The description, e.g. "sat: 12.1 ms total (encode 8.0, sat 3.9, decode 0.2 ms), 11988 clauses".
+        """
+
+        phases = ", ".join(name + " {:.1f}".format(seconds * 1000) for name, seconds in self.times.items()
+                           if not name.startswith("encode_"))
+        counts = "".join(", " + str(amount) + " " + name for name, amount in self.counts.items())
+        return "{}: {:.1f} ms total ({} ms){}".format(self.backend, self.total_time() * 1000, phases, counts)
+
+
+def timed(stats: SolveStats | None, name: str) -> ContextManager:
+    """ Times a phase, or does nothing if there are no stats to record into.
+
+    Args:
+        stats (SolveStats | None): Where to record the time.
+        name (str): The name of the phase.
+
+    Returns: A context manager to run the phase in.
+    """
+
+    if stats is None:
+        return nullcontext()
+    return stats.phase(name)
@@ -0,0 +1,23 @@
+""" Shared set up for the tests, which import the modules at the top level of the repository. """
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from canonical import clear_canonical_cache  # noqa: E402 (after the path is set)
+from clause_creation import clear_rule_templates  # noqa: E402
+from engine import clear_layout_solvers  # noqa: E402
+from solution_store import close_stores  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """ Starts every test without the layout solvers, templates, symmetry cache or stores of earlier tests. """
+
+    yield
+    clear_layout_solvers()
+    clear_rule_templates()
+    clear_canonical_cache()
+    close_stores()
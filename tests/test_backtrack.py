@@ -0,0 +1,122 @@
+""" Tests for backtrack.py, and for the limits and cancelling of a solve. """
+
+import random
+import threading
+import time
+import pytest
+from backtrack import cell_units, solve_backtrack
+from benchmark import pattern_solution
+from clause_creation import block_dims
+from engine import CancelToken, SolveCancelled, SolveLimits, SolveTimeout, solve
+
+
+def blank_cells(solution, count, seed=0):
+    """ Empties some cells of a solved grid at random. """
+
+    grid_dim = len(solution)
+    puzzle = [row[:] for row in solution]
+    for i in random.Random(seed).sample(range(grid_dim ** 2), count):
+        puzzle[i // grid_dim][i % grid_dim] = 0
+    return puzzle
+
+
+def is_solution(grid, puzzle):
+    """ Checks that a grid keeps the givens of a puzzle and has every number once in each row, column and block. """
+
+    grid_dim = len(puzzle)
+    block_rows, block_cols = block_dims(grid_dim)
+    numbers = set(range(1, grid_dim + 1))
+    units = [[(r, c) for c in range(grid_dim)] for r in range(grid_dim)]
+    units += [[(r, c) for r in range(grid_dim)] for c in range(grid_dim)]
+    units += [[(r + i, c + j) for i in range(block_rows) for j in range(block_cols)]
+              for r in range(0, grid_dim, block_rows) for c in range(0, grid_dim, block_cols)]
+    return (grid is not None and all(puzzle[r][c] in (0, grid[r][c]) for r in range(grid_dim) for c in range(grid_dim))
+            and all({grid[r][c] for r, c in unit} == numbers for unit in units))
+
+
+def test_deep_search_without_recursion():
+    """ A 64 x 64 grid with more empty cells than Python's recursion limit is searched without a RecursionError. """
+
+    puzzle = blank_cells(pattern_solution(64), 1200)
+    assert is_solution(solve(puzzle, "sudoku", backend="backtrack", presolve=False), puzzle)
+
+
+def test_backtracks_to_the_solution():
+    """ A puzzle that needs guesses is still solved, and the cells are given from left to right, up to down. """
+
+    puzzle = blank_cells(pattern_solution(9), 55, seed=1)
+    values = solve_backtrack(puzzle, "sudoku")
+    assert is_solution([values[r * 9:(r + 1) * 9] for r in range(9)], puzzle)
+
+
+def test_contradiction():
+    """ A number given twice in a row has no solution. """
+
+    puzzle = [[0] * 9 for _ in range(9)]
+    puzzle[4][0] = puzzle[4][8] = 7
+    assert solve_backtrack(puzzle, "sudoku") is None
+
+
+def test_hyper_units():
+    """ Hyper sudoku cells in the extra blocks have four units, and other sizes are refused. """
+
+    units = cell_units(9, "hyper_sudoku")
+    assert len(units[10]) == 4  # Row 1, column 1 is in the top left extra block
+    assert len(units[0]) == 3
+    with pytest.raises(ValueError):
+        cell_units(16, "hyper_sudoku")
+
+
+def hard_puzzle():
+    """ A 36 x 36 puzzle with most cells empty, which backtracking alone can't finish in a test's time. """
+
+    return blank_cells(pattern_solution(36), 1100)
+
+
+def test_time_limit_stops_search():
+    """ A backtracking search over its time limit is stopped soon after. """
+
+    start = time.monotonic()
+    with pytest.raises(SolveTimeout):
+        solve(hard_puzzle(), "sudoku", backend="backtrack", presolve=False, time_limit=0.5)
+    assert time.monotonic() - start < 5
+
+
+def test_cancel_stops_search():
+    """ Cancelling from another thread stops a backtracking search. """
+
+    cancel = CancelToken()
+    timer = threading.Timer(0.3, cancel.cancel)
+    timer.start()
+    start = time.monotonic()
+    try:
+        with pytest.raises(SolveCancelled):
+            solve(hard_puzzle(), "sudoku", backend="backtrack", presolve=False, cancel=cancel)
+    finally:
+        timer.cancel()
+    assert time.monotonic() - start < 5
+
+
+def test_finished_search_is_kept():
+    """ A search that finishes within its limit returns its solution. """
+
+    puzzle = blank_cells(pattern_solution(36), 300)
+    assert is_solution(solve(puzzle, "sudoku", backend="backtrack", presolve=False, time_limit=30), puzzle)
+
+
+def test_cancelled_sat_solve():
+    """ A solve cancelled before it starts doesn't call the SAT solver. """
+
+    cancel = CancelToken()
+    cancel.cancel()
+    with pytest.raises(SolveCancelled):
+        solve(blank_cells(pattern_solution(9), 50), "sudoku", backend="sat", presolve=False, cancel=cancel)
+
+
+def test_limits_must_be_positive():
+    """ A limit of zero or less is refused. """
+
+    with pytest.raises(ValueError):
+        SolveLimits(time_limit=0)
+    with pytest.raises(ValueError):
+        SolveLimits(conflicts=-1)
@@ -0,0 +1,81 @@
+""" Tests for batch.py, the command line tool that solves a file of puzzles, and for rating.py. """
+
+import pytest
+from batch import format_grid, main, parse_line, solve_line
+from engine import solve
+from generator import generate
+from rating import LABELS, _ratings, rate
+from solve_stats import SolveStats
+
+
+def test_parse_and_format():
+    """ Lines of symbols and lines of numbers both parse, and format_grid writes them back. """
+
+    puzzle, _, _ = generate(16, "sudoku", seed=31)
+    line = format_grid(puzzle)
+    assert len(line) == 256
+    assert parse_line(line) == puzzle
+    numbers = " ".join(str(value) for row in puzzle for value in row)
+    assert parse_line(numbers) == puzzle
+    with pytest.raises(ValueError):
+        parse_line("1" * 80)
+
+
+def test_solve_line_statuses():
+    """ Each line gets its status, and a bad line is reported rather than ending the run. """
+
+    puzzle, _, solution = generate(9, "sudoku", seed=32)
+    assert solve_line((1, format_grid(puzzle))) == (1, "solved", format_grid(solution))
+    assert solve_line((2, "11" + "." * 79))[1] == "unsolvable"
+    assert solve_line((3, "12x" + "." * 78))[1] == "invalid"
+    assert solve_line((4, "." * 256), sudoku_type="hyper_sudoku")[1] == "invalid"
+
+
+def test_main(tmp_path, capsys):
+    """ The solutions come out in the order of the lines, with a summary and the bad lines on stderr. """
+
+    puzzles = [generate(9, "sudoku", seed=seed) for seed in range(3)]
+    lines = ["# a comment", ""] + [format_grid(puzzle) for puzzle, _, _ in puzzles] + ["not a puzzle"]
+    path = tmp_path / "puzzles.txt"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    assert main([str(path), "--workers", "1"]) == 1  # The last line is invalid
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [format_grid(solution) for _, _, solution in puzzles] + ["invalid"]
+    assert "line 6" in err
+    assert "3 solved" in err
+
+
+def test_main_rate_and_store(tmp_path, capsys):
+    """ --rate adds a label and score, and --store answers repeats from the store. """
+
+    puzzle, _, solution = generate(9, "sudoku", seed=33)
+    path = tmp_path / "puzzles.txt"
+    path.write_text((format_grid(puzzle) + "\n") * 2, encoding="utf-8")
+    store = str(tmp_path / "store.sqlite")
+
+    assert main([str(path), "--workers", "1", "--rate", "--store", store]) == 0
+    for output in capsys.readouterr()[0].splitlines():
+        grid, label, score = output.split("\t")
+        assert grid == format_grid(solution)
+        assert label in LABELS
+        float(score)
+
+
+def test_rating_from_solve_stats():
+    """ A rating from the solve's statistics has the same label as one that solves the puzzle itself. """
+
+    puzzle, _, _ = generate(9, "sudoku", seed=34)
+    stats = SolveStats()
+    assert solve(puzzle, "sudoku", presolve=False, stats=stats) is not None
+    from_stats = rate(puzzle, "sudoku", stats=stats)
+    assert from_stats["conflicts"] == stats.counts["conflicts"]
+
+    _ratings.clear()  # So the puzzle is rated again rather than from the cache
+    assert rate(puzzle, "sudoku")["label"] == from_stats["label"]
+
+
+def test_rating_unsolvable():
+    """ A puzzle with no solution is rated unsolvable. """
+
+    assert rate([[1, 1, 0, 0]] + [[0] * 4 for _ in range(3)], "sudoku")["label"] == "unsolvable"
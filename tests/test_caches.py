@@ -0,0 +1,124 @@
+""" Tests for solution_store.py, canonical.py and the bounded rule template cache in clause_creation.py. """
+
+import threading
+from canonical import canonical_form, lookup_solution, store_solution
+from clause_creation import MAX_RULE_TEMPLATES, MAX_TEMPLATE_DIM, _rule_templates, rule_template
+from engine import solve
+from generator import generate
+from solution_store import IN_MEMORY, SolutionStore, entry_size, open_store, solution_key
+from solve_stats import SolveStats
+
+
+def relabel_and_swap(grid):
+    """ A symmetry of a 9 x 9 grid: swaps the first two rows and the last two bands and relabels every number. """
+
+    rows = [grid[1], grid[0]] + grid[2:3] + grid[6:9] + grid[3:6]
+    return [[10 - value if value else 0 for value in row] for row in rows]
+
+
+def test_store_round_trip(tmp_path):
+    """ Solutions, including "no solution", survive closing and reopening the database. """
+
+    path = str(tmp_path / "store.sqlite")
+    store = SolutionStore(path)
+    store.put("solved", [[1, 2], [2, 1]])
+    store.put("unsolvable", None)
+    store.close()
+
+    store = SolutionStore(path)
+    assert store.get("solved") == (True, [[1, 2], [2, 1]])
+    assert store.get("unsolvable") == (True, None)
+    assert store.get("missing") == (False, None)
+    store.close()
+
+
+def test_in_memory_store(tmp_path, monkeypatch):
+    """ An in-memory store writes no file, and forgets the least recently used solutions when it is full. """
+
+    monkeypatch.chdir(tmp_path)
+    store = SolutionStore(IN_MEMORY, max_memory=3 * entry_size("a", bytes(4)))
+    for key in "abcd":
+        store.put(key, [[1, 2], [2, 1]])
+    assert store.get("a") == (False, None)
+    assert store.get("d")[0]
+    assert store.memory_used <= store.max_memory
+    assert not list(tmp_path.iterdir())
+
+
+def test_solve_uses_store(tmp_path):
+    """ A puzzle solved again is answered from the store, and the key depends on the constraints. """
+
+    path = str(tmp_path / "store.sqlite")
+    puzzle, constraints, solution = generate(9, "killer_sudoku", seed=21)
+    assert solve(puzzle, "killer_sudoku", constraints, solution_store=path) == solution
+    stats = SolveStats()
+    assert solve(puzzle, "killer_sudoku", constraints, solution_store=path, stats=stats) == solution
+    assert stats.backend == "solution store"
+
+    other_cages = {"ks_cages": constraints["ks_cages"], "ks_totals": constraints["ks_totals"][::-1]}
+    assert solution_key(puzzle, "killer_sudoku", 9, constraints) != solution_key(puzzle, "killer_sudoku", 9,
+                                                                                 other_cages)
+
+
+def test_one_store_per_path(tmp_path):
+    """ Threads opening the same path at once share one store. """
+
+    path = str(tmp_path / "store.sqlite")
+    stores = []
+    barrier = threading.Barrier(8)
+
+    def opener():
+        barrier.wait()
+        stores.append(open_store(path))
+
+    threads = [threading.Thread(target=opener) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(store) for store in stores}) == 1
+
+
+def test_symmetric_puzzles_share_a_canonical_form():
+    """ A puzzle and a symmetry of it have the same canonical form, and a stored solution maps back to each. """
+
+    puzzle, _, solution = generate(9, "sudoku", seed=22)
+    other = relabel_and_swap(puzzle)
+    form = canonical_form(puzzle)
+    other_form = canonical_form(other)
+    assert form[0] == other_form[0]
+
+    assert lookup_solution(form) == (False, None)
+    store_solution(form, solution)
+    assert lookup_solution(other_form) == (True, relabel_and_swap(solution))
+
+
+def test_solve_uses_symmetry_cache():
+    """ Solving a symmetry of a solved puzzle is answered from the cache with the right solution. """
+
+    puzzle, _, solution = generate(9, "sudoku", seed=23)
+    assert solve(puzzle, "sudoku", presolve=False, symmetry_cache=True) == solution
+    stats = SolveStats()
+    assert solve(relabel_and_swap(puzzle), "sudoku", presolve=False, symmetry_cache=True,
+                 stats=stats) == relabel_and_swap(solution)
+    assert stats.backend == "symmetry cache"
+
+
+def test_rule_templates_are_bounded():
+    """ Only the most recently used small templates are kept. """
+
+    assert rule_template(9) is rule_template(9)
+    for encoding in ["pairwise", "seqcounter", "ladder", "bitwise", "totalizer", "product"]:
+        rule_template(4, "sudoku", encoding)
+        rule_template(6, "sudoku", encoding)
+    assert len(_rule_templates) == MAX_RULE_TEMPLATES
+    assert all(key[0] <= MAX_TEMPLATE_DIM for key in _rule_templates)
+
+
+def test_large_templates_are_not_kept():
+    """ Templates for grids above MAX_TEMPLATE_DIM are built but not kept. """
+
+    grid_dim = MAX_TEMPLATE_DIM + 3
+    template = rule_template(grid_dim)
+    assert template.grid_dim == grid_dim
+    assert not any(key[0] == grid_dim for key in _rule_templates)
@@ -0,0 +1,94 @@
+""" Tests for dimacs.py and the DIMACS export, import and formula cache of engine.py. """
+
+import os
+import pytest
+from clause_creation import choose_encoding, define_clauses, stream_clauses
+from dimacs import cache_path, formula_key, read_dimacs, read_header, write_dimacs
+from engine import cached_formula, decode, export_dimacs, load_dimacs, solve
+from generator import generate
+
+
+def test_round_trip(tmp_path):
+    """ The clauses read back are the clauses written, and the header counts them. """
+
+    clauses = [[1, -2], [3], [-1, 2, -3], []]
+    path = str(tmp_path / "formula.cnf")
+    assert write_dimacs(iter(clauses), path, comments=["a comment"]) == (3, 4)
+    assert read_header(path) == (3, 4)
+    assert read_dimacs(path) == (3, clauses)
+
+
+def test_clauses_spanning_lines(tmp_path):
+    """ Clauses may share a line or span several, and comments may come between them. """
+
+    path = tmp_path / "formula.cnf"
+    path.write_text("c top\np cnf 3 3\n1 -2 0 3\n0\nc between\n-1\n2 -3 0\n", encoding="ascii")
+    assert read_dimacs(str(path)) == (3, [[1, -2], [3], [-1, 2, -3]])
+
+
+@pytest.mark.parametrize("text", [
+    "p cnf 2 2\n1 -2 0\n2",  # Cut short in the middle of a clause
+    "p cnf 2 3\n1 -2 0\n2 0\n",  # Fewer clauses than the header says
+    "p cnf 2 2\n1 -x 0\n2 0\n",  # Not a number
+])
+def test_corrupt_files(tmp_path, text):
+    """ A damaged file is rejected rather than loaded without some of its clauses. """
+
+    path = tmp_path / "formula.cnf"
+    path.write_text(text, encoding="ascii")
+    with pytest.raises(ValueError):
+        read_dimacs(str(path))
+
+
+@pytest.mark.parametrize("sudoku_type", ["sudoku", "killer_sudoku", "hyper_sudoku", "greater_than_sudoku"])
+def test_export_and_load(tmp_path, sudoku_type):
+    """ An exported puzzle loads into a SAT solver that finds its solution. """
+
+    puzzle, constraints, solution = generate(9, sudoku_type, seed=11)
+    path = str(tmp_path / "puzzle.cnf")
+    nof_vars, nof_clauses = export_dimacs(puzzle, path, sudoku_type, constraints)
+    assert nof_clauses == len(define_clauses(puzzle, sudoku_type, 9, constraints))
+    sat_solver = load_dimacs(path)
+    assert sat_solver.solve()
+    values = decode(sat_solver.get_model(), 9)
+    sat_solver.delete()
+    assert [values[r * 9:(r + 1) * 9] for r in range(9)] == solution
+    assert read_header(path)[0] == nof_vars
+
+
+@pytest.mark.parametrize("grid_dim, sudoku_type", [(9, "sudoku"), (9, "hyper_sudoku"), (16, "sudoku")])
+def test_stream_matches_formula(grid_dim, sudoku_type):
+    """ The streamed clauses are the ones define_clauses collects, in the same order. """
+
+    puzzle = [[0] * grid_dim for _ in range(grid_dim)]
+    puzzle[0][0] = 1
+    streamed = [list(clause) for clause in stream_clauses(puzzle, sudoku_type, grid_dim, {})]
+    assert streamed == [list(clause) for clause in define_clauses(puzzle, sudoku_type, grid_dim, {})]
+
+
+def test_formula_cache(tmp_path):
+    """ The formula cache writes a file the first time, and solves use it. """
+
+    cache_dir = str(tmp_path / "cache")
+    formula = cached_formula("sudoku", 9, {}, "auto", cache_dir)
+    path = cache_path(cache_dir, formula_key("sudoku", 9, {}, choose_encoding(9, "auto")))
+    assert os.path.exists(path)
+    assert [list(clause) for clause in cached_formula("sudoku", 9, {}, "auto", cache_dir)] == \
+        [list(clause) for clause in formula]
+    puzzle, _, solution = generate(9, "sudoku", seed=12)
+    assert solve(puzzle, "sudoku", presolve=False, cache_dir=cache_dir) == solution
+
+
+def test_corrupt_cache_is_replaced(tmp_path):
+    """ A cached formula that was cut short is encoded again instead of being loaded without some clauses. """
+
+    cache_dir = str(tmp_path / "cache")
+    formula = cached_formula("sudoku", 4, {}, "auto", cache_dir)
+    path = cache_path(cache_dir, formula_key("sudoku", 4, {}, choose_encoding(4, "auto")))
+    with open(path, encoding="ascii") as file:
+        text = file.read()
+    with open(path, "w", encoding="ascii") as file:
+        file.write(text[:len(text) // 2])
+    assert [list(clause) for clause in cached_formula("sudoku", 4, {}, "auto", cache_dir)] == \
+        [list(clause) for clause in formula]
+    assert read_dimacs(path)[1] == [list(clause) for clause in formula]
@@ -0,0 +1,135 @@
+""" Tests for engine.py: solving each type and size of puzzle with each backend, and the checks on the input. """
+
+import numpy as np
+import pytest
+from engine import ARRAY_STATUSES, SAT_SOLVERS, count_solutions, has_unique_solution, solve, solve_array
+from generator import generate
+
+DUPLICATE_GIVENS = [[1, 1, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]  # Two 1s in the top row
+EMPTY_4 = [[0] * 4 for _ in range(4)]  # 288 solutions
+
+
+@pytest.mark.parametrize("grid_dim", [4, 6, 8, 9, 10, 12, 16])
+@pytest.mark.parametrize("backend", ["sat", "backtrack"])
+@pytest.mark.parametrize("presolve", [True, False])
+def test_sudoku_sizes(grid_dim, backend, presolve):
+    """ Every backend finds the unique solution of a generated puzzle, with and without propagation. """
+
+    if grid_dim == 16 and backend == "backtrack" and not presolve:
+        pytest.skip("Backtracking alone takes minutes on a 16 x 16 puzzle")
+    puzzle, _, solution = generate(grid_dim, "sudoku", seed=grid_dim)
+    assert solve(puzzle, "sudoku", backend=backend, presolve=presolve) == solution
+
+
+@pytest.mark.parametrize("sudoku_type", ["killer_sudoku", "hyper_sudoku", "greater_than_sudoku"])
+@pytest.mark.parametrize("presolve", [True, False])
+def test_variants(sudoku_type, presolve):
+    """ The variants are solved with their constraints. """
+
+    puzzle, constraints, solution = generate(9, sudoku_type, seed=1)
+    assert solve(puzzle, sudoku_type, constraints, presolve=presolve) == solution
+
+
+@pytest.mark.parametrize("constraints", [{"ks_encoding": "permutation"}, {"gt_encoding": "tseitin"}])
+def test_variant_encodings(constraints):
+    """ The older cage and inequality encodings give the same answers. """
+
+    sudoku_type = "killer_sudoku" if "ks_encoding" in constraints else "greater_than_sudoku"
+    puzzle, generated, solution = generate(9, sudoku_type, seed=2)
+    assert solve(puzzle, sudoku_type, {**generated, **constraints}, presolve=False) == solution
+
+
+@pytest.mark.parametrize("encoding", ["pairwise", "seqcounter", "ladder", "bitwise", "totalizer", "product"])
+def test_encodings(encoding):
+    """ Every at-most-one encoding gives the same answer. """
+
+    puzzle, _, solution = generate(9, "sudoku", seed=3)
+    assert solve(puzzle, "sudoku", encoding=encoding, presolve=False) == solution
+
+
+@pytest.mark.parametrize("solver_name", SAT_SOLVERS)
+def test_sat_solvers(solver_name):
+    """ Every SAT solver gives the same answer. """
+
+    puzzle, _, solution = generate(9, "sudoku", seed=4)
+    assert solve(puzzle, "sudoku", solver_name=solver_name, presolve=False) == solution
+
+
+def test_portfolio_and_residual():
+    """ The portfolio and the non-incremental residual solve agree with the layout solver. """
+
+    puzzle, _, solution = generate(9, "sudoku", seed=5)
+    assert solve(puzzle, "sudoku", backend="portfolio", presolve=False) == solution
+    assert solve(puzzle, "sudoku", incremental=False) == solution
+
+
+@pytest.mark.parametrize("backend", ["sat", "backtrack"])
+@pytest.mark.parametrize("presolve", [True, False])
+def test_unsolvable(backend, presolve):
+    """ A puzzle with a number given twice has no solution, however it is solved. """
+
+    assert solve(DUPLICATE_GIVENS, "sudoku", backend=backend, presolve=presolve) is None
+    assert count_solutions(DUPLICATE_GIVENS, "sudoku", presolve=presolve) == 0
+
+
+def test_solution_counts():
+    """ Counting stops at the cap, and a generated puzzle has exactly one solution. """
+
+    assert count_solutions(EMPTY_4, "sudoku") == 2
+    assert count_solutions(EMPTY_4, "sudoku", cap=300) == 288
+    assert not has_unique_solution(EMPTY_4, "sudoku")
+    puzzle, constraints, _ = generate(9, "killer_sudoku", seed=6)
+    assert has_unique_solution(puzzle, "killer_sudoku", constraints)
+
+
+def test_layout_solver_is_reused_between_puzzles():
+    """ Solving a multi-solution puzzle and then others with the same layout doesn't leave clauses behind. """
+
+    assert count_solutions(EMPTY_4, "sudoku", cap=3, presolve=False) == 3
+    assert count_solutions(EMPTY_4, "sudoku", cap=300, presolve=False) == 288
+    puzzle, _, solution = generate(4, "sudoku", seed=7)
+    assert solve(puzzle, "sudoku", backend="sat", presolve=False) == solution
+
+
+def test_solve_array():
+    """ Each puzzle in an array gets its solution or status. """
+
+    puzzles = []
+    solutions = []
+    for seed in range(3):
+        puzzle, _, solution = generate(9, "sudoku", seed=seed)
+        puzzles.append(puzzle)
+        solutions.append(solution)
+    bad = [[0] * 9 for _ in range(9)]
+    bad[0][0] = bad[0][1] = 5
+    out_of_range = [[0] * 9 for _ in range(9)]
+    out_of_range[0][0] = 10
+    array = np.array(puzzles + [bad, out_of_range], dtype=np.uint8)
+
+    results, statuses = solve_array(array)
+    assert results[:3].tolist() == solutions
+    assert [ARRAY_STATUSES[status] for status in statuses] == ["solved"] * 3 + ["unsolvable", "invalid"]
+    assert not results[3:].any()
+
+
+@pytest.mark.parametrize("puzzle, sudoku_type, constraints", [
+    ([[0] * 5 for _ in range(5)], "sudoku", None),  # Prime size, so no blocks
+    ([[0] * 4 for _ in range(3)], "sudoku", None),  # Not square
+    ([[5, 0, 0, 0]] + [[0] * 4 for _ in range(3)], "sudoku", None),  # Number too large
+    ([[0] * 16 for _ in range(16)], "hyper_sudoku", None),  # Hyper sudoku is only 9 x 9
+    ([[0] * 9 for _ in range(9)], "killer_sudoku", {}),  # No cages
+    ([[0] * 9 for _ in range(9)], "sudoku_x", None),  # Unknown type
+])
+def test_invalid_input(puzzle, sudoku_type, constraints):
+    """ Bad puzzles raise ValueError before anything is encoded. """
+
+    with pytest.raises(ValueError):
+        solve(puzzle, sudoku_type, constraints)
+
+
+@pytest.mark.parametrize("grid_dim", [25, 36])
+def test_large_grids(grid_dim):
+    """ Large grids are solved, by propagation with the SAT solver for what is left. """
+
+    puzzle, _, solution = generate(grid_dim, "sudoku", seed=8)
+    assert solve(puzzle, "sudoku") == solution